@@ -0,0 +1,189 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from app.api.fetch_random_users import request_random_users, get_api_client, RandomUserAPIError
+from app.utils import config
+from app.utils.logger import log_warning, log_error
+from app.utils.constants import MIN_REQUEST_RATE
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting how often API requests may start.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float):
+        """
+        Changes the refill rate, keeping the tokens accumulated so far.
+        """
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+    def acquire(self, stop_event: threading.Event = None) -> bool:
+        """
+        Blocks until a token is available and takes it.
+
+        Args:
+            stop_event (threading.Event): Aborts the wait early when set.
+
+        Returns:
+            bool: True if a token was taken, False if the wait was aborted.
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                delay = (1 - self._tokens) / self.rate
+            if stop_event is None:
+                time.sleep(delay)
+            elif stop_event.wait(delay):
+                return False
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class FetchEngine:
+    """
+    Keeps several rate-limited API requests in flight and streams their batches.
+
+    Requests are paced by a token bucket. A transient failure (429, 5xx, timeout or
+    connection error) that outlives the client's own retries halves the request
+    rate and pauses all workers (honouring Retry-After when present, capped at
+    max_backoff); every success raises the rate back towards the configured limit.
+    Other failures (client errors, undecodable bodies) back off the same way, and
+    after max_failures of them in a row the stream gives up with an error.
+    Pacing is skipped entirely when the shared client replays recorded responses.
+    """
+
+    def __init__(self, fetch=None, rate: float = None, burst: float = None,
+                 max_in_flight: int = None, max_backoff: float = None, max_failures: int = None):
+        self.fetch = fetch or request_random_users
+        self.max_rate = rate or config.FETCH_CONFIG["rate"]
+        self.max_in_flight = max_in_flight or config.FETCH_CONFIG["max_in_flight"]
+        self.max_backoff = config.FETCH_CONFIG["max_backoff"] if max_backoff is None else max_backoff
+        self.max_failures = max_failures or config.API_CLIENT_CONFIG["max_failures"]
+        self.bucket = TokenBucket(self.max_rate, burst or config.FETCH_CONFIG["burst"])
+        if fetch is None and not get_api_client().rate_limited:
+            self.bucket = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._permanent_failures = 0
+        self._paused_until = 0.0
+        self.stats = {"requests": 0, "failures": 0, "backoffs": 0, "users": 0}
+
+    def stream(self, size: int):
+        """
+        Yields batches of users until the consumer stops iterating or stop() is called.
+
+        Args:
+            size (int | callable): Number of users to request per API call, or a
+                callable returning the size for each new call.
+
+        Yields:
+            list: The users returned by one API call (empty if the call failed).
+
+        Raises:
+            RandomUserAPIError: After max_failures non-transient failures in a row.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="fetch")
+        pending = set()
+        try:
+            while not self._stop.is_set():
+                while len(pending) < self.max_in_flight:
+                    batch_size = size() if callable(size) else size
+                    pending.add(executor.submit(self._fetch_batch, batch_size))
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    users = future.result()
+                    if users is not None:
+                        yield users
+        finally:
+            self.stop()
+            for future in pending:
+                future.cancel()
+            # In-flight requests cannot be interrupted; their results are discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        """
+        Stops the stream and aborts any request still waiting for a token or back-off.
+        """
+        self._stop.set()
+
+    def _fetch_batch(self, size: int):
+        if not self._wait_for_slot():
+            return None
+        with self._lock:
+            self.stats["requests"] += 1
+        try:
+            users = self.fetch(size)
+        except RandomUserAPIError as e:
+            if not e.transient:
+                log_error("Error fetching random users (%s): %s", e.category, e, category="api")
+                with self._lock:
+                    self._permanent_failures += 1
+                    if self._permanent_failures >= self.max_failures:
+                        self.stats["failures"] += 1
+                        raise RandomUserAPIError(
+                            f"Giving up after {self._permanent_failures} failed API requests in a row: {e}",
+                            e.category, e.status) from e
+            self._back_off(e.category, e.retry_after)
+            return []
+        self._recover(len(users))
+        return users
+
+    def _wait_for_slot(self) -> bool:
+        while True:
+            with self._lock:
+                pause = self._paused_until - time.monotonic()
+            if pause <= 0:
+                return self.bucket.acquire(self._stop) if self.bucket else not self._stop.is_set()
+            if self._stop.wait(pause):
+                return False
+
+    def _back_off(self, reason: str, retry_after: float = None):
+        with self._lock:
+            self._failures += 1
+            self.stats["failures"] += 1
+            self.stats["backoffs"] += 1
+            if retry_after is not None:
+                delay = min(retry_after, self.max_backoff)
+            else:
+                delay = min(2 ** (self._failures - 1), self.max_backoff) * random.uniform(0.5, 1.0)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            rate = max(self.bucket.rate / 2, MIN_REQUEST_RATE) if self.bucket else float("inf")
+        if self.bucket:
+            self.bucket.set_rate(rate)
+        log_warning("API request failed (%s); backing off %.2fs at %.2f req/s", reason, delay, rate, category="api")
+
+    def _recover(self, user_count: int):
+        with self._lock:
+            self._failures = 0
+            self._permanent_failures = 0
+            self.stats["users"] += user_count
+            if not self.bucket:
+                return
+            rate = min(self.bucket.rate + self.max_rate / 10, self.max_rate)
+        if rate != self.bucket.rate:
+            self.bucket.set_rate(rate)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
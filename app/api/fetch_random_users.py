@@ -1,8 +1,277 @@
-import requests
-from app.utils.config import API_URL
-from app.utils.logger import log_info, log_error
+import random
+import threading
+import time
+from collections import Counter, deque
+from app.api.response_log import ResponseLogRecorder, ReplayClient
+from app.api.user_parser import STREAM_CHUNK_SIZE, parse_users
+from app.utils import config
+from app.utils.logger import log_info, log_warning, log_error
+from app.utils.metrics import timed
 from app.utils.constants import DEFAULT_WINNER_SIZE
 
+# Error categories worth retrying, as opposed to "client" and "decode" errors
+TRANSIENT_ERRORS = {"timeout", "connection", "rate_limited", "server"}
+
+# Number of recent request latencies kept for percentile statistics
+LATENCY_WINDOW = 1000
+
+
+class RandomUserAPIError(Exception):
+    """
+    Raised when the random user API cannot be reached or returns an unusable response.
+
+    Attributes:
+        category (str): One of "timeout", "connection", "rate_limited", "server",
+            "client" or "decode".
+        status (int): HTTP status code, if a response was received.
+        retry_after (float): Seconds the server asked us to wait, if any.
+    """
+
+    def __init__(self, message, category, status=None, retry_after=None):
+        super().__init__(message)
+        self.category = category
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def transient(self) -> bool:
+        return self.category in TRANSIENT_ERRORS
+
+
+def classify_error(error: Exception) -> RandomUserAPIError:
+    """
+    Maps a requests exception (or a body parsing error) to a categorized RandomUserAPIError.
+    """
+    import requests
+    if isinstance(error, requests.exceptions.JSONDecodeError) or not isinstance(error, requests.exceptions.RequestException):
+        return RandomUserAPIError(str(error), "decode")
+    if isinstance(error, requests.exceptions.Timeout):
+        return RandomUserAPIError(str(error), "timeout")
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return RandomUserAPIError(str(error), "connection")
+    # The body broke off or arrived garbled mid-transfer, typically while streaming it
+    if isinstance(error, (requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError)):
+        return RandomUserAPIError(str(error), "connection")
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status == 429:
+        return RandomUserAPIError(str(error), "rate_limited", status, _retry_after(response))
+    if status is not None and status >= 500:
+        return RandomUserAPIError(str(error), "server", status, _retry_after(response))
+    return RandomUserAPIError(str(error), "client", status)
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class RandomUserClient:
+    """
+    Reusable client for the random user API.
+
+    Keeps a pooled keep-alive Session, applies connect/read timeouts, retries
+    transient failures with jittered exponential back-off, and records request
+    latencies and error counts per category. When a recorder is given, every
+    successful response is also appended to it.
+
+    With parse_mode "stream" the response body is parsed as it arrives and
+    projected into User records, so memory per batch does not grow with the
+    full size of every user's nested fields.
+    """
+
+    rate_limited = True
+
+    def __init__(self, base_url: str = None, connect_timeout: float = None, read_timeout: float = None,
+                 max_retries: int = None, retry_backoff: float = None, pool_size: int = None,
+                 recorder: ResponseLogRecorder = None, parse_mode: str = None):
+        self.base_url = base_url or config.API_URL
+        self.timeout = (
+            connect_timeout or config.API_CLIENT_CONFIG["connect_timeout"],
+            read_timeout or config.API_CLIENT_CONFIG["read_timeout"],
+        )
+        self.max_retries = config.API_CLIENT_CONFIG["max_retries"] if max_retries is None else max_retries
+        self.retry_backoff = retry_backoff or config.API_CLIENT_CONFIG["retry_backoff"]
+        self.recorder = recorder
+        self.parse_mode = parse_mode or config.API_PARSE_MODE
+        if self.parse_mode not in ("full", "stream"):
+            raise ValueError(f"Unknown API_PARSE_MODE: {self.parse_mode}")
+        if recorder and self.parse_mode == "stream":
+            raise ValueError("Recording needs full responses; use API_PARSE_MODE=full")
+        # requests is only imported by the clients that actually go to the network
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or config.FETCH_CONFIG["max_in_flight"])
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.errors = Counter()
+        self.requests = 0
+        self.retries = 0
+
+    def get_users(self, size: int) -> list:
+        """
+        Fetches a list of random users, retrying transient failures.
+
+        Args:
+            size (int): Number of users to fetch per request.
+
+        Returns:
+            list: User dictionaries, or User records in "stream" parse mode.
+
+        Raises:
+            RandomUserAPIError: If the request fails permanently or retries are exhausted.
+        """
+        attempt = 0
+        while True:
+            try:
+                return self._request(size)
+            except RandomUserAPIError as e:
+                if not e.transient or attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt, e.retry_after)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                log_warning("Transient API error (%s): %s; retry %s/%s in %.2fs",
+                            e.category, e, attempt, self.max_retries, delay, category="api")
+                time.sleep(delay)
+
+    def latency_stats(self) -> dict:
+        """
+        Returns request latency statistics in seconds over the recent window.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {"requests": self.requests, "retries": self.retries, "errors": dict(self.errors)}
+        if latencies:
+            stats.update({
+                "latency_mean": sum(latencies) / len(latencies),
+                "latency_p50": latencies[int(0.50 * (len(latencies) - 1))],
+                "latency_p99": latencies[int(0.99 * (len(latencies) - 1))],
+                "latency_max": latencies[-1],
+            })
+        return stats
+
+    def close(self):
+        """
+        Closes the pooled HTTP connections and the recorder, if any.
+        """
+        self.session.close()
+        if self.recorder:
+            self.recorder.close()
+
+    @timed("api_request", rows=len)
+    def _request(self, size: int) -> list:
+        import requests
+        url = f"{self.base_url}?size={size}"
+        started = time.monotonic()
+        try:
+            if self.parse_mode == "stream":
+                users = self._stream_users(url)
+            else:
+                response = self.session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                users = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            error = classify_error(e)
+            with self._lock:
+                self.requests += 1
+                self.errors[error.category] += 1
+            raise error from e
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(time.monotonic() - started)
+        if self.recorder:
+            self.recorder.record(size, users)
+        log_info("Successfully fetched %s users.", len(users), category="api")
+        return users
+
+    def _stream_users(self, url: str) -> list:
+        response = self.session.get(url, timeout=self.timeout, stream=True)
+        try:
+            response.raise_for_status()
+            return parse_users(response.iter_content(STREAM_CHUNK_SIZE))
+        finally:
+            response.close()
+
+    def _retry_delay(self, attempt: int, retry_after: float = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, config.FETCH_CONFIG["max_backoff"])
+        # "Full jitter" keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(config.FETCH_CONFIG["max_backoff"], self.retry_backoff * 2 ** attempt))
+
+
+# Shared client instance
+_client = None
+_client_lock = threading.Lock()
+
+
+def create_api_client(mode: str = None, log_path: str = None):
+    """
+    Creates an API client for the given mode.
+
+    Args:
+        mode (str): "live", "record" or "replay"; defaults to API_MODE.
+        log_path (str): Response log to record to or replay from; defaults to API_LOG_PATH.
+
+    Returns:
+        RandomUserClient | ReplayClient: A client exposing get_users(size).
+    """
+    mode = mode or config.API_MODE
+    log_path = log_path or config.API_LOG_PATH
+    if mode == "replay":
+        return ReplayClient(log_path)
+    if mode == "record":
+        log_info("Recording API responses to %s", log_path, category="api")
+        # The log keeps whole responses, so recording always parses them in full
+        return RandomUserClient(recorder=ResponseLogRecorder(log_path), parse_mode="full")
+    if mode != "live":
+        raise ValueError(f"Unknown API_MODE: {mode}")
+    return RandomUserClient()
+
+
+def get_api_client():
+    """
+    Returns the shared API client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_api_client()
+    return _client
+
+
+def close_api_client():
+    """
+    Closes the shared API client if it is open.
+    """
+    global _client
+    if _client:
+        _client.close()
+        _client = None
+
+
+def request_random_users(size: int):
+    """
+    Fetches a list of random users from the external API, raising on failure.
+
+    Args:
+        size (int): Number of users to fetch per request.
+
+    Returns:
+        list: User dictionaries, or User records in "stream" parse mode.
+
+    Raises:
+        RandomUserAPIError: If the request fails permanently or retries are exhausted.
+    """
+    return get_api_client().get_users(size)
+
 
 def fetch_random_users(size: int):
     """
@@ -12,17 +281,12 @@ def fetch_random_users(size: int):
         size (int): Number of users to fetch per request.
 
     Returns:
-        list: A list of user dictionaries if successful, else an empty list.
+        list: User dictionaries (User records in "stream" parse mode) if successful, else an empty list.
     """
-    url = f"{API_URL}?size={size}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        users = response.json()
-        log_info(f"Successfully fetched {len(users)} users.")
-        return users
-    except requests.exceptions.RequestException as e:
-        log_error(f"Error fetching random users: {e}")
+        return request_random_users(size)
+    except RandomUserAPIError as e:
+        log_error("Error fetching random users (%s): %s", e.category, e, category="api")
         return []
 
 
@@ -34,4 +298,3 @@ def fetch_default_users():
         list: A list of user dictionaries if successful, else an empty list.
     """
     return fetch_random_users(size=DEFAULT_WINNER_SIZE)
-
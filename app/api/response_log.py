@@ -0,0 +1,144 @@
+import gzip
+import json
+import os
+import threading
+import time
+from app.utils.logger import log_info, log_warning
+
+
+class ResponseLogRecorder:
+    """
+    Appends API responses to an on-disk log.
+
+    Every response is written as its own gzip member holding one JSON line, so the
+    data file stays a valid .jsonl.gz stream while the companion ".idx" file
+    (one "offset length user_count" line per response) allows seeking straight to
+    any response without decompressing the ones before it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._data = open(path, "ab")
+        self._index = open(self.index_path, "a")
+        self.records = 0
+
+    def record(self, size: int, users: list):
+        """
+        Appends one API response to the log.
+
+        Args:
+            size (int): Number of users that were requested.
+            users (list): The users returned by the API.
+        """
+        line = json.dumps({"ts": time.time(), "size": size, "users": users}, separators=(",", ":"))
+        member = gzip.compress(line.encode("utf-8") + b"\n")
+        with self._lock:
+            offset = self._data.tell()
+            self._data.write(member)
+            self._data.flush()
+            self._index.write(f"{offset} {len(member)} {len(users)}\n")
+            self._index.flush()
+            self.records += 1
+
+    def close(self):
+        """
+        Closes the log files.
+        """
+        with self._lock:
+            self._data.close()
+            self._index.close()
+
+
+class ResponseLogReader:
+    """
+    Random-access reader of a log written by ResponseLogRecorder.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(f"{path}.idx") as index:
+            self.entries = [tuple(int(field) for field in line.split()) for line in index if line.strip()]
+        self._data = open(path, "rb")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def read(self, position: int) -> dict:
+        """
+        Returns the recorded response at the given position.
+
+        Returns:
+            dict: The record with "ts", "size" and "users" keys.
+        """
+        offset, length, _ = self.entries[position]
+        self._data.seek(offset)
+        return json.loads(gzip.decompress(self._data.read(length)))
+
+    def __iter__(self):
+        for position in range(len(self.entries)):
+            yield self.read(position)
+
+    def close(self):
+        """
+        Closes the log file.
+        """
+        self._data.close()
+
+
+class ReplayClient:
+    """
+    Serves recorded users in their original order without touching the network.
+
+    Users are served as one continuous stream regardless of how they were batched
+    when recorded, so a replay yields the same user sequence even if the batch
+    sizes differ. When the log is exhausted it starts over from the beginning.
+    For a bit-for-bit reproduction of a recorded run, replay with
+    API_MAX_IN_FLIGHT=1 so batches are consumed in the order they are served.
+    """
+
+    # Replayed responses are not subject to the API's rate limit
+    rate_limited = False
+
+    def __init__(self, path: str):
+        self.reader = ResponseLogReader(path)
+        if not any(user_count for _, _, user_count in self.reader.entries):
+            raise ValueError(f"API response log {path} holds no users")
+        self._lock = threading.Lock()
+        self._position = 0
+        self._buffer = []
+        self.requests = 0
+        self.rewinds = 0
+        log_info("Replaying %s recorded API responses from %s", len(self.reader), path, category="api")
+
+    def get_users(self, size: int) -> list:
+        """
+        Returns the next size recorded users.
+        """
+        with self._lock:
+            while len(self._buffer) < size:
+                if self._position == len(self.reader):
+                    self._position = 0
+                    self.rewinds += 1
+                    log_warning("API response log %s exhausted; replaying from the start", self.reader.path, category="api")
+                self._buffer.extend(self.reader.read(self._position)["users"])
+                self._position += 1
+            users, self._buffer = self._buffer[:size], self._buffer[size:]
+            self.requests += 1
+        return users
+
+    def latency_stats(self) -> dict:
+        """
+        Returns replay statistics in the same shape as RandomUserClient.latency_stats().
+        """
+        return {"requests": self.requests, "retries": 0, "errors": {}, "rewinds": self.rewinds}
+
+    def close(self):
+        """
+        Closes the replayed log.
+        """
+        self.reader.close()
@@ -0,0 +1,137 @@
+import codecs
+import json
+
+# Bytes read from the response body at a time when streaming
+STREAM_CHUNK_SIZE = 16 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class User:
+    """
+    Compact record of the only user fields the lottery reads.
+
+    Uses __slots__, so a record costs two references instead of the full nested
+    dictionaries of an API user (employment, subscription, coordinates, ...).
+    """
+
+    __slots__ = ("email", "state")
+
+    def __init__(self, email: str, state: str):
+        self.email = email
+        self.state = state
+
+    @classmethod
+    def from_dict(cls, user: dict) -> "User":
+        """
+        Projects an API user dictionary onto a User record.
+        """
+        address = user.get("address")
+        return cls(user.get("email"), address.get("state") if isinstance(address, dict) else None)
+
+    def __eq__(self, other):
+        if not isinstance(other, User):
+            return NotImplemented
+        return self.email == other.email and self.state == other.state
+
+    def __hash__(self):
+        return hash((self.email, self.state))
+
+    def __repr__(self):
+        return f"User(email={self.email!r}, state={self.state!r})"
+
+
+def as_user(user) -> User:
+    """
+    Returns user as a User record, projecting API dictionaries as needed.
+    """
+    return user if isinstance(user, User) else User.from_dict(user)
+
+
+def iter_json_array(chunks):
+    """
+    Incrementally decodes a JSON array from an iterable of byte chunks.
+
+    Elements are yielded as soon as they are complete, so only one element and
+    the undecoded tail of the body are held in memory at a time. A top-level
+    value that is not an array is decoded once the body has been read and
+    yielded as a single element.
+
+    Raises:
+        json.JSONDecodeError: If the body is not well-formed JSON.
+    """
+    decode = codecs.getincrementaldecoder("utf-8")().decode
+    buffer = ""
+    position = 0
+    state = "start"  # -> "array" -> "end", or -> "value" for a non-array body
+    chunks = iter(chunks)
+
+    while True:
+        chunk = next(chunks, None)
+        final = chunk is None
+        buffer = buffer[position:] + decode(chunk or b"", final=final)
+        position = 0
+
+        while state in ("start", "array"):
+            position = _skip_whitespace(buffer, position)
+            if position == len(buffer):
+                break
+            if state == "start":
+                if buffer[position] != "[":
+                    state = "value"
+                    break
+                state = "array"
+                position += 1
+                continue
+            if buffer[position] == "]":
+                state = "end"
+                position += 1
+                break
+            if buffer[position] == ",":
+                position += 1
+                continue
+            try:
+                element, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break
+            # An element is only complete once the next delimiter has arrived;
+            # a number cut off by the chunk boundary would otherwise decode early.
+            delimiter = _skip_whitespace(buffer, end)
+            if delimiter == len(buffer) or buffer[delimiter] not in ",]":
+                if final:
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, delimiter)
+                break
+            position = end
+            yield element
+
+        if final:
+            break
+
+    if state == "value":
+        yield json.loads(buffer[position:])
+    elif state != "end":
+        raise json.JSONDecodeError("Unterminated array", buffer, position)
+    elif _skip_whitespace(buffer, position) != len(buffer):
+        raise json.JSONDecodeError("Extra data", buffer, position)
+
+
+def _skip_whitespace(buffer: str, position: int) -> int:
+    while position < len(buffer) and buffer[position] in _WHITESPACE:
+        position += 1
+    return position
+
+
+def parse_users(chunks) -> list:
+    """
+    Streams an API response body straight into User records.
+
+    Args:
+        chunks: Iterable of byte chunks of the response body.
+
+    Returns:
+        list: One User per user in the response.
+    """
+    return [User.from_dict(user) for user in iter_json_array(chunks)]
@@ -1,34 +1,234 @@
+import threading
+import time
+from contextlib import contextmanager
 import psycopg2
-from app.utils.config import DB_CONFIG
-from app.utils.logger import log_info, log_error
+import psycopg2.pool
+from app.utils import config
+from app.utils.logger import log_info, log_warning, log_error
 
 
-# Global database connection instance
-_connection = None
+class DatabaseConnectionError(Exception):
+    """
+    Raised when a database connection cannot be established or checked out.
+    """
 
 
-def get_db_connection():
+class ConnectionPool:
     """
-    Establishes and returns a connection to the PostgreSQL database.
+    Thread-safe PostgreSQL connection pool with liveness checks.
+
+    Wraps psycopg2's ThreadedConnectionPool so that checkouts block until a
+    connection is free (instead of failing when the pool is exhausted), idle
+    connections are pinged before being handed out, and dead connections are
+    transparently replaced.
     """
-    global _connection
-    if _connection is None:
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float = None,
+                 health_check_interval: float = 0, **db_config):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
         try:
-            _connection = psycopg2.connect(**DB_CONFIG)
-            log_info(f"Database connection established.")
+            self._pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, **db_config)
         except Exception as e:
-            log_error(f"Failed to connect to database: {e}")
-            _connection = None
-    return _connection
+            raise DatabaseConnectionError(f"Failed to create connection pool: {e}") from e
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used = {}
+        self._stats = {
+            "checkouts": 0,
+            "in_use": 0,
+            "reconnects": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
 
+    def checkout(self):
+        """
+        Takes a live connection from the pool, waiting for one to become free.
 
-def close_connection():
+        Returns:
+            connection: A psycopg2 connection that must be given back with checkin().
+
+        Raises:
+            DatabaseConnectionError: If no connection is available within the timeout
+                or a new connection cannot be opened.
+        """
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise DatabaseConnectionError(f"Timed out after {self.timeout}s waiting for a database connection")
+        waited = time.monotonic() - started
+
+        try:
+            conn = self._ensure_alive(self._pool.getconn())
+        except Exception as e:
+            self._slots.release()
+            if isinstance(e, DatabaseConnectionError):
+                raise
+            raise DatabaseConnectionError(f"Failed to check out database connection: {e}") from e
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+        return conn
+
+    def checkin(self, conn, discard: bool = False):
+        """
+        Returns a connection to the pool.
+
+        Args:
+            conn (connection): Connection previously obtained from checkout().
+            discard (bool): Close the connection instead of keeping it for reuse.
+        """
+        try:
+            self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=discard or bool(conn.closed))
+        finally:
+            if discard or conn.closed:
+                self._last_used.pop(id(conn), None)
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager that checks out a connection and always returns it.
+
+        Any open transaction is rolled back if the block raises.
+        """
+        conn = self.checkout()
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.checkin(conn)
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the pool statistics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["minconn"] = self.minconn
+        stats["maxconn"] = self.maxconn
+        stats["wait_time_avg"] = stats["wait_time_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        return stats
+
+    def close(self):
+        """
+        Closes every connection held by the pool.
+        """
+        self._pool.closeall()
+        self._last_used.clear()
+
+    def _ensure_alive(self, conn):
+        """
+        Returns the connection if it is usable, otherwise a freshly opened replacement.
+        """
+        if not conn.closed and not self._needs_ping(conn):
+            return conn
+        if not conn.closed:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+                return conn
+            except psycopg2.Error as e:
+                log_warning("Discarding dead database connection: %s", e, category="db")
+
+        self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+        conn = self._pool.getconn()
+        with self._lock:
+            self._stats["reconnects"] += 1
+        log_info("Database connection re-established.", category="db")
+        return conn
+
+    def _needs_ping(self, conn) -> bool:
+        last_used = self._last_used.get(id(conn))
+        if last_used is None:
+            return False
+        return time.monotonic() - last_used >= self.health_check_interval
+
+
+# Global connection pool instance
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    """
+    Returns the shared connection pool, creating it on first use.
+
+    Raises:
+        DatabaseConnectionError: If the pool cannot connect to the database.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    _pool = ConnectionPool(**config.DB_POOL_CONFIG, **config.DB_CONFIG)
+                except DatabaseConnectionError as e:
+                    log_error("Failed to connect to database: %s", e, category="db")
+                    raise
+                log_info("Database connection pool established.", category="db")
+    return _pool
+
+
+def init_connection_pool(**overrides) -> ConnectionPool:
+    """
+    (Re)creates the shared connection pool, overriding pool or connection settings.
+
+    Args:
+        **overrides: Pool options (minconn, maxconn, timeout, health_check_interval)
+            or psycopg2.connect() arguments such as connection_factory.
+
+    Raises:
+        DatabaseConnectionError: If the pool cannot connect to the database.
     """
-    Closes the database connection if it is open.
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        _pool = ConnectionPool(**{**config.DB_POOL_CONFIG, **config.DB_CONFIG, **overrides})
+    log_info("Database connection pool established.", category="db")
+    return _pool
+
+
+@contextmanager
+def get_connection():
+    """
+    Checks out a pooled database connection for the duration of a with block.
     """
-    global _connection
-    if _connection:
-        _connection.close()
-        log_info(f"Database connection closed.")
-        _connection = None
+    with get_connection_pool().connection() as conn:
+        yield conn
 
+
+def get_pool_stats() -> dict:
+    """
+    Returns statistics of the shared connection pool, or an empty dict if it is not open.
+    """
+    return _pool.stats() if _pool is not None else {}
+
+
+def close_connection():
+    """
+    Closes all pooled database connections if the pool is open.
+    """
+    global _pool
+    if _pool:
+        _pool.close()
+        log_info("Database connection pool closed.", category="db")
+        _pool = None
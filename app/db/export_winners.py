@@ -0,0 +1,251 @@
+"""
+Exports the winners of one, several or all runs to CSV or JSONL.
+
+Rows are streamed from PostgreSQL with COPY ... TO STDOUT (CSV) or a named
+server-side cursor (JSONL, or CSV with --method cursor), so memory stays
+constant however many runs are exported. An output path ending in ".gz", or
+--compress, writes gzip-compressed output. Only finished runs are exported.
+--since-version exports only runs created after an earlier export; the
+latest exported version is logged at the end. Other storage backends are
+exported one run at a time.
+
+Usage:
+    python -m app.db.export_winners OUTPUT [--format csv|jsonl] [--compress]
+        [--runs NAME ...] [--since-version N] [--method copy|cursor]
+"""
+import argparse
+import csv
+import gzip
+import json
+import re
+from app.repositories.base import WinnerRepository, RUN_RUNNING, RUN_INTERRUPTED, RUN_COMPLETE
+from app.repositories.factory import create_winner_repository
+from app.utils import config
+from app.utils.constants import RUNS_TABLE, WINNERS_TABLE, EXPORT_FETCH_SIZE
+from app.utils.logger import log_info, log_warning, log_error
+
+# Columns of every exported row
+EXPORT_COLUMNS = ("run", "id", "email", "state")
+
+# Runs read per query, so that table-per-run exports need few round trips
+EXPORT_RUNS_PER_QUERY = 100
+
+RUN_VERSION_PATTERN = re.compile(r"_v(\d+)$")
+
+
+def parse_run_version(run_name: str):
+    """
+    Returns the version a run name ends with, or None.
+    """
+    match = RUN_VERSION_PATTERN.search(run_name)
+    return int(match.group(1)) if match else None
+
+
+def select_runs(repository: WinnerRepository, runs: list = None, since_version: int = None) -> list:
+    """
+    Returns the names of the finished runs to export, oldest first.
+
+    Runs still in progress are left out and logged. With since_version, no
+    later run is exported either, so that the latest exported version never
+    skips a run that finishes afterwards. Abandoned runs are never exported.
+
+    Args:
+        runs (list): Run names to export; defaults to every run.
+        since_version (int): Only export runs with a higher version.
+
+    Raises:
+        ValueError: If a requested run does not exist or has not finished.
+    """
+    available = repository.get_run_names()
+    statuses = repository.get_run_statuses()
+    if runs:
+        runs = set(runs)
+        unknown = sorted(runs - set(available))
+        if unknown:
+            raise ValueError(f"Unknown runs: {', '.join(unknown)}")
+        unfinished = sorted(name for name in runs if statuses.get(name, RUN_COMPLETE) != RUN_COMPLETE)
+        if unfinished:
+            raise ValueError(f"Unfinished runs: {', '.join(unfinished)}")
+        available = [name for name in available if name in runs]
+    if since_version is not None:
+        available = [name for name in available if (parse_run_version(name) or 0) > since_version]
+    selected = []
+    unfinished = []
+    for name in available:
+        status = statuses.get(name, RUN_COMPLETE)
+        if status in (RUN_RUNNING, RUN_INTERRUPTED):
+            if since_version is not None:
+                log_warning("Stopping the incremental export before %s, which is %s; "
+                            "later runs are exported once it finishes", name, status)
+                break
+            unfinished.append(name)
+        elif status == RUN_COMPLETE:
+            selected.append(name)
+    if unfinished:
+        log_warning("Left out %s runs still in progress: %s", len(unfinished), ", ".join(unfinished))
+    return selected
+
+
+def open_output(path: str, compress: bool = False):
+    """
+    Opens path for writing text, gzip-compressed if requested or if it ends in ".gz".
+    """
+    if compress or path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def select_query(runs: list) -> tuple:
+    """
+    Returns the query and parameters selecting the winners of runs as EXPORT_COLUMNS.
+
+    Run names must come from get_run_names(), since table names cannot be parameters.
+    """
+    if config.SCHEMA_MODE == "single":
+        return (
+            f"SELECT r.name, w.id, w.email, w.state FROM {WINNERS_TABLE} w "
+            f"JOIN {RUNS_TABLE} r ON r.id = w.run_id WHERE r.name = ANY(%s) ORDER BY w.run_id, w.id",
+            [runs],
+        )
+    query = " UNION ALL ".join(f"(SELECT %s::text, id, email, state FROM {name} ORDER BY id)" for name in runs)
+    return query, runs
+
+
+def export_copy(runs: list, out) -> int:
+    """
+    Streams the winners of runs into out as CSV rows with COPY ... TO STDOUT.
+
+    Returns:
+        int: Number of rows written.
+    """
+    from app.db.db_connection import get_connection
+
+    rows = 0
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            for start in range(0, len(runs), EXPORT_RUNS_PER_QUERY):
+                query = cursor.mogrify(*select_query(runs[start:start + EXPORT_RUNS_PER_QUERY])).decode()
+                cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv)", out)
+                rows += cursor.rowcount
+        conn.rollback()
+    return rows
+
+
+def iter_cursor_rows(runs: list):
+    """
+    Yields the winners of runs through a named server-side cursor, EXPORT_FETCH_SIZE rows at a time.
+    """
+    from app.db.db_connection import get_connection
+
+    with get_connection() as conn:
+        try:
+            for start in range(0, len(runs), EXPORT_RUNS_PER_QUERY):
+                with conn.cursor(name="export_winners") as cursor:
+                    cursor.itersize = EXPORT_FETCH_SIZE
+                    cursor.execute(*select_query(runs[start:start + EXPORT_RUNS_PER_QUERY]))
+                    yield from cursor
+        finally:
+            conn.rollback()
+
+
+def iter_repository_rows(repository: WinnerRepository, runs: list):
+    """
+    Yields the winners of runs from any backend, holding one run in memory at a time.
+    """
+    for run in runs:
+        for winner_id, email, state in repository.get_winners(run):
+            yield run, winner_id, email, state
+
+
+def write_rows(rows, out, fmt: str) -> int:
+    """
+    Writes (run, id, email, state) rows to out as CSV or JSONL.
+
+    Returns:
+        int: Number of rows written.
+    """
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            out.write(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n")
+            count += 1
+    return count
+
+
+def export(path: str, fmt: str = "csv", compress: bool = False, runs: list = None,
+           since_version: int = None, method: str = None, header: bool = True) -> dict:
+    """
+    Exports the winners of the selected runs to path.
+
+    Args:
+        fmt (str): "csv" or "jsonl".
+        method (str): "copy" or "cursor" for PostgreSQL; defaults to COPY for CSV
+            and a server-side cursor for JSONL.
+        header (bool): Start CSV output with a header row.
+
+    Returns:
+        dict: Number of exported runs and rows, and the latest exported version.
+    """
+    repository = create_winner_repository()
+    try:
+        selected = select_runs(repository, runs, since_version)
+        method = method or ("copy" if fmt == "csv" else "cursor")
+        if method == "copy" and fmt != "csv":
+            raise ValueError("COPY exports CSV only; use --method cursor for JSONL")
+
+        with open_output(path, compress) as out:
+            if fmt == "csv" and header:
+                csv.writer(out, lineterminator="\n").writerow(EXPORT_COLUMNS)
+            if not selected:
+                rows = 0
+            elif config.STORAGE_BACKEND != "postgres":
+                rows = write_rows(iter_repository_rows(repository, selected), out, fmt)
+            elif method == "copy":
+                rows = export_copy(selected, out)
+            else:
+                rows = write_rows(iter_cursor_rows(selected), out, fmt)
+    finally:
+        repository.close()
+
+    versions = [version for version in map(parse_run_version, selected) if version is not None]
+    return {"runs": len(selected), "rows": rows, "last_version": max(versions, default=since_version)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="File to write; a .gz suffix compresses it")
+    parser.add_argument("--format", choices=("csv", "jsonl"),
+                        help="Output format (default: from the file name, else csv)")
+    parser.add_argument("--compress", action="store_true", help="gzip the output")
+    parser.add_argument("--runs", nargs="+", metavar="NAME", help="Runs to export (default: all)")
+    parser.add_argument("--since-version", type=int, metavar="N", help="Only export runs with a version above N")
+    parser.add_argument("--method", choices=("copy", "cursor"), help="How rows are read from PostgreSQL")
+    parser.add_argument("--no-header", action="store_true", help="Omit the CSV header row")
+    args = parser.parse_args()
+    fmt = args.format or ("jsonl" if ".jsonl" in args.output else "csv")
+    if args.method == "copy" and fmt != "csv":
+        parser.error("--method copy only supports CSV")
+    try:
+        config.get_settings().validate(api=False)
+    except config.ConfigError as e:
+        parser.exit(2, f"Configuration error: {e}\n")
+
+    try:
+        summary = export(args.output, fmt, args.compress, args.runs, args.since_version, args.method,
+                         header=not args.no_header)
+    except Exception as e:
+        log_error(f"Export failed: {e}")
+        raise
+    log_info(f"Exported {summary['rows']} winners from {summary['runs']} runs to {args.output}")
+    if summary["last_version"] is not None:
+        log_info(f"Latest exported version: {summary['last_version']} "
+                 f"(pass --since-version {summary['last_version']} to export only newer runs)")
+
+
+if __name__ == "__main__":
+    main()
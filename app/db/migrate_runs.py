@@ -0,0 +1,129 @@
+"""
+Migrates table-per-run winners tables into the single winners table.
+
+Every legacy table (named TABLE_PREFIX + "YYYYmmdd_HHMMSS_v<version>") is
+registered in the run registry under its own name and its rows are copied into
+the winners table, one transaction per table. Tables that are already
+registered are skipped, so the migration can be re-run safely.
+
+Usage:
+    python -m app.db.migrate_runs [--drop-tables] [--dry-run]
+"""
+import argparse
+import re
+from datetime import datetime
+from app.db.db_connection import get_connection, close_connection
+from app.repositories.base import is_run_table
+from app.repositories.single_table_repository import ensure_schema
+from app.utils import config
+from app.utils.constants import RUNS_TABLE, WINNERS_TABLE
+from app.utils.logger import log_info, log_error
+
+
+def parse_legacy_table_name(table_name: str):
+    """
+    Parses a legacy run table name.
+
+    Returns:
+        tuple: (created_at, version), or None if the name is not a run table.
+    """
+    if not is_run_table(table_name):
+        return None
+    match = re.fullmatch(rf"{re.escape(config.TABLE_PREFIX)}(\d{{8}}_\d{{6}})_v(\d+)", table_name)
+    return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S"), int(match.group(2))
+
+
+def find_legacy_tables() -> list:
+    """
+    Returns the legacy run tables of the current schema, oldest first.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT table_name FROM information_schema.tables "
+                "WHERE table_schema = current_schema() AND table_name LIKE %s",
+                (config.TABLE_PREFIX + "%",),
+            )
+            # A plain LIKE on the prefix would also match the winners table
+            names = [row[0] for row in cursor.fetchall() if is_run_table(row[0])]
+    legacy = sorted((parse_legacy_table_name(name), name) for name in names)
+    return [name for _, name in legacy]
+
+
+def migrate_table(table_name: str, drop_table: bool = False) -> int:
+    """
+    Copies one legacy table into the winners table under a new run.
+
+    Returns:
+        int: Number of winners copied, or -1 if the table was already migrated.
+    """
+    created_at, _ = parse_legacy_table_name(table_name)
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {RUNS_TABLE} (name, created_at) VALUES (%s, %s) "
+                "ON CONFLICT (name) DO NOTHING RETURNING id",
+                (table_name, created_at),
+            )
+            registered = cursor.fetchone()
+            if registered is None:
+                conn.rollback()
+                return -1
+            cursor.execute(
+                f"INSERT INTO {WINNERS_TABLE} (run_id, id, email, state) "
+                f"SELECT %s, id, email, state FROM {table_name}",
+                (registered[0],),
+            )
+            copied = cursor.rowcount
+            if drop_table:
+                cursor.execute(f"DROP TABLE {table_name}")
+        conn.commit()
+    return copied
+
+
+def migrate(drop_tables: bool = False, dry_run: bool = False) -> dict:
+    """
+    Migrates every legacy run table.
+
+    Returns:
+        dict: Counts of migrated and skipped tables and copied winners.
+    """
+    ensure_schema()
+    tables = find_legacy_tables()
+    summary = {"tables": len(tables), "migrated": 0, "skipped": 0, "winners": 0}
+    for table_name in tables:
+        if dry_run:
+            log_info(f"Would migrate {table_name}")
+            continue
+        copied = migrate_table(table_name, drop_tables)
+        if copied < 0:
+            summary["skipped"] += 1
+            log_info(f"Skipped {table_name}: already migrated")
+        else:
+            summary["migrated"] += 1
+            summary["winners"] += copied
+            log_info(f"Migrated {copied} winners from {table_name}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drop-tables", action="store_true", help="Drop each legacy table once it is migrated")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the tables that would be migrated")
+    args = parser.parse_args()
+    try:
+        config.get_settings().validate(database=True, api=False)
+    except config.ConfigError as e:
+        parser.exit(2, f"Configuration error: {e}\n")
+    try:
+        summary = migrate(args.drop_tables, args.dry_run)
+        log_info(f"Migration finished: {summary}")
+    except Exception as e:
+        log_error(f"Migration failed: {e}")
+        raise
+    finally:
+        close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Summary tables of every lottery run, kept up to date as runs finish.
+
+Instead of scanning every run's winners, historical questions are answered
+from two small tables that each finished run adds to exactly once:
+
+- state_stats: per state, the runs it had a winner in and the winners replaced
+- daily_run_stats: per day, the runs, winners, replacements and users processed
+
+summarized_runs records which runs have been added, so recording a run is
+idempotent and runs finished before the summary existed can be backfilled
+from their stored winners with `python -m app.repositories.analytics_repository`.
+"""
+import re
+from datetime import date, datetime
+from psycopg2.extras import execute_values
+from app.db.db_connection import get_connection
+from app.utils.constants import STATE_STATS_TABLE, DAILY_RUN_STATS_TABLE, SUMMARIZED_RUNS_TABLE
+from app.utils.logger import log_info
+
+# Creation timestamp in versioned run names, e.g. winner_20240101_120000_v3
+RUN_TIMESTAMP_PATTERN = re.compile(r"_(\d{8})_\d{6}_v\d+$")
+
+SCHEMA_STATEMENTS = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {SUMMARIZED_RUNS_TABLE} (
+        name TEXT PRIMARY KEY,
+        summarized_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {STATE_STATS_TABLE} (
+        state TEXT PRIMARY KEY,
+        wins BIGINT NOT NULL DEFAULT 0,
+        replacements BIGINT NOT NULL DEFAULT 0,
+        last_run TEXT
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {DAILY_RUN_STATS_TABLE} (
+        day DATE PRIMARY KEY,
+        runs BIGINT NOT NULL DEFAULT 0,
+        winners BIGINT NOT NULL DEFAULT 0,
+        replacements BIGINT NOT NULL DEFAULT 0,
+        users_processed BIGINT NOT NULL DEFAULT 0
+    )
+    """,
+]
+
+# Whether the summary tables are known to exist in this process
+_schema_ready = False
+
+
+def ensure_schema():
+    """
+    Creates the summary tables if they do not exist yet.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (STATE_STATS_TABLE,))
+            for statement in SCHEMA_STATEMENTS:
+                cursor.execute(statement)
+        conn.commit()
+    _schema_ready = True
+
+
+def run_day(run_name: str) -> date:
+    """
+    Returns the day a run was created, from its name; today if the name has no timestamp.
+    """
+    match = RUN_TIMESTAMP_PATTERN.search(run_name)
+    return datetime.strptime(match.group(1), "%Y%m%d").date() if match else date.today()
+
+
+def record_run(run_name: str, winners_by_state: dict, replacements_by_state: dict = None,
+               users_processed: int = 0) -> bool:
+    """
+    Adds a finished run to the summary tables, in one transaction.
+
+    Args:
+        run_name (str): Name of the run's table.
+        winners_by_state (dict): The run's final winners, state -> email.
+        replacements_by_state (dict): Winners replaced during the run, per state.
+        users_processed (int): Users the run looked at.
+
+    Returns:
+        bool: False if the run had already been summarized, else True.
+    """
+    ensure_schema()
+    replacements_by_state = replacements_by_state or {}
+    states = set(winners_by_state) | set(replacements_by_state)
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {SUMMARIZED_RUNS_TABLE} (name) VALUES (%s) ON CONFLICT (name) DO NOTHING RETURNING name",
+                (run_name,),
+            )
+            if cursor.fetchone() is None:
+                conn.rollback()
+                return False
+            if states:
+                execute_values(
+                    cursor,
+                    f"""
+                    INSERT INTO {STATE_STATS_TABLE} AS s (state, wins, replacements, last_run) VALUES %s
+                    ON CONFLICT (state) DO UPDATE SET
+                        wins = s.wins + EXCLUDED.wins,
+                        replacements = s.replacements + EXCLUDED.replacements,
+                        last_run = COALESCE(EXCLUDED.last_run, s.last_run)
+                    """,
+                    [(state, int(state in winners_by_state), replacements_by_state.get(state, 0),
+                      run_name if state in winners_by_state else None) for state in sorted(states)],
+                )
+            cursor.execute(
+                f"""
+                INSERT INTO {DAILY_RUN_STATS_TABLE} AS d (day, runs, winners, replacements, users_processed)
+                VALUES (%s, 1, %s, %s, %s)
+                ON CONFLICT (day) DO UPDATE SET
+                    runs = d.runs + 1,
+                    winners = d.winners + EXCLUDED.winners,
+                    replacements = d.replacements + EXCLUDED.replacements,
+                    users_processed = d.users_processed + EXCLUDED.users_processed
+                """,
+                (run_day(run_name), len(winners_by_state), sum(replacements_by_state.values()), users_processed),
+            )
+        conn.commit()
+    log_info("Added run %s to the summary tables", run_name, category="repository")
+    return True
+
+
+def get_wins_by_state() -> list:
+    """
+    Returns (state, wins, replacements, last_run) rows, most wins first.
+    """
+    ensure_schema()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"SELECT state, wins, replacements, last_run FROM {STATE_STATS_TABLE} ORDER BY wins DESC, state"
+            )
+            return cursor.fetchall()
+
+
+def get_runs_per_day(since: date = None) -> list:
+    """
+    Returns (day, runs, winners, replacements, users_processed) rows, oldest day first.
+    """
+    ensure_schema()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"SELECT day, runs, winners, replacements, users_processed FROM {DAILY_RUN_STATS_TABLE} "
+                "WHERE day >= COALESCE(%s, '-infinity'::date) ORDER BY day",
+                (since,),
+            )
+            return cursor.fetchall()
+
+
+def get_summarized_runs() -> set:
+    """
+    Returns the names of every run in the summary tables.
+    """
+    ensure_schema()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT name FROM {SUMMARIZED_RUNS_TABLE}")
+            return {name for (name,) in cursor.fetchall()}
+
+
+def backfill(repository) -> int:
+    """
+    Summarizes every finished run that is not in the summary tables yet.
+
+    Runs still in progress are summarized when they finish, and abandoned runs
+    never are. Replacements were never stored, so backfilled runs count none.
+
+    Returns:
+        int: Number of runs added.
+    """
+    summarized = get_summarized_runs()
+    added = 0
+    for run_name in repository.get_finished_run_names():
+        if run_name not in summarized:
+            added += record_run(run_name, repository.get_winners_by_state(run_name))
+    return added
+
+
+def main():
+    from app.repositories.factory import create_winner_repository
+    repository = create_winner_repository("postgres")
+    try:
+        added = backfill(repository)
+        log_info(f"Backfilled {added} runs into the summary tables")
+    finally:
+        repository.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime
+from app.utils import config
+from app.utils.logger import log_winner
+
+# Statuses of a run in the run registry
+RUN_RUNNING = "running"
+RUN_INTERRUPTED = "interrupted"
+RUN_COMPLETE = "complete"
+RUN_ABANDONED = "abandoned"
+
+
+class WinnerRepository(ABC):
+    """
+    Storage interface for lottery winners.
+
+    Every lottery run writes to its own versioned table, identified by the name
+    returned from create_versioned_table(). Services depend only on this interface;
+    the concrete backend is chosen by get_winner_repository().
+    """
+
+    @abstractmethod
+    def get_new_version(self) -> int:
+        """
+        Retrieves the next version number for a new table.
+        """
+
+    @abstractmethod
+    def create_versioned_table(self, version: int) -> str:
+        """
+        Creates a new versioned winners table and returns its name.
+
+        The run is registered as RUN_RUNNING in the same step, so that it never
+        appears without a status, which only legacy runs have.
+        """
+
+    @abstractmethod
+    def insert_winner(self, email: str, state: str, table_name: str) -> bool:
+        """
+        Inserts a new winner or updates an existing entry for a given state.
+
+        Returns:
+            bool: True if an existing winner was replaced, else False.
+        """
+
+    @abstractmethod
+    def upsert_winners(self, rows: list, table_name: str) -> list:
+        """
+        Inserts or updates a batch of (email, state) rows, last write per state winning.
+
+        Returns:
+            list: (email, state, is_update) tuples, one per input row, in input order.
+        """
+
+    @abstractmethod
+    def get_winners(self, table_name: str) -> list:
+        """
+        Retrieves all winners from a given table as (id, email, state) rows.
+        """
+
+    @abstractmethod
+    def get_winners_by_state(self, table_name: str) -> dict:
+        """
+        Returns the current winners of a given table as a state -> email mapping.
+        """
+
+    @abstractmethod
+    def get_winner_count(self, table_name: str) -> int:
+        """
+        Returns the count of winners in a given table.
+        """
+
+    @abstractmethod
+    def get_run_names(self) -> list:
+        """
+        Returns the names of every run's table, oldest first.
+        """
+
+    @abstractmethod
+    def has_won(self, email: str, exclude=()) -> bool:
+        """
+        Returns True if the email is a winner in any run, using indexed lookups.
+
+        Args:
+            email (str): Email to look up.
+            exclude (iterable): Names of runs to leave out, e.g. those in progress.
+        """
+
+    @abstractmethod
+    def record_run_progress(self, table_name: str, status: str, users_processed: int = 0, batches: int = 0):
+        """
+        Records the status and progress of a run in the run registry, registering it on first use.
+
+        Every call also renews the run's claim: a run marked running that has not
+        been updated for a while is presumed to belong to a dead process.
+
+        Args:
+            status (str): RUN_RUNNING, RUN_INTERRUPTED, RUN_COMPLETE or RUN_ABANDONED.
+            users_processed (int): Users the run has processed so far.
+            batches (int): Batches the run has written so far.
+        """
+
+    @abstractmethod
+    def claim_incomplete_runs(self, limit: int, stale_after: float) -> list:
+        """
+        Atomically marks up to limit resumable runs as running again and returns them, oldest first.
+
+        A run is resumable if it was interrupted, or is still marked running but has
+        not been updated for stale_after seconds, and its winners still exist. Runs
+        of live processes are never returned, and no run is returned to two callers.
+
+        Returns:
+            list: (name, users_processed, batches) tuples.
+        """
+
+    @abstractmethod
+    def abandon_incomplete_runs(self, stale_after: float) -> list:
+        """
+        Atomically marks every resumable run (see claim_incomplete_runs) as abandoned.
+
+        Returns:
+            list: Names of the abandoned runs.
+        """
+
+    @abstractmethod
+    def get_run_statuses(self) -> dict:
+        """
+        Returns the status of every run in the run registry as a name -> status mapping.
+        """
+
+    def get_finished_run_names(self) -> list:
+        """
+        Returns the names of every completed run, oldest first.
+
+        Runs stored before the run registry existed have no status and count as completed.
+        """
+        statuses = self.get_run_statuses()
+        return [name for name in self.get_run_names() if statuses.get(name, RUN_COMPLETE) == RUN_COMPLETE]
+
+    def release_run(self, table_name: str):
+        """
+        Releases resources held for a finished run, e.g. its prepared statements.
+        """
+
+    def close(self):
+        """
+        Releases any resources held by the repository.
+        """
+
+
+def versioned_table_name(version: int) -> str:
+    """
+    Returns the name of a new versioned winners table.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{config.TABLE_PREFIX}{timestamp}_v{version}"
+
+
+def is_run_table(name: str) -> bool:
+    """
+    Returns True if name is a versioned winners table name.
+
+    A plain LIKE on TABLE_PREFIX is not enough: with the default "winner_",
+    the "_" wildcard also matches e.g. the single-table schema's "winners".
+    """
+    return re.fullmatch(rf"{re.escape(config.TABLE_PREFIX)}\d{{8}}_\d{{6}}_v\d+", name) is not None
+
+
+def last_email_by_state(rows: list) -> dict:
+    """
+    Collapses (email, state) rows to the last email per state, as sequential writes would.
+    """
+    last_emails = {}
+    for email, state in rows:
+        last_emails[state] = email
+    return last_emails
+
+
+def upsert_results(rows: list, inserted_states: set, table_name: str) -> list:
+    """
+    Expands the states a batch upsert inserted into per-row insert/update results.
+
+    Only the first row of a newly inserted state is an insert; every other row
+    replaced an earlier winner. Each row is logged with log_winner.
+
+    Returns:
+        list: (email, state, is_update) tuples, one per input row, in input order.
+    """
+    inserted_states = set(inserted_states)
+    results = []
+    for email, state in rows:
+        is_update = state not in inserted_states
+        inserted_states.discard(state)
+        results.append((email, state, is_update))
+        log_winner(email, state, table_name, is_update=is_update)
+    return results
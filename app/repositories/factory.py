@@ -0,0 +1,73 @@
+import threading
+from app.repositories.base import WinnerRepository
+from app.repositories.instrumented_repository import InstrumentedWinnerRepository
+from app.utils import config
+
+# Shared repository instance
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def create_winner_repository(backend: str = None) -> WinnerRepository:
+    """
+    Creates a winner repository for the given storage backend.
+
+    Backend modules are imported on demand so that, for example, the in-memory
+    backend works without psycopg2 being installed.
+
+    Args:
+        backend (str): "postgres", "sqlite" or "memory"; defaults to STORAGE_BACKEND.
+            For "postgres", SCHEMA_MODE picks table-per-run or single-table storage.
+    """
+    backend = backend or config.STORAGE_BACKEND
+    if backend == "postgres" and config.SCHEMA_MODE == "single":
+        from app.repositories.single_table_repository import SingleTableWinnerRepository
+        return SingleTableWinnerRepository()
+    if backend == "postgres":
+        from app.repositories.postgres_repository import PostgresWinnerRepository
+        return PostgresWinnerRepository()
+    if backend == "sqlite":
+        from app.repositories.sqlite_repository import SQLiteWinnerRepository
+        return SQLiteWinnerRepository(config.SQLITE_PATH)
+    if backend == "memory":
+        from app.repositories.memory_repository import MemoryWinnerRepository
+        return MemoryWinnerRepository()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+def get_winner_repository() -> WinnerRepository:
+    """
+    Returns the shared winner repository, creating it on first use.
+
+    Unless metrics are disabled, the backend is wrapped so that every operation
+    is instrumented.
+    """
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                repository = create_winner_repository()
+                if config.METRICS_CONFIG["enabled"]:
+                    repository = InstrumentedWinnerRepository(repository)
+                _repository = repository
+    return _repository
+
+
+def set_winner_repository(repository: WinnerRepository):
+    """
+    Replaces the shared winner repository, e.g. to inject a specific backend.
+    """
+    global _repository
+    with _repository_lock:
+        _repository = repository
+
+
+def close_winner_repository():
+    """
+    Closes the shared winner repository if it is open.
+    """
+    global _repository
+    with _repository_lock:
+        if _repository:
+            _repository.close()
+            _repository = None
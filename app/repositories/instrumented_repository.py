@@ -0,0 +1,76 @@
+from app.repositories.base import WinnerRepository
+from app.utils.metrics import timed, record_winner_writes
+
+
+class InstrumentedWinnerRepository(WinnerRepository):
+    """
+    Wraps any backend, recording calls, latency and rows of every repository operation.
+
+    Operations are reported as lottery_db_operation_*{operation=...}, and written
+    winners as lottery_winner_writes_total{kind="insert"|"update"}.
+    """
+
+    def __init__(self, repository: WinnerRepository):
+        self.repository = repository
+
+    @timed("db_operation", operation="get_new_version")
+    def get_new_version(self) -> int:
+        return self.repository.get_new_version()
+
+    @timed("db_operation", operation="create_versioned_table")
+    def create_versioned_table(self, version: int) -> str:
+        return self.repository.create_versioned_table(version)
+
+    @timed("db_operation", rows=lambda is_update: 1, operation="insert_winner")
+    def insert_winner(self, email: str, state: str, table_name: str) -> bool:
+        is_update = self.repository.insert_winner(email, state, table_name)
+        record_winner_writes([(email, state, bool(is_update))])
+        return is_update
+
+    @timed("db_operation", rows=len, operation="upsert_winners")
+    def upsert_winners(self, rows: list, table_name: str) -> list:
+        results = self.repository.upsert_winners(rows, table_name)
+        record_winner_writes(results)
+        return results
+
+    @timed("db_operation", rows=len, operation="get_winners")
+    def get_winners(self, table_name: str) -> list:
+        return self.repository.get_winners(table_name)
+
+    @timed("db_operation", rows=len, operation="get_winners_by_state")
+    def get_winners_by_state(self, table_name: str) -> dict:
+        return self.repository.get_winners_by_state(table_name)
+
+    @timed("db_operation", operation="get_winner_count")
+    def get_winner_count(self, table_name: str) -> int:
+        return self.repository.get_winner_count(table_name)
+
+    @timed("db_operation", rows=len, operation="get_run_names")
+    def get_run_names(self) -> list:
+        return self.repository.get_run_names()
+
+    @timed("db_operation", operation="has_won")
+    def has_won(self, email: str, exclude=()) -> bool:
+        return self.repository.has_won(email, exclude)
+
+    @timed("db_operation", operation="record_run_progress")
+    def record_run_progress(self, table_name: str, status: str, users_processed: int = 0, batches: int = 0):
+        self.repository.record_run_progress(table_name, status, users_processed, batches)
+
+    @timed("db_operation", rows=len, operation="claim_incomplete_runs")
+    def claim_incomplete_runs(self, limit: int, stale_after: float) -> list:
+        return self.repository.claim_incomplete_runs(limit, stale_after)
+
+    @timed("db_operation", rows=len, operation="abandon_incomplete_runs")
+    def abandon_incomplete_runs(self, stale_after: float) -> list:
+        return self.repository.abandon_incomplete_runs(stale_after)
+
+    @timed("db_operation", rows=len, operation="get_run_statuses")
+    def get_run_statuses(self) -> dict:
+        return self.repository.get_run_statuses()
+
+    def release_run(self, table_name: str):
+        self.repository.release_run(table_name)
+
+    def close(self):
+        self.repository.close()
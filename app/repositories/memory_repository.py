@@ -0,0 +1,153 @@
+import threading
+import time
+from app.repositories.base import (
+    WinnerRepository, versioned_table_name, last_email_by_state, upsert_results,
+    RUN_RUNNING, RUN_INTERRUPTED, RUN_ABANDONED
+)
+from app.utils.logger import log_info, log_winner
+
+
+class MemoryTable:
+    """
+    One in-memory winners table with the uniqueness rules of the SQL schema:
+    one winner per state and one state per email.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.states_by_email = {}
+        self.next_id = 1
+
+    def check(self, email: str, state: str):
+        """
+        Raises ValueError if writing the winner would break email uniqueness.
+        """
+        other_state = self.states_by_email.get(email)
+        if other_state is not None and other_state != state:
+            raise ValueError(f"Email {email} already won for {other_state}")
+
+    def write(self, email: str, state: str) -> bool:
+        """
+        Writes one winner and returns True if it replaced an existing one.
+        """
+        self.check(email, state)
+        if state in self.rows:
+            winner_id, old_email = self.rows[state]
+            del self.states_by_email[old_email]
+            self.rows[state] = (winner_id, email)
+            self.states_by_email[email] = state
+            return True
+        self.rows[state] = (self.next_id, email)
+        self.states_by_email[email] = state
+        self.next_id += 1
+        return False
+
+
+class MemoryWinnerRepository(WinnerRepository):
+    """
+    Pure in-memory backend for high-volume simulations and tests.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        # Run registry: name -> (status, users_processed, batches, updated_at), oldest first
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def get_new_version(self) -> int:
+        with self._lock:
+            version = len(self._tables) + 1
+        log_info("Generated new version: %s", version, category="repository")
+        return version
+
+    def create_versioned_table(self, version: int) -> str:
+        table_name = versioned_table_name(version)
+        with self._lock:
+            self._tables.setdefault(table_name, MemoryTable())
+            self._runs.setdefault(table_name, (RUN_RUNNING, 0, 0, time.time()))
+        log_info("Created new table: %s", table_name, category="repository")
+        return table_name
+
+    def insert_winner(self, email: str, state: str, table_name: str) -> bool:
+        with self._lock:
+            is_update = self._table(table_name).write(email, state)
+        log_winner(email, state, table_name, is_update=is_update)
+        return is_update
+
+    def upsert_winners(self, rows: list, table_name: str) -> list:
+        if not rows:
+            return []
+        last_emails = last_email_by_state(rows)
+        with self._lock:
+            table = self._table(table_name)
+            # Validate the whole batch first so a failing batch changes nothing
+            batch_states = {}
+            for state, email in last_emails.items():
+                table.check(email, state)
+                if batch_states.setdefault(email, state) != state:
+                    raise ValueError(f"Email {email} appears for both {batch_states[email]} and {state}")
+            inserted = {state for state, email in last_emails.items() if not table.write(email, state)}
+        return upsert_results(rows, inserted, table_name)
+
+    def get_winners(self, table_name: str) -> list:
+        with self._lock:
+            winners = [(winner_id, email, state) for state, (winner_id, email) in self._table(table_name).rows.items()]
+        log_info("Fetched %s winners from %s", len(winners), table_name, category="repository")
+        return winners
+
+    def get_winners_by_state(self, table_name: str) -> dict:
+        with self._lock:
+            winners = {state: email for state, (_, email) in self._table(table_name).rows.items()}
+        log_info("Loaded %s winners by state from %s", len(winners), table_name, category="repository")
+        return winners
+
+    def get_winner_count(self, table_name: str) -> int:
+        with self._lock:
+            count = len(self._table(table_name).rows)
+        log_info("Total winners in %s: %s", table_name, count, category="repository")
+        return count
+
+    def get_run_names(self) -> list:
+        with self._lock:
+            return list(self._tables)
+
+    def has_won(self, email: str, exclude=()) -> bool:
+        exclude = set(exclude)
+        with self._lock:
+            return any(email in table.states_by_email
+                       for name, table in self._tables.items() if name not in exclude)
+
+    def record_run_progress(self, table_name: str, status: str, users_processed: int = 0, batches: int = 0):
+        with self._lock:
+            self._runs[table_name] = (status, users_processed, batches, time.time())
+
+    def claim_incomplete_runs(self, limit: int, stale_after: float) -> list:
+        with self._lock:
+            claimed = self._resumable_runs(stale_after)[:limit]
+            for name in claimed:
+                _, users_processed, batches, _ = self._runs[name]
+                self._runs[name] = (RUN_RUNNING, users_processed, batches, time.time())
+            return [(name, *self._runs[name][1:3]) for name in claimed]
+
+    def abandon_incomplete_runs(self, stale_after: float) -> list:
+        with self._lock:
+            abandoned = self._resumable_runs(stale_after)
+            for name in abandoned:
+                _, users_processed, batches, _ = self._runs[name]
+                self._runs[name] = (RUN_ABANDONED, users_processed, batches, time.time())
+            return abandoned
+
+    def get_run_statuses(self) -> dict:
+        with self._lock:
+            return {name: status for name, (status, *_) in self._runs.items()}
+
+    def _resumable_runs(self, stale_after: float) -> list:
+        stale = time.time() - stale_after
+        return [name for name, (status, _, _, updated_at) in self._runs.items()
+                if name in self._tables and (status == RUN_INTERRUPTED or status == RUN_RUNNING and updated_at < stale)]
+
+    def _table(self, table_name: str) -> MemoryTable:
+        try:
+            return self._tables[table_name]
+        except KeyError:
+            raise KeyError(f"Table {table_name} does not exist") from None
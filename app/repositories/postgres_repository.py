@@ -0,0 +1,54 @@
+from app.db.db_connection import close_connection
+from app.repositories import winner_repository
+from app.repositories.base import WinnerRepository
+
+
+class PostgresWinnerRepository(WinnerRepository):
+    """
+    PostgreSQL backend, storing each run in its own table through the shared connection pool.
+    """
+
+    def get_new_version(self) -> int:
+        return winner_repository.get_new_version()
+
+    def create_versioned_table(self, version: int) -> str:
+        return winner_repository.create_versioned_table(version)
+
+    def insert_winner(self, email: str, state: str, table_name: str) -> bool:
+        return winner_repository.insert_winner(email, state, table_name)
+
+    def upsert_winners(self, rows: list, table_name: str) -> list:
+        return winner_repository.upsert_winners(rows, table_name)
+
+    def get_winners(self, table_name: str) -> list:
+        return winner_repository.get_winners(table_name)
+
+    def get_winners_by_state(self, table_name: str) -> dict:
+        return winner_repository.get_winners_by_state(table_name)
+
+    def get_winner_count(self, table_name: str) -> int:
+        return winner_repository.get_winner_count(table_name)
+
+    def get_run_names(self) -> list:
+        return winner_repository.get_run_names()
+
+    def has_won(self, email: str, exclude=()) -> bool:
+        return winner_repository.has_won(email, exclude)
+
+    def record_run_progress(self, table_name: str, status: str, users_processed: int = 0, batches: int = 0):
+        winner_repository.record_run_progress(table_name, status, users_processed, batches)
+
+    def claim_incomplete_runs(self, limit: int, stale_after: float) -> list:
+        return winner_repository.claim_incomplete_runs(limit, stale_after)
+
+    def abandon_incomplete_runs(self, stale_after: float) -> list:
+        return winner_repository.abandon_incomplete_runs(stale_after)
+
+    def get_run_statuses(self) -> dict:
+        return winner_repository.get_run_statuses()
+
+    def release_run(self, table_name: str):
+        winner_repository.release_run(table_name)
+
+    def close(self):
+        close_connection()
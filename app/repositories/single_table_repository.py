@@ -0,0 +1,315 @@
+import threading
+from psycopg2.extras import execute_values
+from app.db.db_connection import get_connection, close_connection
+from app.repositories.base import (
+    WinnerRepository, versioned_table_name, last_email_by_state, upsert_results,
+    RUN_RUNNING, RUN_INTERRUPTED, RUN_COMPLETE, RUN_ABANDONED
+)
+from app.utils import config
+from app.utils.constants import RUNS_TABLE, WINNERS_TABLE
+from app.utils.logger import log_info, log_warning, log_winner
+
+
+def schema_statements(partitions: int = 0) -> list:
+    """
+    Returns the idempotent DDL of the run registry and the shared winners table.
+
+    Args:
+        partitions (int): Number of hash partitions on run_id; 0 keeps the
+            winners table unpartitioned.
+    """
+    # On a partitioned table every unique constraint has to include the
+    # partition key, which (run_id, ...) keys do by construction.
+    partitioning = " PARTITION BY HASH (run_id)" if partitions else ""
+    statements = [
+        f"CREATE SEQUENCE IF NOT EXISTS {RUNS_TABLE}_id_seq",
+        f"""
+        CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+            id BIGINT PRIMARY KEY DEFAULT nextval('{RUNS_TABLE}_id_seq'),
+            name TEXT UNIQUE NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        # Status and progress of each run; runs registered before these existed (or migrated
+        # from table-per-run storage) count as complete, new runs are inserted as running
+        f"ALTER TABLE {RUNS_TABLE} ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT '{RUN_COMPLETE}'",
+        f"ALTER TABLE {RUNS_TABLE} ADD COLUMN IF NOT EXISTS users_processed BIGINT NOT NULL DEFAULT 0",
+        f"ALTER TABLE {RUNS_TABLE} ADD COLUMN IF NOT EXISTS batches BIGINT NOT NULL DEFAULT 0",
+        f"ALTER TABLE {RUNS_TABLE} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+        f"""
+        CREATE TABLE IF NOT EXISTS {WINNERS_TABLE} (
+            run_id BIGINT NOT NULL REFERENCES {RUNS_TABLE} (id),
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+            email TEXT NOT NULL,
+            state TEXT NOT NULL,
+            PRIMARY KEY (run_id, id),
+            UNIQUE (run_id, state),
+            UNIQUE (run_id, email)
+        ){partitioning}
+        """,
+    ]
+    statements += [
+        f"""
+        CREATE TABLE IF NOT EXISTS {WINNERS_TABLE}_p{remainder} PARTITION OF {WINNERS_TABLE}
+        FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})
+        """
+        for remainder in range(partitions)
+    ]
+    # Cross-run lookups ("has this email ever won?") use this index
+    statements.append(f"CREATE INDEX IF NOT EXISTS {WINNERS_TABLE}_email_idx ON {WINNERS_TABLE} (email)")
+    return statements
+
+
+def ensure_schema(partitions: int = None):
+    """
+    Creates the run registry and the winners table if they do not exist yet.
+
+    Args:
+        partitions (int): Hash partitions of a newly created winners table;
+            defaults to WINNERS_PARTITIONS.
+    """
+    if partitions is None:
+        partitions = config.WINNERS_PARTITIONS
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            # Serialise concurrent first starts; CREATE ... IF NOT EXISTS alone can still race
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (WINNERS_TABLE,))
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (WINNERS_TABLE,))
+            existing = cursor.fetchone()
+            if partitions and existing and existing[0] != "p":
+                log_warning("%s already exists unpartitioned; ignoring WINNERS_PARTITIONS=%s",
+                            WINNERS_TABLE, partitions, category="repository")
+                partitions = 0
+            for statement in schema_statements(partitions):
+                cursor.execute(statement)
+        conn.commit()
+
+
+# Resumable runs, oldest first; parameters: interrupted, running, stale seconds
+RESUMABLE_RUNS_QUERY = f"""
+    SELECT id FROM {RUNS_TABLE}
+    WHERE status = %s OR (status = %s AND updated_at < now() - make_interval(secs => %s))
+    ORDER BY id
+"""
+
+
+def upsert_query(run_id: int) -> str:
+    """
+    Returns the upsert of winners into one run, with a VALUES %s placeholder.
+
+    The query returns (state, inserted) per written row. Partitioned tables do
+    not expose xmax in RETURNING, so inserts are told apart by checking the
+    table as it was before the statement: the main query of a data-modifying
+    WITH does not see the rows written by it.
+    """
+    return f"""
+        WITH upserted AS (
+            INSERT INTO {WINNERS_TABLE} (run_id, email, state) VALUES %s
+            ON CONFLICT (run_id, state) DO UPDATE SET email = EXCLUDED.email
+            RETURNING state
+        )
+        SELECT upserted.state, NOT EXISTS (
+            SELECT 1 FROM {WINNERS_TABLE} w WHERE w.run_id = {int(run_id)} AND w.state = upserted.state
+        ) AS inserted
+        FROM upserted
+    """
+
+
+class SingleTableWinnerRepository(WinnerRepository):
+    """
+    PostgreSQL backend storing every run in one winners table keyed by run_id.
+
+    Runs are registered in the lottery_runs table, whose ids come from a
+    sequence: allocating a version is a single nextval() instead of a scan of
+    information_schema, and concurrent starts can never get the same version.
+    The same table holds each run's status and progress for resuming it.
+    The name returned by create_versioned_table() is the run's registered name,
+    so services keep passing it around exactly as with table-per-run storage.
+    """
+
+    def __init__(self, partitions: int = None):
+        self.partitions = config.WINNERS_PARTITIONS if partitions is None else partitions
+        self._run_ids = {}
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def get_new_version(self) -> int:
+        self._ensure_schema()
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT nextval('{RUNS_TABLE}_id_seq')")
+                version = cursor.fetchone()[0]
+            conn.commit()
+        log_info("Generated new version: %s", version, category="repository")
+        return version
+
+    def create_versioned_table(self, version: int) -> str:
+        self._ensure_schema()
+        run_name = versioned_table_name(version)
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {RUNS_TABLE} (id, name, status) VALUES (%s, %s, %s) RETURNING id",
+                    (version, run_name, RUN_RUNNING),
+                )
+                run_id = cursor.fetchone()[0]
+            conn.commit()
+        with self._lock:
+            self._run_ids[run_name] = run_id
+        log_info("Registered new run %s (run_id %s)", run_name, run_id, category="repository")
+        return run_name
+
+    def insert_winner(self, email: str, state: str, table_name: str) -> bool:
+        run_id = self._run_id(table_name)
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(upsert_query(run_id) % "(%s, %s, %s)", (run_id, email, state))
+                inserted = cursor.fetchone()[1]
+            conn.commit()
+        log_winner(email, state, table_name, is_update=not inserted)
+        return not inserted
+
+    def upsert_winners(self, rows: list, table_name: str) -> list:
+        if not rows:
+            return []
+        run_id = self._run_id(table_name)
+        last_emails = last_email_by_state(rows)
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                inserted = execute_values(
+                    cursor,
+                    upsert_query(run_id),
+                    [(run_id, email, state) for state, email in last_emails.items()],
+                    fetch=True,
+                )
+            conn.commit()
+        return upsert_results(rows, {state for state, was_inserted in inserted if was_inserted}, table_name)
+
+    def get_winners(self, table_name: str) -> list:
+        run_id = self._run_id(table_name)
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT id, email, state FROM {WINNERS_TABLE} WHERE run_id = %s ORDER BY id", (run_id,))
+                winners = cursor.fetchall()
+        log_info("Fetched %s winners from %s", len(winners), table_name, category="repository")
+        return winners
+
+    def get_winners_by_state(self, table_name: str) -> dict:
+        run_id = self._run_id(table_name)
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT state, email FROM {WINNERS_TABLE} WHERE run_id = %s", (run_id,))
+                winners = dict(cursor.fetchall())
+        log_info("Loaded %s winners by state from %s", len(winners), table_name, category="repository")
+        return winners
+
+    def get_winner_count(self, table_name: str) -> int:
+        run_id = self._run_id(table_name)
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM {WINNERS_TABLE} WHERE run_id = %s", (run_id,))
+                count = cursor.fetchone()[0]
+        log_info("Total winners in %s: %s", table_name, count, category="repository")
+        return count
+
+    def get_run_names(self) -> list:
+        self._ensure_schema()
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT name FROM {RUNS_TABLE} ORDER BY id")
+                return [name for (name,) in cursor.fetchall()]
+
+    def has_won(self, email: str, exclude=()) -> bool:
+        self._ensure_schema()
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                # Served by the email index across every run (and partition)
+                cursor.execute(
+                    f"""
+                    SELECT EXISTS (
+                        SELECT 1 FROM {WINNERS_TABLE} w JOIN {RUNS_TABLE} r ON r.id = w.run_id
+                        WHERE w.email = %s AND r.name <> ALL(%s)
+                    )
+                    """,
+                    (email, list(exclude)),
+                )
+                return cursor.fetchone()[0]
+
+    def record_run_progress(self, table_name: str, status: str, users_processed: int = 0, batches: int = 0):
+        run_id = self._run_id(table_name)
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {RUNS_TABLE} SET status = %s, users_processed = %s, batches = %s, updated_at = now() "
+                    "WHERE id = %s",
+                    (status, users_processed, batches, run_id),
+                )
+            conn.commit()
+
+    def claim_incomplete_runs(self, limit: int, stale_after: float) -> list:
+        self._ensure_schema()
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                # Rows claimed by a concurrent caller are locked and skipped
+                cursor.execute(
+                    f"""
+                    WITH claimable AS ({RESUMABLE_RUNS_QUERY} LIMIT %s FOR UPDATE SKIP LOCKED)
+                    UPDATE {RUNS_TABLE} r SET status = %s, updated_at = now()
+                    FROM claimable c WHERE r.id = c.id
+                    RETURNING r.id, r.name, r.users_processed, r.batches
+                    """,
+                    (RUN_INTERRUPTED, RUN_RUNNING, stale_after, limit, RUN_RUNNING),
+                )
+                claimed = cursor.fetchall()
+            conn.commit()
+        return [(name, users_processed, batches) for _, name, users_processed, batches in sorted(claimed)]
+
+    def abandon_incomplete_runs(self, stale_after: float) -> list:
+        self._ensure_schema()
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    WITH abandonable AS ({RESUMABLE_RUNS_QUERY} FOR UPDATE SKIP LOCKED)
+                    UPDATE {RUNS_TABLE} r SET status = %s, updated_at = now()
+                    FROM abandonable a WHERE r.id = a.id
+                    RETURNING r.id, r.name
+                    """,
+                    (RUN_INTERRUPTED, RUN_RUNNING, stale_after, RUN_ABANDONED),
+                )
+                abandoned = cursor.fetchall()
+            conn.commit()
+        return [name for _, name in sorted(abandoned)]
+
+    def get_run_statuses(self) -> dict:
+        self._ensure_schema()
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT name, status FROM {RUNS_TABLE}")
+                return dict(cursor.fetchall())
+
+    def close(self):
+        close_connection()
+
+    def _ensure_schema(self):
+        if not self._schema_ready:
+            ensure_schema(self.partitions)
+            self._schema_ready = True
+
+    def _run_id(self, run_name: str) -> int:
+        """
+        Resolves a run name to its run_id, caching the registry lookup.
+        """
+        with self._lock:
+            run_id = self._run_ids.get(run_name)
+        if run_id is not None:
+            return run_id
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT id FROM {RUNS_TABLE} WHERE name = %s", (run_name,))
+                result = cursor.fetchone()
+        if result is None:
+            raise KeyError(f"Run {run_name} does not exist")
+        with self._lock:
+            self._run_ids[run_name] = result[0]
+        return result[0]
@@ -0,0 +1,216 @@
+import sqlite3
+import threading
+import time
+from app.repositories.base import (
+    WinnerRepository, versioned_table_name, last_email_by_state, upsert_results, is_run_table,
+    RUN_RUNNING, RUN_INTERRUPTED, RUN_ABANDONED
+)
+from app.utils import config
+from app.utils.constants import RUN_STATUS_TABLE
+from app.utils.logger import log_info, log_winner
+
+
+# Run tables probed per has_won() query
+HAS_WON_TABLES_PER_QUERY = 100
+
+# Run registry; updated_at is in seconds since the epoch, so it compares with time.time()
+RUN_STATUS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        name TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        users_processed INTEGER NOT NULL DEFAULT 0,
+        batches INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL NOT NULL
+    )
+"""
+
+
+class SQLiteWinnerRepository(WinnerRepository):
+    """
+    SQLite backend, storing each run in its own table of a single database file.
+
+    One connection is shared by all threads and serialized with a lock, which is
+    plenty for simulations and tests that run without a database server.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._conn:
+            self._conn.execute(RUN_STATUS_SCHEMA.format(table=RUN_STATUS_TABLE))
+            self._migrate_run_status()
+        log_info("SQLite database opened: %s", path, category="repository")
+
+    def get_new_version(self) -> int:
+        version = len(self.get_run_names()) + 1
+        log_info("Generated new version: %s", version, category="repository")
+        return version
+
+    def create_versioned_table(self, version: int) -> str:
+        table_name = versioned_table_name(version)
+        with self._lock, self._conn:
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table_name} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    email TEXT UNIQUE NOT NULL,
+                    state TEXT UNIQUE NOT NULL
+                )
+            """)
+            self._conn.execute(
+                f"INSERT OR IGNORE INTO {RUN_STATUS_TABLE} (name, status, updated_at) VALUES (?, ?, ?)",
+                (table_name, RUN_RUNNING, time.time()),
+            )
+        log_info("Created new table: %s", table_name, category="repository")
+        return table_name
+
+    def insert_winner(self, email: str, state: str, table_name: str) -> bool:
+        with self._lock, self._conn:
+            existing_winner = self._conn.execute(
+                f"SELECT email FROM {table_name} WHERE state = ?", (state,)
+            ).fetchone()
+            if existing_winner:
+                self._conn.execute(f"UPDATE {table_name} SET email = ? WHERE state = ?", (email, state))
+            else:
+                self._conn.execute(f"INSERT INTO {table_name} (email, state) VALUES (?, ?)", (email, state))
+        log_winner(email, state, table_name, is_update=bool(existing_winner))
+        return bool(existing_winner)
+
+    def upsert_winners(self, rows: list, table_name: str) -> list:
+        if not rows:
+            return []
+        last_emails = last_email_by_state(rows)
+        placeholders = ", ".join("?" for _ in last_emails)
+        with self._lock, self._conn:
+            existing = {
+                state for (state,) in self._conn.execute(
+                    f"SELECT state FROM {table_name} WHERE state IN ({placeholders})", list(last_emails)
+                )
+            }
+            self._conn.executemany(
+                f"""
+                INSERT INTO {table_name} (email, state) VALUES (?, ?)
+                ON CONFLICT (state) DO UPDATE SET email = excluded.email
+                """,
+                [(email, state) for state, email in last_emails.items()],
+            )
+        return upsert_results(rows, set(last_emails) - existing, table_name)
+
+    def get_winners(self, table_name: str) -> list:
+        with self._lock:
+            winners = self._conn.execute(f"SELECT id, email, state FROM {table_name}").fetchall()
+        log_info("Fetched %s winners from %s", len(winners), table_name, category="repository")
+        return winners
+
+    def get_winners_by_state(self, table_name: str) -> dict:
+        with self._lock:
+            winners = dict(self._conn.execute(f"SELECT state, email FROM {table_name}").fetchall())
+        log_info("Loaded %s winners by state from %s", len(winners), table_name, category="repository")
+        return winners
+
+    def get_winner_count(self, table_name: str) -> int:
+        with self._lock:
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+        log_info("Total winners in %s: %s", table_name, count, category="repository")
+        return count
+
+    def get_run_names(self) -> list:
+        with self._lock:
+            names = [name for (name,) in self._conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ? ORDER BY name",
+                (config.TABLE_PREFIX + '%',),
+            )]
+        return [name for name in names if is_run_table(name)]
+
+    def has_won(self, email: str, exclude=()) -> bool:
+        exclude = set(exclude)
+        tables = [name for name in self.get_run_names() if name not in exclude]
+        # Each lookup uses the table's unique email index; SQLite caps compound SELECTs
+        for start in range(0, len(tables), HAS_WON_TABLES_PER_QUERY):
+            chunk = tables[start:start + HAS_WON_TABLES_PER_QUERY]
+            query = " UNION ALL ".join(f"SELECT 1 FROM {name} WHERE email = ?" for name in chunk)
+            with self._lock:
+                if self._conn.execute(f"SELECT EXISTS ({query})", [email] * len(chunk)).fetchone()[0]:
+                    return True
+        return False
+
+    def record_run_progress(self, table_name: str, status: str, users_processed: int = 0, batches: int = 0):
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"""
+                INSERT INTO {RUN_STATUS_TABLE} (name, status, users_processed, batches, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET status = excluded.status, users_processed = excluded.users_processed,
+                    batches = excluded.batches, updated_at = excluded.updated_at
+                """,
+                (table_name, status, users_processed, batches, time.time()),
+            )
+
+    def claim_incomplete_runs(self, limit: int, stale_after: float) -> list:
+        now = time.time()
+        # One UPDATE is atomic, so concurrent claims never return the same run
+        with self._lock, self._conn:
+            claimed = self._conn.execute(
+                f"""
+                UPDATE {RUN_STATUS_TABLE} SET status = ?, updated_at = ?
+                WHERE rowid IN ({self._resumable_runs_query()} LIMIT ?)
+                RETURNING rowid, name, users_processed, batches
+                """,
+                (RUN_RUNNING, now, RUN_INTERRUPTED, RUN_RUNNING, now - stale_after, limit),
+            ).fetchall()
+        return [(name, users_processed, batches) for _, name, users_processed, batches in sorted(claimed)]
+
+    def abandon_incomplete_runs(self, stale_after: float) -> list:
+        now = time.time()
+        with self._lock, self._conn:
+            abandoned = self._conn.execute(
+                f"""
+                UPDATE {RUN_STATUS_TABLE} SET status = ?, updated_at = ?
+                WHERE rowid IN ({self._resumable_runs_query()})
+                RETURNING rowid, name
+                """,
+                (RUN_ABANDONED, now, RUN_INTERRUPTED, RUN_RUNNING, now - stale_after),
+            ).fetchall()
+        return [name for _, name in sorted(abandoned)]
+
+    def get_run_statuses(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute(f"SELECT name, status FROM {RUN_STATUS_TABLE}").fetchall())
+
+    def _migrate_run_status(self):
+        """
+        Converts a run registry with TEXT updated_at timestamps to epoch seconds.
+
+        Text always sorts above numbers in SQLite, so such runs would never
+        count as stale. The table is rebuilt in rowid order, which claims follow.
+        """
+        columns = {name: kind for _, name, kind, *_ in self._conn.execute(f"PRAGMA table_info({RUN_STATUS_TABLE})")}
+        if columns["updated_at"].upper() != "TEXT":
+            return
+        migrated = f"{RUN_STATUS_TABLE}_migrated"
+        self._conn.execute(f"DROP TABLE IF EXISTS {migrated}")
+        self._conn.execute(RUN_STATUS_SCHEMA.format(table=migrated))
+        self._conn.execute(f"""
+            INSERT INTO {migrated} (name, status, users_processed, batches, updated_at)
+            SELECT name, status, users_processed, batches, CAST(strftime('%s', updated_at) AS REAL)
+            FROM {RUN_STATUS_TABLE} ORDER BY rowid
+        """)
+        self._conn.execute(f"DROP TABLE {RUN_STATUS_TABLE}")
+        self._conn.execute(f"ALTER TABLE {migrated} RENAME TO {RUN_STATUS_TABLE}")
+        log_info("Converted the timestamps of %s to epoch seconds", RUN_STATUS_TABLE, category="repository")
+
+    @staticmethod
+    def _resumable_runs_query() -> str:
+        """
+        Returns the rowids of resumable runs, oldest first; parameters: interrupted, running, stale cut-off.
+        """
+        return f"""
+            SELECT r.rowid FROM {RUN_STATUS_TABLE} r
+            JOIN sqlite_master t ON t.type = 'table' AND t.name = r.name
+            WHERE r.status = ? OR (r.status = ? AND r.updated_at < ?)
+            ORDER BY r.rowid
+        """
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,152 @@
+"""
+Server-side prepared statements for the per-run winner tables.
+
+Table names cannot be query parameters, so every per-table statement used to
+be rebuilt with the name interpolated and parsed and planned by PostgreSQL on
+each call. Instead, each pooled connection PREPAREs a statement once per
+(table, operation) and later calls only EXECUTE it. Table names are validated
+as run tables and quoted with psycopg2.sql.Identifier when the statement is
+prepared.
+
+Prepared statements live as long as their connection. Each connection's cache
+holds at most STATEMENT_CACHE_SIZE statements (least recently used ones are
+deallocated first), and evict() drops every statement of a finished run from
+all connections, each the next time it is used.
+"""
+import itertools
+import threading
+import weakref
+from collections import OrderedDict
+from psycopg2 import sql
+from app.repositories.base import is_run_table
+from app.utils.constants import STATEMENT_CACHE_SIZE
+
+# Statement text per operation; {table} is the quoted table identifier
+STATEMENTS = {
+    "select": "SELECT * FROM {table}",
+    "by_state": "SELECT state, email FROM {table}",
+    "count": "SELECT COUNT(*) FROM {table}",
+    "upsert": """
+        INSERT INTO {table} (email, state)
+        SELECT * FROM unnest($1::text[], $2::text[])
+        ON CONFLICT (state) DO UPDATE SET email = EXCLUDED.email
+        RETURNING state, (xmax = 0) AS inserted
+    """,
+}
+
+# Parameters of each operation's statement, if any
+STATEMENT_PARAMS = {"upsert": 2}
+
+# Caches of live connections, so evict() can reach all of them
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+class StatementCache:
+    """
+    Prepared statements of one connection, keyed by (table, operation).
+
+    A connection is used by one thread at a time, so only evictions requested
+    from other threads need locking.
+    """
+
+    def __init__(self, size: int = STATEMENT_CACHE_SIZE):
+        self.size = size
+        self.statements = OrderedDict()
+        self.stats = {"prepared": 0, "executed": 0, "deallocated": 0}
+        self._names = itertools.count(1)
+        self._retired = set()
+        # Statements that failed mid-transaction, deallocated once it has ended
+        self._stale = []
+        self._lock = threading.Lock()
+
+    def execute(self, cursor, table_name: str, operation: str, params: tuple = ()):
+        """
+        Executes the operation on table_name, preparing it first if this connection has not yet.
+
+        Raises:
+            ValueError: If table_name is not a run table or the operation is unknown.
+        """
+        self._deallocate_retired(cursor)
+        key = (table_name, operation)
+        statement = self.statements.get(key)
+        if statement is None:
+            statement = self._prepare(cursor, table_name, operation)
+        else:
+            self.statements.move_to_end(key)
+        try:
+            cursor.execute(statement[1], params)
+        except Exception:
+            # The transaction is aborted; prepare a fresh statement next time
+            self._stale.append(self.statements.pop(key)[0])
+            raise
+        self.stats["executed"] += 1
+
+    def _prepare(self, cursor, table_name: str, operation: str) -> str:
+        if not is_run_table(table_name):
+            raise ValueError(f"Not a run table: {table_name!r}")
+        if operation not in STATEMENTS:
+            raise ValueError(f"Unknown statement: {operation!r}")
+        while len(self.statements) >= self.size:
+            _, (oldest, _) = self.statements.popitem(last=False)
+            self._deallocate(cursor, oldest)
+
+        # Generated names need no quoting, so EXECUTE is rendered once, not per call
+        name = f"lottery_{next(self._names)}"
+        statement = sql.SQL(STATEMENTS[operation]).format(table=sql.Identifier(table_name))
+        cursor.execute(sql.SQL("PREPARE {} AS {}").format(sql.Identifier(name), statement))
+        placeholders = ", ".join(["%s"] * STATEMENT_PARAMS.get(operation, 0))
+        self.statements[(table_name, operation)] = (name, f"EXECUTE {name} ({placeholders})" if placeholders
+                                                    else f"EXECUTE {name}")
+        self.stats["prepared"] += 1
+        return self.statements[(table_name, operation)]
+
+    def _deallocate(self, cursor, name: str):
+        cursor.execute(sql.SQL("DEALLOCATE {}").format(sql.Identifier(name)))
+        self.stats["deallocated"] += 1
+
+    def _deallocate_retired(self, cursor):
+        while self._stale:
+            self._deallocate(cursor, self._stale.pop())
+        if not self._retired:
+            return
+        with self._lock:
+            retired, self._retired = self._retired, set()
+        for key in [key for key in self.statements if key[0] in retired]:
+            self._deallocate(cursor, self.statements.pop(key)[0])
+
+    def retire(self, table_name: str):
+        """
+        Marks the statements of table_name for deallocation on this connection's next use.
+        """
+        with self._lock:
+            if any(key[0] == table_name for key in list(self.statements)):
+                self._retired.add(table_name)
+
+
+def statement_cache(conn) -> StatementCache:
+    """
+    Returns the statement cache of a connection, creating it on first use.
+    """
+    with _caches_lock:
+        cache = _caches.get(conn)
+        if cache is None:
+            cache = _caches[conn] = StatementCache()
+        return cache
+
+
+def execute_prepared(cursor, table_name: str, operation: str, params: tuple = ()):
+    """
+    Executes a cached prepared statement of table_name on the cursor's connection.
+    """
+    statement_cache(cursor.connection).execute(cursor, table_name, operation, params)
+
+
+def evict(table_name: str):
+    """
+    Drops the prepared statements of a finished run from every connection.
+    """
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.retire(table_name)
@@ -1,72 +1,123 @@
-from app.db.db_connection import get_db_connection
-from datetime import datetime
-from app.utils.config import TABLE_PREFIX
-from app.utils.logger import log_info, log_error, log_winner
+from app.db.db_connection import get_connection
+from psycopg2 import sql
+from app.repositories.base import (
+    versioned_table_name, last_email_by_state, upsert_results, is_run_table,
+    RUN_RUNNING, RUN_INTERRUPTED, RUN_ABANDONED
+)
+from app.repositories.statement_cache import execute_prepared, evict
+from app.utils import config
+from app.utils.constants import RUN_STATUS_TABLE
+from app.utils.logger import log_info, log_winner
+
+
+# Run tables probed per has_won() query
+HAS_WON_TABLES_PER_QUERY = 100
+
+# Whether the run registry is known to exist in this process
+_run_status_ready = False
 
 
 def get_new_version():
     """
     Retrieves the next version number for a new table.
     """
-    conn = get_db_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT COUNT(*) FROM information_schema.tables WHERE table_name LIKE %s", (TABLE_PREFIX + '%',))
-        result = cursor.fetchone()
-        if result is None:
-            log_error("Failed to retrieve table count. Defaulting to version 1.")
-            return 1
-        version = result[0] + 1
-    log_info(f"Generated new version: {version}")
+    version = len(get_run_names()) + 1
+    log_info("Generated new version: %s", version, category="repository")
     return version
 
 
 def create_versioned_table(version: int):
     """
-    Creates a new versioned winners table.
-    """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    table_name = f"{TABLE_PREFIX}{timestamp}_v{version}"
-    conn = get_db_connection()
-    with conn.cursor() as cursor:
-        cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                id SERIAL PRIMARY KEY,
-                email TEXT UNIQUE NOT NULL,
-                state TEXT UNIQUE NOT NULL
+    Creates a new versioned winners table, registered as a running run.
+    """
+    table_name = versioned_table_name(version)
+    ensure_run_status_table()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("""
+                CREATE TABLE IF NOT EXISTS {} (
+                    id SERIAL PRIMARY KEY,
+                    email TEXT UNIQUE NOT NULL,
+                    state TEXT UNIQUE NOT NULL
+                )
+            """).format(sql.Identifier(table_name)))
+            # In the same transaction, so no reader sees the table unregistered, i.e. as a finished legacy run
+            cursor.execute(
+                f"INSERT INTO {RUN_STATUS_TABLE} (name, status) VALUES (%s, %s) ON CONFLICT (name) DO NOTHING",
+                (table_name, RUN_RUNNING),
             )
-        """)
-        conn.commit()
-    log_info(f"Created new table: {table_name}")
+            conn.commit()
+    log_info("Created new table: %s", table_name, category="repository")
     return table_name
 
 
 def insert_winner(email: str, state: str, table_name: str):
     """
     Inserts a new winner or updates an existing entry for a given state.
+
+    Returns:
+        bool: True if an existing winner was replaced, else False.
     """
-    conn = get_db_connection()
-    with conn.cursor() as cursor:
-        cursor.execute(f"SELECT email FROM {table_name} WHERE state = %s", (state,))
-        existing_winner = cursor.fetchone()
-
-        if existing_winner:
-            cursor.execute(f"UPDATE {table_name} SET email = %s WHERE state = %s", (email, state))
-            log_winner(email, state, table_name, is_update=True)   # For updates
-        else:
-            cursor.execute(f"INSERT INTO {table_name} (email, state) VALUES (%s, %s)", (email, state))
-            log_winner(email, state, table_name, is_update=False)  # For inserts
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            execute_prepared(cursor, table_name, "upsert", ([email], [state]))
+            (_, was_inserted), = cursor.fetchall()
         conn.commit()
+    log_winner(email, state, table_name, is_update=not was_inserted)
+    return not was_inserted
+
+
+def upsert_winners(rows: list, table_name: str) -> list:
+    """
+    Inserts or updates a batch of winners with a single statement and one commit.
+
+    Rows are applied in order, so when a state appears more than once in the batch
+    the last email wins, exactly as with repeated insert_winner calls.
+
+    Args:
+        rows (list): (email, state) tuples in arrival order.
+        table_name (str): Name of the table where winners are stored.
+
+    Returns:
+        list: (email, state, is_update) tuples, one per input row, in input order.
+    """
+    if not rows:
+        return []
+
+    # ON CONFLICT cannot touch the same row twice in one statement, so only the
+    # last row per state is sent while the earlier ones are reported as superseded.
+    last_emails = last_email_by_state(rows)
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            execute_prepared(cursor, table_name, "upsert", (list(last_emails.values()), list(last_emails)))
+            inserted = cursor.fetchall()
+        conn.commit()
+
+    return upsert_results(rows, {state for state, was_inserted in inserted if was_inserted}, table_name)
 
 
 def get_winners(table_name: str):
     """
     Retrieves all winners from a given table.
     """
-    conn = get_db_connection()
-    with conn.cursor() as cursor:
-        cursor.execute(f"SELECT * FROM {table_name}")
-        winners = cursor.fetchall()
-    log_info(f"Fetched {len(winners)} winners from {table_name}")
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            execute_prepared(cursor, table_name, "select")
+            winners = cursor.fetchall()
+    log_info("Fetched %s winners from %s", len(winners), table_name, category="repository")
+    return winners
+
+
+def get_winners_by_state(table_name: str) -> dict:
+    """
+    Returns the current winners of a given table as a state -> email mapping.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            execute_prepared(cursor, table_name, "by_state")
+            winners = dict(cursor.fetchall())
+    log_info("Loaded %s winners by state from %s", len(winners), table_name, category="repository")
     return winners
 
 
@@ -74,10 +125,162 @@ def get_winner_count(table_name: str) -> int:
     """
     Returns the count of winners in a given table.
     """
-    conn = get_db_connection()
-    with conn.cursor() as cursor:
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-        count = cursor.fetchone()[0]
-    log_info(f"Total winners in {table_name}: {count}")
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            execute_prepared(cursor, table_name, "count")
+            count = cursor.fetchone()[0]
+    log_info("Total winners in %s: %s", table_name, count, category="repository")
     return count
 
+
+def get_run_names() -> list:
+    """
+    Returns the names of every versioned winners table, oldest first.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT table_name FROM information_schema.tables "
+                "WHERE table_schema = current_schema() AND table_name LIKE %s ORDER BY table_name",
+                (config.TABLE_PREFIX + '%',),
+            )
+            names = [name for (name,) in cursor.fetchall()]
+    return [name for name in names if is_run_table(name)]
+
+
+def has_won(email: str, exclude=()) -> bool:
+    """
+    Returns True if the email is a winner in any versioned table not in exclude.
+
+    Every table is probed through its unique email index, many tables per query.
+    """
+    exclude = set(exclude)
+    tables = [name for name in get_run_names() if name not in exclude]
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            for start in range(0, len(tables), HAS_WON_TABLES_PER_QUERY):
+                chunk = tables[start:start + HAS_WON_TABLES_PER_QUERY]
+                query = sql.SQL(" UNION ALL ").join(
+                    sql.SQL("SELECT 1 FROM {} WHERE email = %s").format(sql.Identifier(name)) for name in chunk
+                )
+                cursor.execute(sql.SQL("SELECT EXISTS ({})").format(query), [email] * len(chunk))
+                if cursor.fetchone()[0]:
+                    return True
+    return False
+
+
+def release_run(table_name: str):
+    """
+    Drops the prepared statements of a finished run's table from every pooled connection.
+    """
+    evict(table_name)
+
+
+def ensure_run_status_table():
+    """
+    Creates the run registry if it does not exist yet.
+    """
+    global _run_status_ready
+    if _run_status_ready:
+        return
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (RUN_STATUS_TABLE,))
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {RUN_STATUS_TABLE} (
+                    name TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    users_processed BIGINT NOT NULL DEFAULT 0,
+                    batches BIGINT NOT NULL DEFAULT 0,
+                    registered_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """)
+        conn.commit()
+    _run_status_ready = True
+
+
+def record_run_progress(table_name: str, status: str, users_processed: int = 0, batches: int = 0):
+    """
+    Records the status and progress of a run in the run registry, registering it on first use.
+    """
+    ensure_run_status_table()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {RUN_STATUS_TABLE} (name, status, users_processed, batches) VALUES (%s, %s, %s, %s)
+                ON CONFLICT (name) DO UPDATE SET status = EXCLUDED.status, users_processed = EXCLUDED.users_processed,
+                    batches = EXCLUDED.batches, updated_at = now()
+                """,
+                (table_name, status, users_processed, batches),
+            )
+        conn.commit()
+
+
+# Resumable runs, oldest first, locked for update; parameters: interrupted, running, stale seconds
+RESUMABLE_RUNS_QUERY = f"""
+    SELECT name FROM {RUN_STATUS_TABLE}
+    WHERE (status = %s OR (status = %s AND updated_at < now() - make_interval(secs => %s)))
+        AND to_regclass(quote_ident(name)) IS NOT NULL
+    ORDER BY registered_at, name
+"""
+
+
+def claim_incomplete_runs(limit: int, stale_after: float) -> list:
+    """
+    Atomically marks up to limit resumable runs as running again and returns them, oldest first.
+
+    Rows claimed by a concurrent caller are locked and skipped, and a claimed run
+    is no longer stale once that caller commits, so no run is resumed twice.
+
+    Returns:
+        list: (name, users_processed, batches) tuples.
+    """
+    ensure_run_status_table()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH claimable AS ({RESUMABLE_RUNS_QUERY} LIMIT %s FOR UPDATE SKIP LOCKED)
+                UPDATE {RUN_STATUS_TABLE} r SET status = %s, updated_at = now()
+                FROM claimable c WHERE r.name = c.name
+                RETURNING r.registered_at, r.name, r.users_processed, r.batches
+                """,
+                (RUN_INTERRUPTED, RUN_RUNNING, stale_after, limit, RUN_RUNNING),
+            )
+            claimed = cursor.fetchall()
+        conn.commit()
+    return [(name, users_processed, batches) for _, name, users_processed, batches in sorted(claimed)]
+
+
+def abandon_incomplete_runs(stale_after: float) -> list:
+    """
+    Atomically marks every resumable run as abandoned and returns their names.
+    """
+    ensure_run_status_table()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH abandonable AS ({RESUMABLE_RUNS_QUERY} FOR UPDATE SKIP LOCKED)
+                UPDATE {RUN_STATUS_TABLE} r SET status = %s, updated_at = now()
+                FROM abandonable a WHERE r.name = a.name
+                RETURNING r.registered_at, r.name
+                """,
+                (RUN_INTERRUPTED, RUN_RUNNING, stale_after, RUN_ABANDONED),
+            )
+            abandoned = cursor.fetchall()
+        conn.commit()
+    return [name for _, name in sorted(abandoned)]
+
+
+def get_run_statuses() -> dict:
+    """
+    Returns the status of every run in the run registry as a name -> status mapping.
+    """
+    ensure_run_status_table()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT name, status FROM {RUN_STATUS_TABLE}")
+            return dict(cursor.fetchall())
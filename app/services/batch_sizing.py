@@ -0,0 +1,116 @@
+import math
+from collections import Counter
+from app.services.winner_index import WinnerIndex
+from app.utils import config
+from app.utils.logger import log_info
+from app.utils.constants import DEFAULT_WINNER_SIZE, US_STATE_COUNT
+
+# Pseudo-count given to every state so unseen states keep some probability mass
+SMOOTHING = 1.0
+
+
+class AdaptiveBatchSizer:
+    """
+    Chooses the next API batch size from the states a run still needs.
+
+    The state distribution is estimated from every user seen so far (Laplace
+    smoothed over the known state universe). The number of users needed to cover
+    the remaining states is then estimated coupon-collector style, assuming the
+    most likely uncovered states are hit first, and spread over the requests that
+    run in parallel.
+    """
+
+    def __init__(self, index: WinnerIndex, min_size: int = DEFAULT_WINNER_SIZE, max_size: int = None,
+                 parallelism: int = 1, state_count: int = US_STATE_COUNT):
+        self.index = index
+        self.min_size = min_size
+        self.max_size = max_size or config.FETCH_CONFIG["max_batch_size"]
+        self.parallelism = max(parallelism, 1)
+        self.state_count = state_count
+        self.state_counts = Counter()
+        self.users_seen = 0
+        self.calls = 0
+        self.users_requested = 0
+        self.initial_estimate = self.expected_draws()
+
+    def observe(self, states):
+        """
+        Updates the state distribution with the states of a fetched batch.
+
+        Args:
+            states (iterable): State of every user in the batch.
+        """
+        for state in states:
+            if not state:
+                continue
+            self.state_counts[state] += 1
+            self.users_seen += 1
+
+    def expected_draws(self) -> float:
+        """
+        Estimates how many more users must be drawn to reach the target.
+        """
+        remaining = self.index.remaining()
+        if remaining == 0:
+            return 0.0
+        masses = sorted(self._uncovered_masses(), reverse=True)
+        uncovered = sum(masses)
+        expected = 0.0
+        for mass in masses[:remaining]:
+            expected += 1 / uncovered
+            uncovered -= mass
+        return expected
+
+    def next_size(self) -> int:
+        """
+        Returns the number of users to request in the next API call.
+        """
+        size = math.ceil(self.expected_draws() / self.parallelism)
+        size = min(max(size, self.min_size), self.max_size)
+        self.calls += 1
+        self.users_requested += size
+        return size
+
+    def summary(self, users_processed: int) -> dict:
+        """
+        Compares the calls made with what a fixed batch size would have needed.
+
+        Args:
+            users_processed (int): Users consumed by the run until it completed.
+        """
+        fixed_expected = math.ceil(self.initial_estimate / self.min_size)
+        fixed_actual = math.ceil(users_processed / self.min_size)
+        return {
+            "calls": self.calls,
+            "users_requested": self.users_requested,
+            "users_processed": users_processed,
+            "expected_draws": self.initial_estimate,
+            "fixed_calls_expected": fixed_expected,
+            "fixed_calls_actual": fixed_actual,
+            "calls_saved": fixed_actual - self.calls,
+        }
+
+    def log_summary(self, users_processed: int):
+        """
+        Logs the expected vs. actual API calls saved by adaptive sizing.
+        """
+        summary = self.summary(users_processed)
+        log_info(
+            f"Adaptive batch sizing: {summary['calls']} API calls for {summary['users_processed']} users "
+            f"(expected ~{summary['expected_draws']:.0f} users); fixed size {self.min_size} would have needed "
+            f"{summary['fixed_calls_actual']} calls (~{summary['fixed_calls_expected']} expected), "
+            f"{summary['calls_saved']} saved"
+        )
+
+    def _uncovered_masses(self) -> list:
+        covered = self.index.states()
+        universe = max(self.state_count, len(self.state_counts.keys() | covered))
+        total = self.users_seen + SMOOTHING * universe
+        masses = [
+            (count + SMOOTHING) / total
+            for state, count in self.state_counts.items() if state not in covered
+        ]
+        # States that exist but have not been seen yet
+        unseen = universe - len(self.state_counts.keys() | covered)
+        masses.extend([SMOOTHING / total] * unseen)
+        return masses
@@ -1,42 +1,342 @@
+import random
 import time
-from app.repositories.winner_repository import (
-    create_versioned_table, insert_winner, get_winner_count, get_winners, get_new_version
-)
-from app.api.fetch_random_users import fetch_default_users
-from app.utils.logger import log_info, log_winner, log_final_winners
-from app.utils.constants import MAX_WINNER_COUNT, DEFAULT_SLEEP_TIME
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from app.repositories.base import WinnerRepository, RUN_RUNNING, RUN_INTERRUPTED, RUN_COMPLETE
+from app.repositories.factory import get_winner_repository
+from app.api.fetch_engine import FetchEngine
+from app.api.user_parser import as_user
+from app.services.winner_index import WinnerIndex
+from app.services.batch_sizing import AdaptiveBatchSizer
+from app.services.past_winners import PastWinnerFilter
+from app.services.pipeline import BatchPipeline
+from app.services.user_service import analytics_enabled, record_run_summary
+from app.utils import config
+from app.utils.logger import log_info, log_warning, log_final_winners
+from app.utils.metrics import metrics, phase, timed_iteration, publish_metrics
+from app.utils.constants import MAX_WINNER_COUNT, DEFAULT_WINNER_SIZE, RUN_CHECKPOINT_INTERVAL, RUN_HEARTBEAT_INTERVAL
 
 
-def process_winners():
+def reconcile_winners(index: WinnerIndex, winners: list, table_name: str) -> bool:
     """
-    Manages the lottery process, ensuring 25 unique winners from different states.
+    Compares the in-process winner index against the rows read back from the table.
+
+    Returns:
+        bool: True if the table matches the index, else False.
     """
-    version = get_new_version()
-    table_name = create_versioned_table(version)
+    stored = {winner[2]: winner[1] for winner in winners}
+    expected = index.as_dict()
+    if stored != expected:
+        missing = sorted(set(expected) - set(stored))
+        unexpected = sorted(set(stored) - set(expected))
+        log_warning(
+            f"Winner index out of sync with {table_name}: "
+            f"{len(expected)} indexed vs {len(stored)} stored "
+            f"(missing: {missing}, unexpected: {unexpected})"
+        )
+        return False
+    return True
 
-    while get_winner_count(table_name) < MAX_WINNER_COUNT:
-        users = fetch_default_users()
-        for user in users:
-            state = user.get("address", {}).get("state")
-            email = user.get("email")
-            if state and email:
-                existing_count = get_winner_count(table_name)
 
-                # Insert winner
-                insert_winner(email, state, table_name)
+class LotteryDraw:
+    """
+    One lottery run: its versioned table, in-process winner index and batched writes.
+
+    The run is registered in the repository's run registry, which records its
+    progress every RUN_CHECKPOINT_INTERVAL batches and when it completes. At least
+    every RUN_HEARTBEAT_INTERVAL seconds the progress is saved again, renewing the
+    draw's claim on the run so that no other process resumes it meanwhile.
+
+    Args:
+        repository (WinnerRepository): Storage the draw writes to.
+        number (int): Position of the draw among the draws sharing a user stream.
+        shuffle (bool): Consume every batch in a random order of its own, so draws
+            fed the same users still pick different winners.
+        past_winners (PastWinnerFilter): Skips users who won an earlier run, if given.
+        resume (tuple): (name, users_processed, batches) of an interrupted run to
+            continue from the winners already in its table, instead of starting a new run.
+    """
+
+    def __init__(self, repository: WinnerRepository, number: int = 1, shuffle: bool = False,
+                 past_winners: PastWinnerFilter = None, resume: tuple = None):
+        self.repository = repository
+        self.number = number
+        self.random = random.Random() if shuffle else None
+        self.past_winners = past_winners
+        if resume:
+            self.table_name, self.processed, self.batches = resume
+        else:
+            version = repository.get_new_version()
+            self.table_name = repository.create_versioned_table(version)
+            self.processed = 0
+            self.batches = 0
+        if past_winners:
+            past_winners.active_runs.add(self.table_name)
+        self.excluded = 0
+        # Winners replaced by a later user from the same state
+        self.replacements = Counter()
+        self.index = WinnerIndex(MAX_WINNER_COUNT)
+        self.index.seed(repository.get_winners_by_state(self.table_name))
+        self.started = time.monotonic()
+        self.last_checkpoint = self.started
+        self.elapsed = None
+        self.finished = False
+        if resume:
+            log_info(
+                f"Resuming {self.table_name} with {len(self.index)} of {MAX_WINNER_COUNT} states "
+                f"after {self.processed} users in {self.batches} batches"
+            )
+            if self.index.is_complete():
+                # Interrupted after its last write; only finishing is left
+                self.elapsed = 0.0
+
+    def consume(self, users: list) -> bool:
+        """
+        Records a batch of users and writes the accepted winners with one upsert.
 
-                # Determine if it's an update or insert
-                if existing_count < get_winner_count(table_name):
-                    log_winner(email, state, table_name, is_update=False)
-                else:
-                    log_winner(email, state, table_name, is_update=True)
+        Args:
+            users (list): User records of one fetched batch.
+
+        Returns:
+            bool: True once the draw has all its winners.
+        """
+        if self.random:
+            users = self.random.sample(users, len(users))
+
+        rows = []
+        for user in users:
+            self.processed += 1
+            if user.state and user.email:
+                if self.past_winners and self.past_winners.is_past_winner(user.email):
+                    self.excluded += 1
+                    continue
+                rows.append((user.email, user.state))
+                if self.index.record(user.email, user.state):
+                    self.replacements[user.state] += 1
 
-                if get_winner_count(table_name) >= 25:
+                if self.index.is_complete():
                     break
-        time.sleep(DEFAULT_SLEEP_TIME)
 
-    winners = get_winners(table_name)
-    log_final_winners(table_name, winners)
-    log_info(f"Lottery process completed for table: {table_name}")
-    return winners
+        self.repository.upsert_winners(rows, self.table_name)
+        self.batches += 1
+
+        if self.index.is_complete() and self.elapsed is None:
+            self.elapsed = time.monotonic() - self.started
+        elif self.batches % RUN_CHECKPOINT_INTERVAL == 0:
+            self.checkpoint()
+        return self.index.is_complete()
+
+    def checkpoint(self, status: str = RUN_RUNNING):
+        """
+        Saves the draw's progress in the run registry.
+
+        The winners are already in the table, so a failure only loses the counters
+        and is logged rather than raised.
+
+        Args:
+            status (str): RUN_RUNNING, or RUN_INTERRUPTED when the draw stops
+                unfinished and its run may be resumed at once.
+        """
+        self.last_checkpoint = time.monotonic()
+        try:
+            self.repository.record_run_progress(self.table_name, status, self.processed, self.batches)
+        except Exception as e:
+            log_warning(f"Could not save the progress of {self.table_name}: {e}")
+
+    def heartbeat(self):
+        """
+        Saves the draw's progress if RUN_HEARTBEAT_INTERVAL has passed since it was last saved.
+        """
+        if time.monotonic() - self.last_checkpoint >= RUN_HEARTBEAT_INTERVAL:
+            self.checkpoint()
+
+    def finish(self) -> list:
+        """
+        Reads the winners back, checks them against the index and logs them.
+        """
+        winners = self.repository.get_winners(self.table_name)
+        reconcile_winners(self.index, winners, self.table_name)
+        if self.past_winners:
+            self.past_winners.add_run(self.table_name, [winner[1] for winner in winners])
+            log_info(f"Skipped {self.excluded} users who won an earlier run")
+        log_final_winners(self.table_name, winners)
+        self.repository.record_run_progress(self.table_name, RUN_COMPLETE, self.processed, self.batches)
+        self.finished = True
+        self.repository.release_run(self.table_name)
+        log_info(f"Lottery process completed for table: {self.table_name}")
+        return winners
+
+
+def process_lotteries(count: int, repository: WinnerRepository = None, resume: bool = None) -> list:
+    """
+    Runs several lotteries at once from a single shared stream of fetched users.
+
+    Every fetched batch is fanned out to each draw that still needs winners, so
+    the API is called about as often as for one lottery instead of once per draw.
+    The first draw consumes batches in arrival order; the others shuffle them.
+    With EXCLUDE_PAST_WINNERS, users who won any earlier run are skipped.
+    With PIPELINE_ENABLED, fetching runs on a background stage ahead of the
+    writes, and batches that queued up meanwhile are written together.
+    Runs on the configured PostgreSQL storage are added to the summary tables
+    unless ANALYTICS_ENABLED is off.
+
+    Runs left incomplete by an earlier process, oldest first, are continued as
+    the first draws instead of starting new runs; when not resuming, they are
+    marked abandoned so that no later start picks them up. A run counts as
+    incomplete once its process stopped it unfinished, or once it has made no
+    progress for RUN_STALE_AFTER seconds; runs of live processes are left alone.
+
+    Args:
+        count (int): Number of lotteries to run.
+        repository (WinnerRepository): Storage to use; defaults to the configured backend.
+            Runs on a given repository are not summarized.
+        resume (bool): Continue incomplete runs; defaults to RESUME_RUNS.
 
+    Returns:
+        list: The winners of each draw, in draw order.
+    """
+    summarize = repository is None and analytics_enabled()
+    repository = repository or get_winner_repository()
+    if resume is None:
+        resume = config.RESUME_CONFIG["enabled"]
+    stale_after = config.RESUME_CONFIG["stale_after"]
+    past_winners = None
+    try:
+        if config.PAST_WINNERS_CONFIG["enabled"]:
+            with phase("past_winners_sync"):
+                past_winners = PastWinnerFilter(repository)
+                past_winners.sync()
+        # Claimed only now, so that a failed set-up leaves the runs to the next start;
+        # from here on _run_draws releases them if it fails
+        resumed = []
+        if resume:
+            resumed = repository.claim_incomplete_runs(count, stale_after)
+        else:
+            for name in repository.abandon_incomplete_runs(stale_after):
+                log_info(f"Abandoned incomplete run {name}; starting a fresh one")
+        return _run_draws(count, repository, past_winners, summarize, resumed)
+    finally:
+        if past_winners:
+            past_winners.close()
+
+
+def fetch_batches(engine: FetchEngine, batch_size, sizer: AdaptiveBatchSizer = None):
+    """
+    Yields the parsed users of every API call of the engine's stream.
+
+    Args:
+        batch_size (int | callable): Users per API call, or a callable returning it.
+        sizer (AdaptiveBatchSizer): Learns the state distribution from every batch, if given.
+    """
+    for users in timed_iteration(engine.stream(batch_size), "fetch"):
+        with phase("parse"):
+            users = [as_user(user) for user in users]
+        if sizer:
+            sizer.observe(user.state for user in users)
+        yield users
+
+
+def _run_draws(count: int, repository: WinnerRepository, past_winners: PastWinnerFilter,
+               summarize: bool = False, resumed: list = ()) -> list:
+    draws = []
+    try:
+        with phase("create_table"):
+            for number in range(1, count + 1):
+                draws.append(LotteryDraw(repository, number, shuffle=number > 1, past_winners=past_winners,
+                                         resume=resumed[number - 1] if number <= len(resumed) else None))
+        return _complete_draws(draws, summarize)
+    except BaseException:
+        # Release the runs of unfinished draws so that the next start resumes them at once
+        for draw in draws:
+            if not draw.finished:
+                draw.checkpoint(RUN_INTERRUPTED)
+        # Resumed draws come first, so these are the claimed runs whose draw was never built
+        for name, processed, batches in resumed[len(draws):]:
+            try:
+                repository.record_run_progress(name, RUN_INTERRUPTED, processed, batches)
+            except Exception as e:
+                log_warning(f"Could not release {name}: {e}")
+        raise
+
+
+def _complete_draws(draws: list, summarize: bool = False) -> list:
+    count = len(draws)
+    active = [draw for draw in draws if not draw.index.is_complete()]
+
+    # Draws write their batches concurrently; a single draw needs no extra threads
+    writer = ThreadPoolExecutor(max_workers=len(draws), thread_name_prefix="draw") if count > 1 else None
+    pipeline = None
+    sizer = None
+    engine = None
+    try:
+        # Resumed draws may already have all their winners, leaving nothing to fetch
+        if active:
+            with FetchEngine() as engine:
+                batch_size = DEFAULT_WINNER_SIZE
+                if config.FETCH_CONFIG["adaptive_batch_size"]:
+                    sizer = AdaptiveBatchSizer(active[0].index, parallelism=engine.max_in_flight)
+                    batch_size = sizer.next_size
+
+                batches = fetch_batches(engine, batch_size, sizer)
+                if config.PIPELINE_CONFIG["enabled"]:
+                    pipeline = BatchPipeline(batches, config.PIPELINE_CONFIG["queue_size"], cancel=engine.stop)
+                    batches = timed_iteration(pipeline.stream(), "queue_wait")
+
+                for users in batches:
+                    with phase("upsert"):
+                        if writer:
+                            completed = list(writer.map(lambda draw: draw.consume(users), active))
+                        else:
+                            completed = [draw.consume(users) for draw in active]
+
+                    for draw, is_complete in zip(list(active), completed):
+                        if is_complete:
+                            active.remove(draw)
+                            log_info(
+                                f"Draw {draw.number}/{count} completed for {draw.table_name} in {draw.elapsed:.2f}s "
+                                f"after {draw.processed} users in {draw.batches} batches"
+                            )
+
+                    if not active:
+                        break
+                    # Completed draws keep their claim until they are finished
+                    for draw in draws:
+                        draw.heartbeat()
+                    if sizer and sizer.index.is_complete():
+                        # Keep sizing batches for a draw that still needs winners
+                        sizer.index = active[0].index
+    finally:
+        if pipeline:
+            pipeline.close()
+        if writer:
+            writer.shutdown()
+
+    if sizer:
+        sizer.log_summary(max(draw.processed for draw in draws))
+    if count > 1 and engine:
+        log_info(
+            f"Completed {count} lotteries with {engine.stats['requests']} API calls "
+            f"({engine.stats['requests'] / count:.2f} per lottery)"
+        )
+
+    with phase("final_read"):
+        results = [draw.finish() for draw in draws]
+    if summarize:
+        with phase("analytics"):
+            for draw, winners in zip(draws, results):
+                record_run_summary(draw.table_name, {state: email for _, email, state in winners},
+                                   draw.replacements, draw.processed)
+    metrics.inc("runs_total", count)
+    publish_metrics()
+    return results
+
+
+def process_winners(repository: WinnerRepository = None, resume: bool = None):
+    """
+    Manages the lottery process, ensuring 25 unique winners from different states.
+
+    Args:
+        repository (WinnerRepository): Storage to use; defaults to the configured backend.
+        resume (bool): Continue the oldest incomplete run; defaults to RESUME_RUNS.
+    """
+    return process_lotteries(1, repository, resume)[0]
@@ -0,0 +1,112 @@
+import os
+import threading
+from app.repositories.base import WinnerRepository
+from app.utils import config
+from app.utils.bloom_filter import BloomFilter
+from app.utils.logger import log_info, log_warning
+from app.utils.metrics import metrics
+
+
+class PastWinnerFilter:
+    """
+    Excludes the winners of earlier runs, without querying every run per user.
+
+    Emails of finished runs are kept in a persistent, memory-mapped Bloom filter,
+    next to a "<path>.runs" file listing the runs already added. A user whose
+    email the filter has never seen is accepted in-process; only a probable hit
+    is confirmed with an indexed database lookup, so false positives cost one
+    query and never exclude anyone by mistake.
+
+    Runs missing from the filter (e.g. those finished before the feature was
+    enabled) are added by sync(); runs of this process are added as they finish.
+    A filter sized for a different capacity or error rate is rebuilt from scratch.
+
+    Args:
+        repository (WinnerRepository): Storage holding every run's winners.
+        path (str): Filter file; defaults to PAST_WINNERS_FILTER_PATH.
+        capacity (int): Past winners the filter is sized for.
+        error_rate (float): Target false-positive rate at capacity.
+    """
+
+    def __init__(self, repository: WinnerRepository, path: str = None,
+                 capacity: int = None, error_rate: float = None):
+        settings = config.PAST_WINNERS_CONFIG
+        self.repository = repository
+        self.path = path or settings["path"]
+        self.runs_path = f"{self.path}.runs"
+        capacity = capacity or settings["capacity"]
+        error_rate = error_rate or settings["error_rate"]
+
+        self.bloom = BloomFilter(self.path, capacity, error_rate)
+        if (self.bloom.capacity, self.bloom.error_rate) != (capacity, error_rate):
+            log_warning("Rebuilding %s for capacity %s at error rate %s", self.path, capacity, error_rate)
+            self.bloom.close()
+            for stale in (self.path, self.runs_path):
+                if os.path.exists(stale):
+                    os.remove(stale)
+            self.bloom = BloomFilter(self.path, capacity, error_rate)
+
+        # Unfinished runs, whose winners must not exclude anyone
+        self.active_runs = set()
+        self._lock = threading.Lock()
+        self._runs = self._read_runs()
+
+    def _read_runs(self) -> set:
+        if not os.path.exists(self.runs_path):
+            return set()
+        with open(self.runs_path) as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def sync(self) -> int:
+        """
+        Adds the winners of every finished run that is not in the filter yet.
+
+        Other runs are added to active_runs, so that their winners exclude nobody.
+
+        Returns:
+            int: Number of runs added.
+        """
+        finished = self.repository.get_finished_run_names()
+        self.active_runs.update(set(self.repository.get_run_names()) - set(finished))
+        missing = [name for name in finished if name not in self._runs and name not in self.active_runs]
+        for name in missing:
+            self.add_run(name, [email for _, email, _ in self.repository.get_winners(name)])
+        if missing:
+            log_info("Added %s earlier runs to the past winner filter (%s emails)",
+                     len(missing), self.bloom.count, category="repository")
+        if self.bloom.count > self.bloom.capacity:
+            log_warning("Past winner filter holds %s emails, more than its capacity of %s; "
+                        "raise PAST_WINNERS_CAPACITY to keep its false-positive rate down "
+                        "(now about %.4f)", self.bloom.count, self.bloom.capacity,
+                        self.bloom.estimated_error_rate())
+        return len(missing)
+
+    def add_run(self, run_name: str, emails: list):
+        """
+        Adds the winners of a finished run to the filter.
+        """
+        with self._lock:
+            if run_name in self._runs:
+                return
+            self.bloom.add_many(emails)
+            # Recorded only once the bits are on disk; re-adding after a crash is harmless
+            with open(self.runs_path, "a") as f:
+                f.write(f"{run_name}\n")
+            self._runs.add(run_name)
+            self.active_runs.discard(run_name)
+
+    def is_past_winner(self, email: str) -> bool:
+        """
+        Returns True if the email won in an earlier run.
+        """
+        if email not in self.bloom:
+            metrics.inc("past_winner_checks_total", outcome="new")
+            return False
+        if self.repository.has_won(email, exclude=self.active_runs):
+            metrics.inc("past_winner_checks_total", outcome="excluded")
+            return True
+        metrics.inc("past_winner_checks_total", outcome="false_positive")
+        return False
+
+    def close(self):
+        self.bloom.close()
@@ -0,0 +1,126 @@
+import queue
+import threading
+from app.utils.logger import log_info
+from app.utils.metrics import metrics
+from app.utils.constants import PIPELINE_POLL_INTERVAL, PIPELINE_SHUTDOWN_TIMEOUT
+
+# Marks the end of the source in the queue
+_END = object()
+
+
+class _Failure:
+    """
+    Carries an exception raised by the source over to the consumer.
+    """
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class BatchPipeline:
+    """
+    Runs a batch source (fetching and parsing) in a background stage ahead of its consumer.
+
+    The source is iterated on its own thread and its batches are handed over
+    through a bounded queue, so the next API calls are already under way while
+    the consumer writes to the database. When the queue is full the source
+    stage blocks instead of fetching further (backpressure). Every batch
+    waiting in the queue is handed to the consumer at once, so a slow writer
+    catches up with one write instead of one per batch.
+
+    close() stops the source stage: cancel is called to abort requests that
+    have not been sent yet, and the source is closed on its own thread.
+    Requests already on the wire cannot be interrupted; their results are
+    discarded.
+
+    Args:
+        source (iterable): Yields lists of items, e.g. parsed users per API call.
+        queue_size (int): Batches that may wait for the consumer.
+        cancel (callable): Aborts the source's pending work, e.g. FetchEngine.stop.
+    """
+
+    def __init__(self, source, queue_size: int, cancel=None):
+        self.source = source
+        self.cancel = cancel
+        self.queue = queue.Queue(maxsize=max(queue_size, 1))
+        self.stats = {"batches": 0, "writes": 0, "stalls": 0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, name="pipeline-fetch", daemon=True)
+        self._thread.start()
+
+    def _produce(self):
+        try:
+            for batch in self.source:
+                if not self._put(batch):
+                    break
+        except BaseException as e:
+            self._put(_Failure(e))
+        finally:
+            close = getattr(self.source, "close", None)
+            if close:
+                close()
+            self._put(_END)
+
+    def _put(self, item) -> bool:
+        stalled = False
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=PIPELINE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                if not stalled:
+                    stalled = True
+                    self.stats["stalls"] += 1
+                    metrics.inc("pipeline_stalls_total")
+        return False
+
+    def stream(self):
+        """
+        Yields the source's batches, merging all batches queued at the time into one list.
+
+        Raises:
+            Exception: Whatever the source raised, once the batches before it are consumed.
+        """
+        finished = False
+        while not finished:
+            items = [self.queue.get()]
+            while True:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            merged = []
+            error = None
+            for item in items:
+                if item is _END:
+                    finished = True
+                    break
+                if isinstance(item, _Failure):
+                    error = item.error
+                    break
+                merged.extend(item)
+                self.stats["batches"] += 1
+            if merged:
+                self.stats["writes"] += 1
+                metrics.inc("pipeline_writes_total")
+                yield merged
+            if error:
+                raise error
+
+    def close(self):
+        """
+        Stops the source stage and waits briefly for it to finish.
+        """
+        self._stop.set()
+        if self.cancel:
+            self.cancel()
+        self._thread.join(PIPELINE_SHUTDOWN_TIMEOUT)
+        log_info("Pipeline handed %s fetched batches to %s writes; the fetch stage waited on a full queue %s times",
+                 self.stats["batches"], self.stats["writes"], self.stats["stalls"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,223 @@
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from app.utils import config
+from app.utils.logger import log_info, log_warning, log_error
+from app.utils.metrics import metrics
+
+INTERVAL_PATTERN = re.compile(r"^(?:every\s+)?(\d+(?:\.\d+)?)\s*([smhd]?)$")
+
+INTERVAL_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Cron fields in order, with their allowed ranges; 7 is accepted as Sunday
+CRON_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+# Years searched for the next match of a cron schedule before giving up
+CRON_SEARCH_YEARS = 5
+
+
+class IntervalSchedule:
+    """
+    Runs every interval seconds, counted from the start of the previous draw.
+    """
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Schedule interval must be positive")
+        self.interval = timedelta(seconds=seconds)
+
+    def first_run(self, now: datetime) -> datetime:
+        return now
+
+    def next_run(self, after: datetime) -> datetime:
+        return after + self.interval
+
+    def __str__(self):
+        return f"every {self.interval.total_seconds():g}s"
+
+
+class CronSchedule:
+    """
+    Runs at the minutes matching a five-field cron expression (minute hour day month weekday).
+
+    Fields accept *, numbers, ranges (a-b), steps (*/n, a-b/n) and comma-separated
+    lists. As in cron, when both day and weekday are restricted a time matches
+    if either does.
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != len(CRON_FIELDS):
+            raise ValueError(f"Cron schedule needs {len(CRON_FIELDS)} fields: {expression!r}")
+        self.expression = expression
+        values = [_cron_field(field, low, high, name) for field, (name, low, high) in zip(fields, CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def first_run(self, now: datetime) -> datetime:
+        return self.next_run(now)
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        # Python counts weekdays from Monday, cron from Sunday
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_run(self, after: datetime) -> datetime:
+        """
+        Returns the first matching minute after the given time.
+
+        Raises:
+            ValueError: If nothing matches within CRON_SEARCH_YEARS, e.g. "0 0 30 2 *".
+        """
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = after.year + CRON_SEARCH_YEARS
+        while moment.year <= limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron schedule never matches: {self.expression!r}")
+
+    def __str__(self):
+        return f"cron {self.expression!r}"
+
+
+def _cron_field(field: str, low: int, high: int, name: str) -> set:
+    values = set()
+    for part in field.split(","):
+        match = re.fullmatch(r"(\*|\d+(?:-\d+)?)(?:/(\d+))?", part)
+        if not match:
+            raise ValueError(f"Invalid cron {name} field: {field!r}")
+        span, step = match.group(1), int(match.group(2) or 1)
+        if span == "*":
+            start, end = low, high
+        elif "-" in span:
+            start, end = map(int, span.split("-"))
+        else:
+            start = end = int(span)
+            if match.group(2):
+                end = high
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"Cron {name} field out of range {low}-{high}: {field!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def parse_schedule(spec: str):
+    """
+    Parses a schedule: an interval such as "every 10m", "30s" or "3600", or a cron expression.
+
+    Raises:
+        ValueError: If the schedule cannot be parsed.
+    """
+    spec = spec.strip()
+    match = INTERVAL_PATTERN.match(spec.lower())
+    if match:
+        return IntervalSchedule(float(match.group(1)) * INTERVAL_UNITS[match.group(2)])
+    return CronSchedule(spec)
+
+
+def warm_up():
+    """
+    Opens the shared repository, database pool and API client ahead of the first draw.
+    """
+    from app.api.fetch_random_users import get_api_client
+    from app.repositories.factory import get_winner_repository
+
+    get_winner_repository()
+    if config.STORAGE_BACKEND == "postgres":
+        from app.db.db_connection import get_connection_pool
+        get_connection_pool()
+    get_api_client()
+
+
+class DrawScheduler:
+    """
+    Runs a draw on a schedule inside one long-running process.
+
+    Draws reuse whatever the process keeps open between them, i.e. the pooled
+    database connections and the API client's HTTP session. A draw that
+    fails is logged and the next one still runs; a draw that overruns its
+    slot skips the missed slots instead of running back-to-back. stop() (e.g.
+    from a SIGTERM handler) lets the draw in progress finish and then returns
+    from run().
+
+    Args:
+        schedule (IntervalSchedule | CronSchedule): When draws start.
+        job (callable): Runs one draw.
+        max_draws (int): Stop after this many draws; unlimited by default.
+    """
+
+    def __init__(self, schedule, job, max_draws: int = None):
+        self.schedule = schedule
+        self.job = job
+        self.max_draws = max_draws
+        self.draws = 0
+        self.failures = 0
+        self._stop = threading.Event()
+
+    def stop(self, signum=None, frame=None):
+        """
+        Asks the scheduler to exit after the draw in progress; usable as a signal handler.
+
+        A second signal while stopping interrupts the draw with KeyboardInterrupt.
+        """
+        if self._stop.is_set() and signum is not None:
+            raise KeyboardInterrupt
+        if not self._stop.is_set():
+            log_info("Stopping the scheduler after the current draw" + (f" (signal {signum})" if signum else ""))
+        self._stop.set()
+
+    def run(self) -> int:
+        """
+        Runs draws until stopped or max_draws is reached.
+
+        Returns:
+            int: Number of draws run.
+        """
+        log_info(f"Scheduler started: {self.schedule}")
+        next_run = self.schedule.first_run(datetime.now())
+        while not self._stop.is_set():
+            delay = (next_run - datetime.now()).total_seconds()
+            if delay > 0:
+                log_info(f"Next draw at {next_run:%Y-%m-%d %H:%M:%S}")
+                if self._stop.wait(delay):
+                    break
+
+            started_at = datetime.now()
+            started = time.perf_counter()
+            outcome = "ok"
+            try:
+                self.job()
+            except Exception as e:
+                outcome = "error"
+                self.failures += 1
+                log_error(f"Scheduled draw failed: {e}")
+            elapsed = time.perf_counter() - started
+            self.draws += 1
+            metrics.observe("scheduled_draw_duration_seconds", elapsed, outcome=outcome)
+            log_info(f"Scheduled draw {self.draws} {'finished' if outcome == 'ok' else 'failed'} in {elapsed:.2f}s")
+
+            if self.max_draws and self.draws >= self.max_draws:
+                break
+            next_run = self.schedule.next_run(started_at)
+            skipped = 0
+            while next_run <= datetime.now():
+                next_run = self.schedule.next_run(next_run)
+                skipped += 1
+            if skipped:
+                log_warning(f"Draw overran its schedule; skipped {skipped} slots")
+        log_info(f"Scheduler stopped after {self.draws} draws ({self.failures} failed)")
+        return self.draws
@@ -0,0 +1,267 @@
+"""
+Monte Carlo simulation of the lottery loop, for tuning its parameters offline.
+
+Thousands of runs of the process_winners loop are simulated at once with
+NumPy: each API call returns batch_size users whose states are drawn from a
+state distribution, every user is upserted until target states are covered,
+and failed calls back off like the fetch engine (doubling, capped at
+sleep_time). Every combination of the --target, --batch-size and --sleep-time
+values is simulated, and the distributions of API calls, database writes and
+wall time are reported with the cost per completed draw, cheapest first.
+
+The state distribution is "uniform" over US_STATE_COUNT states,
+"zipf:<exponent>", "log:<path>" for the states of every user in a recorded
+API log (API_MODE=record), "winners" for the states of the winners of every
+stored run (the configured backend; note that this over-represents rare
+states, since every run contributes at most one winner per state), or the
+path of a JSON object mapping states to weights.
+
+Requires NumPy, from the simulation extra (uv sync --extra simulation).
+
+Usage:
+    python -m app.services.simulation [--runs N] [--distribution SPEC]
+        [--target N ...] [--batch-size N ...] [--sleep-time SECONDS ...] [--output FILE]
+"""
+import argparse
+import itertools
+import json
+from collections import Counter
+from app.utils.constants import MAX_WINNER_COUNT, DEFAULT_WINNER_SIZE, DEFAULT_SLEEP_TIME, US_STATE_COUNT
+
+# Metrics reported per parameter setting
+SIMULATED_METRICS = ("api_calls", "upserts", "rows", "wall_time")
+
+# Percentiles reported per metric
+SIMULATED_PERCENTILES = (50, 90, 99)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("The lottery simulator needs NumPy: uv sync --extra simulation") from e
+    return numpy
+
+
+def weights_from_log(path: str) -> dict:
+    """
+    Returns the number of users per state in a recorded API log.
+    """
+    from app.api.response_log import ResponseLogReader
+    from app.api.user_parser import as_user
+
+    reader = ResponseLogReader(path)
+    try:
+        counts = Counter(as_user(user).state for record in reader for user in record["users"])
+    finally:
+        reader.close()
+    counts.pop(None, None)
+    return dict(counts)
+
+
+def weights_from_winners(repository) -> dict:
+    """
+    Returns the number of wins per state over every stored run.
+    """
+    counts = Counter()
+    for run_name in repository.get_run_names():
+        counts.update(repository.get_winners_by_state(run_name).keys())
+    return dict(counts)
+
+
+def load_weights(distribution: str, repository=None) -> list:
+    """
+    Returns the state weights of a distribution specification (see the module docstring).
+
+    Raises:
+        ValueError: If the distribution has no states.
+    """
+    if distribution == "uniform":
+        return [1.0] * US_STATE_COUNT
+    if distribution.startswith("zipf:"):
+        exponent = float(distribution.split(":", 1)[1])
+        return [1 / rank ** exponent for rank in range(1, US_STATE_COUNT + 1)]
+    if distribution.startswith("log:"):
+        weights = weights_from_log(distribution.split(":", 1)[1])
+    elif distribution == "winners":
+        if repository is None:
+            from app.repositories.factory import create_winner_repository
+            repository = create_winner_repository()
+        weights = weights_from_winners(repository)
+    else:
+        with open(distribution) as f:
+            weights = json.load(f)
+    weights = [float(weight) for weight in weights.values() if weight > 0]
+    if not weights:
+        raise ValueError(f"No states in distribution {distribution!r}")
+    return weights
+
+
+def simulate(weights: list, runs: int = 10000, target: int = MAX_WINNER_COUNT,
+             batch_size: int = DEFAULT_WINNER_SIZE, sleep_time: float = DEFAULT_SLEEP_TIME,
+             error_rate: float = 0.0, api_latency: float = 0.1, db_latency: float = 0.005,
+             max_calls: int = 1000, seed: int = None) -> dict:
+    """
+    Simulates runs of the lottery loop at once, one API call per step across all runs.
+
+    Args:
+        weights (list): Relative frequency of every state.
+        target (int): Distinct states a run needs (MAX_WINNER_COUNT).
+        batch_size (int): Users per API call (DEFAULT_WINNER_SIZE).
+        sleep_time (float): Longest back-off after a failed call (DEFAULT_SLEEP_TIME).
+        error_rate (float): Probability that an API call fails.
+        api_latency (float): Seconds per API call.
+        db_latency (float): Seconds per batch upsert.
+        max_calls (int): Runs still incomplete after this many calls are given up.
+
+    Returns:
+        dict: One array per run of api_calls, upserts, rows, wall_time and completed.
+    """
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+    probabilities = np.asarray(weights, dtype=float)
+    cumulative = np.cumsum(probabilities / probabilities.sum())
+    state_count = len(probabilities)
+
+    covered = np.zeros((runs, state_count), dtype=bool)
+    distinct = np.zeros(runs, dtype=np.int64)
+    calls = np.zeros(runs, dtype=np.int64)
+    upserts = np.zeros(runs, dtype=np.int64)
+    rows = np.zeros(runs, dtype=np.int64)
+    failures_in_a_row = np.zeros(runs, dtype=np.int64)
+    slept = np.zeros(runs)
+    active = np.ones(runs, dtype=bool)
+
+    for _ in range(max_calls):
+        running = np.flatnonzero(active)
+        if not running.size:
+            break
+        calls[running] += 1
+
+        failed = rng.random(running.size) < error_rate
+        backing_off = running[failed]
+        if backing_off.size:
+            failures_in_a_row[backing_off] += 1
+            delay = np.minimum(2.0 ** (failures_in_a_row[backing_off] - 1), sleep_time)
+            slept[backing_off] += delay * rng.uniform(0.5, 1.0, backing_off.size)
+        served = running[~failed]
+        if not served.size:
+            continue
+        failures_in_a_row[served] = 0
+        upserts[served] += 1
+
+        states = np.minimum(np.searchsorted(cumulative, rng.random((served.size, batch_size)), side="right"),
+                            state_count - 1)
+        consuming = np.ones(served.size, dtype=bool)
+        for column in range(batch_size):
+            runs_now = served[consuming]
+            states_now = states[consuming, column]
+            distinct[runs_now] += ~covered[runs_now, states_now]
+            covered[runs_now, states_now] = True
+            rows[runs_now] += 1
+            # A run stops mid-batch as soon as it has its winners
+            consuming[consuming] = distinct[runs_now] < target
+            if not consuming.any():
+                break
+        active[served] = distinct[served] < target
+
+    return {
+        "api_calls": calls,
+        "upserts": upserts,
+        "rows": rows,
+        "wall_time": calls * api_latency + upserts * db_latency + slept,
+        "completed": distinct >= target,
+    }
+
+
+def summarize(results: dict, api_cost: float = 1.0, write_cost: float = 0.0, time_cost: float = 0.0) -> dict:
+    """
+    Returns the mean and percentiles of every metric, and the cost per completed draw.
+
+    A run costs api_cost per API call, write_cost per upsert and time_cost per
+    second; the cost of incomplete runs is spread over the completed ones.
+    """
+    np = _numpy()
+    summary = {"completed": float(results["completed"].mean())}
+    for metric in SIMULATED_METRICS:
+        values = results[metric]
+        summary[metric] = {"mean": float(values.mean()),
+                           **{f"p{q}": float(np.percentile(values, q)) for q in SIMULATED_PERCENTILES}}
+    cost = api_cost * results["api_calls"] + write_cost * results["upserts"] + time_cost * results["wall_time"]
+    completed = int(results["completed"].sum())
+    summary["cost_per_draw"] = float(cost.sum() / completed) if completed else float("inf")
+    return summary
+
+
+def simulate_grid(weights: list, targets: list, batch_sizes: list, sleep_times: list,
+                  costs: dict = None, **options) -> list:
+    """
+    Simulates every combination of the parameter values.
+
+    Returns:
+        list: One summary per setting (with "target", "batch_size" and "sleep_time"),
+            cheapest cost per completed draw first.
+    """
+    settings = []
+    for target, batch_size, sleep_time in itertools.product(targets, batch_sizes, sleep_times):
+        results = simulate(weights, target=target, batch_size=batch_size, sleep_time=sleep_time, **options)
+        settings.append({"target": target, "batch_size": batch_size, "sleep_time": sleep_time,
+                         **summarize(results, **(costs or {}))})
+    return sorted(settings, key=lambda setting: setting["cost_per_draw"])
+
+
+def format_grid(settings: list) -> str:
+    """
+    Renders simulate_grid() results as a table of means and p90s.
+    """
+    lines = [f"{'target':>6}{'batch':>7}{'sleep':>7}{'done':>7}{'calls':>8}{'p90':>6}"
+             f"{'writes':>8}{'rows':>8}{'time_s':>9}{'p90':>8}{'cost/draw':>11}"]
+    for s in settings:
+        lines.append(
+            f"{s['target']:>6}{s['batch_size']:>7}{s['sleep_time']:>7g}{s['completed']:>7.0%}"
+            f"{s['api_calls']['mean']:>8.2f}{s['api_calls']['p90']:>6.0f}{s['upserts']['mean']:>8.2f}"
+            f"{s['rows']['mean']:>8.1f}{s['wall_time']['mean']:>9.2f}{s['wall_time']['p90']:>8.2f}"
+            f"{s['cost_per_draw']:>11.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10000, help="Simulated runs per setting")
+    parser.add_argument("--distribution", default="uniform", help="State distribution (see above)")
+    parser.add_argument("--target", type=int, nargs="+", default=[MAX_WINNER_COUNT], help="Winners per run")
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[DEFAULT_WINNER_SIZE], help="Users per API call")
+    parser.add_argument("--sleep-time", type=float, nargs="+", default=[DEFAULT_SLEEP_TIME],
+                        help="Longest back-off after a failed call, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability that an API call fails")
+    parser.add_argument("--api-latency", type=float, default=0.1, help="Seconds per API call")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="Seconds per batch upsert")
+    parser.add_argument("--api-cost", type=float, default=1.0, help="Cost of one API call")
+    parser.add_argument("--write-cost", type=float, default=0.0, help="Cost of one batch upsert")
+    parser.add_argument("--time-cost", type=float, default=0.0, help="Cost of one second of wall time")
+    parser.add_argument("--max-calls", type=int, default=1000, help="API calls after which a run is given up")
+    parser.add_argument("--seed", type=int, help="Random seed, for reproducible results")
+    parser.add_argument("--output", help="Also write the full results as JSON to this file")
+    args = parser.parse_args()
+    try:
+        _numpy()
+        weights = load_weights(args.distribution)
+    except (ImportError, OSError, ValueError) as e:
+        parser.exit(2, f"{e}\n")
+
+    settings = simulate_grid(
+        weights, args.target, args.batch_size, args.sleep_time,
+        costs={"api_cost": args.api_cost, "write_cost": args.write_cost, "time_cost": args.time_cost},
+        runs=args.runs, error_rate=args.error_rate, api_latency=args.api_latency,
+        db_latency=args.db_latency, max_calls=args.max_calls, seed=args.seed,
+    )
+    print(f"{args.runs} runs per setting, {len(weights)} states ({args.distribution})\n")
+    print(format_grid(settings))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(settings, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
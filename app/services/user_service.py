@@ -1,24 +1,87 @@
-from app.repositories.winner_repository import insert_winner, get_winners, get_winner_count
+import atexit
+import threading
+from app.repositories.base import WinnerRepository
+from app.repositories.factory import get_winner_repository
+from app.services.write_buffer import WinnerWriteBuffer
+from app.utils import config
 from app.utils.logger import log_info, log_error
 
+# Shared write-behind buffer of add_winner, created on first use when WRITE_BUFFER_ENABLED
+_write_buffer = None
+_write_buffer_lock = threading.Lock()
 
-def add_winner(email: str, state: str, table_name: str):
+
+def get_write_buffer() -> WinnerWriteBuffer:
+    """
+    Returns the shared write-behind buffer over the shared repository, creating it on first use.
+
+    The buffer is flushed when the interpreter exits; call flush_winners() to
+    make the winners added so far durable earlier.
+    """
+    global _write_buffer
+    with _write_buffer_lock:
+        if _write_buffer is None:
+            _write_buffer = WinnerWriteBuffer(get_winner_repository())
+            atexit.register(close_write_buffer)
+        return _write_buffer
+
+
+def flush_winners() -> int:
+    """
+    Writes every winner waiting in the shared write-behind buffer.
+
+    Returns:
+        int: Number of winners written.
+    """
+    try:
+        return _write_buffer.flush() if _write_buffer else 0
+    except Exception as e:
+        log_error(f"Error flushing buffered winners: {e}")
+        return 0
+
+
+def close_write_buffer():
+    """
+    Flushes and closes the shared write-behind buffer if it is open.
+    """
+    global _write_buffer
+    with _write_buffer_lock:
+        buffer, _write_buffer = _write_buffer, None
+    if buffer:
+        try:
+            buffer.close()
+        except Exception as e:
+            log_error(f"Error flushing buffered winners: {e}")
+
+
+def add_winner(email: str, state: str, table_name: str, repository: WinnerRepository = None,
+               buffer: WinnerWriteBuffer = None):
     """
     Adds a new winner to the database or updates an existing winner from the same state.
+
+    With a buffer, or WRITE_BUFFER_ENABLED and no repository, the winner is only
+    queued; it is written, superseding earlier winners of its state, on the next
+    flush (see WinnerWriteBuffer for the durability guarantees).
     """
     try:
-        insert_winner(email, state, table_name)
+        if buffer is None and repository is None and config.WRITE_BUFFER_CONFIG["enabled"]:
+            buffer = get_write_buffer()
+        if buffer:
+            buffer.add(email, state, table_name)
+            log_info(f"Queued winner: {email} for state {state} in table {table_name}")
+            return
+        (repository or get_winner_repository()).insert_winner(email, state, table_name)
         log_info(f"Successfully added or updated winner: {email} for state {state} in table {table_name}")
     except Exception as e:
         log_error(f"Error adding winner: {e}")
 
 
-def get_all_winners(table_name: str):
+def get_all_winners(table_name: str, repository: WinnerRepository = None):
     """
     Retrieves all winners from the specified table.
     """
     try:
-        winners = get_winners(table_name)
+        winners = (repository or get_winner_repository()).get_winners(table_name)
         log_info(f"Retrieved {len(winners)} winners from {table_name}")
         return winners
     except Exception as e:
@@ -26,15 +89,63 @@ def get_all_winners(table_name: str):
         return []
 
 
-def count_winners(table_name: str) -> int:
+def count_winners(table_name: str, repository: WinnerRepository = None) -> int:
     """
     Returns the total number of winners in the specified table.
     """
     try:
-        count = get_winner_count(table_name)
+        count = (repository or get_winner_repository()).get_winner_count(table_name)
         log_info(f"Winner count for {table_name}: {count}")
         return count
     except Exception as e:
         log_error(f"Error counting winners: {e}")
         return 0
 
+
+def analytics_enabled() -> bool:
+    """
+    Returns True if finished runs are added to the summary tables.
+    """
+    return config.ANALYTICS_ENABLED and config.STORAGE_BACKEND == "postgres"
+
+
+def record_run_summary(table_name: str, winners_by_state: dict, replacements_by_state: dict = None,
+                       users_processed: int = 0) -> bool:
+    """
+    Adds a finished run to the per-state and per-day summary tables.
+
+    Returns:
+        bool: True if the run was added, False if it already was or on failure.
+    """
+    try:
+        from app.repositories import analytics_repository
+        return analytics_repository.record_run(table_name, winners_by_state, replacements_by_state, users_processed)
+    except Exception as e:
+        log_error(f"Error summarizing run {table_name}: {e}")
+        return False
+
+
+def get_wins_by_state() -> list:
+    """
+    Returns (state, wins, replacements, last_run) for every state that had a winner, most wins first.
+
+    Read from the summary tables, so the cost does not grow with the number of runs.
+    """
+    try:
+        from app.repositories import analytics_repository
+        return analytics_repository.get_wins_by_state()
+    except Exception as e:
+        log_error(f"Error fetching wins by state: {e}")
+        return []
+
+
+def get_runs_per_day(since=None) -> list:
+    """
+    Returns (day, runs, winners, replacements, users_processed) per day, from since if given.
+    """
+    try:
+        from app.repositories import analytics_repository
+        return analytics_repository.get_runs_per_day(since)
+    except Exception as e:
+        log_error(f"Error fetching runs per day: {e}")
+        return []
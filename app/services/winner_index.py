@@ -0,0 +1,69 @@
+from app.utils.constants import MAX_WINNER_COUNT
+
+
+class WinnerIndex:
+    """
+    In-process state -> email index of the winners of a single lottery run.
+
+    The index is seeded once from the winners table and is then kept up to date by
+    the lottery service, so insert vs. update decisions and the target check never
+    need a database round trip.
+    """
+
+    def __init__(self, target: int = MAX_WINNER_COUNT):
+        self.target = target
+        self._winners = {}
+
+    def seed(self, winners_by_state: dict):
+        """
+        Replaces the index contents with the given state -> email mapping.
+
+        Args:
+            winners_by_state (dict): Current winners keyed by state.
+        """
+        self._winners = dict(winners_by_state)
+
+    def record(self, email: str, state: str) -> bool:
+        """
+        Records a winner for a state.
+
+        Args:
+            email (str): Winner's email.
+            state (str): Winner's state.
+
+        Returns:
+            bool: True if an existing winner for the state was replaced, else False.
+        """
+        is_update = state in self._winners
+        self._winners[state] = email
+        return is_update
+
+    def is_complete(self) -> bool:
+        """
+        Returns True once the index covers the target number of states.
+        """
+        return len(self._winners) >= self.target
+
+    def remaining(self) -> int:
+        """
+        Returns the number of states still needed to reach the target.
+        """
+        return max(self.target - len(self._winners), 0)
+
+    def states(self) -> set:
+        """
+        Returns the set of states currently covered.
+        """
+        return set(self._winners)
+
+    def as_dict(self) -> dict:
+        """
+        Returns a copy of the state -> email mapping.
+        """
+        return dict(self._winners)
+
+    def __contains__(self, state):
+        return state in self._winners
+
+    def __len__(self):
+        return len(self._winners)
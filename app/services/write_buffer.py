@@ -0,0 +1,149 @@
+import threading
+import time
+from app.repositories.base import WinnerRepository
+from app.utils import config
+from app.utils.logger import log_info, log_error
+from app.utils.metrics import metrics
+
+
+class WinnerWriteBuffer:
+    """
+    Write-behind buffer of winners, coalescing superseded writes per state.
+
+    Winners are last-write-wins per state, so only the latest winner added for
+    a (table, state) pair is kept; earlier ones are dropped without ever
+    reaching the database. Pending winners are written with one upsert per
+    table when max_size states are pending, when the oldest has waited
+    max_age seconds (checked by a background thread), or on flush()/close().
+
+    Durability: a winner is only stored once a flush containing it returns.
+    Until then it exists in this process alone, so a crash loses at most the
+    pending winners (fewer than max_size states, at most about max_age
+    seconds old). After flush() or close() returns, every table holds, per
+    state, the winner added last. A failed flush keeps its winners pending
+    (unless newer ones were added meanwhile) and re-raises.
+
+    Args:
+        repository (WinnerRepository): Storage written to on flush.
+        max_size (int): Pending states that trigger a flush.
+        max_age (float): Seconds a pending winner may wait; 0 disables age flushes.
+    """
+
+    def __init__(self, repository: WinnerRepository, max_size: int = None, max_age: float = None):
+        settings = config.WRITE_BUFFER_CONFIG
+        self.repository = repository
+        self.max_size = max_size or settings["max_size"]
+        self.max_age = settings["max_age"] if max_age is None else max_age
+        self.stats = {"added": 0, "coalesced": 0, "written": 0, "flushes": 0}
+        # table -> state -> email, in order of first addition
+        self._pending = {}
+        self._pending_count = 0
+        self._oldest = None
+        self._lock = threading.Lock()
+        # Serializes flushes, so an older write can never land after a newer one
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher = None
+        if self.max_age > 0:
+            self._flusher = threading.Thread(target=self._flush_aged, name="write-buffer", daemon=True)
+            self._flusher.start()
+
+    def add(self, email: str, state: str, table_name: str):
+        """
+        Queues a winner, replacing any pending winner for the same state and table.
+        """
+        with self._lock:
+            if self._closed.is_set():
+                raise RuntimeError("Write buffer is closed")
+            table = self._pending.setdefault(table_name, {})
+            if state in table:
+                self.stats["coalesced"] += 1
+                metrics.inc("winner_writes_coalesced_total")
+            else:
+                self._pending_count += 1
+            table[state] = email
+            self.stats["added"] += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = self._pending_count >= self.max_size
+        if full:
+            self.flush()
+
+    def pending(self) -> int:
+        """
+        Returns the number of (table, state) winners not written yet.
+        """
+        with self._lock:
+            return self._pending_count
+
+    def flush(self) -> int:
+        """
+        Writes every pending winner, one upsert per table.
+
+        Returns:
+            int: Number of winners written.
+
+        Raises:
+            Exception: Whatever the repository raised; the unwritten winners stay pending.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._pending_count = 0
+                self._oldest = None
+            written = 0
+            try:
+                for table_name in list(batch):
+                    rows = [(email, state) for state, email in batch[table_name].items()]
+                    self.repository.upsert_winners(rows, table_name)
+                    written += len(rows)
+                    del batch[table_name]
+            except Exception:
+                self._restore(batch)
+                raise
+            finally:
+                self.stats["written"] += written
+                if written:
+                    self.stats["flushes"] += 1
+            return written
+
+    def _restore(self, batch: dict):
+        with self._lock:
+            for table_name, states in batch.items():
+                table = self._pending.setdefault(table_name, {})
+                for state, email in states.items():
+                    if state not in table:
+                        table[state] = email
+                        self._pending_count += 1
+            if self._pending_count and self._oldest is None:
+                self._oldest = time.monotonic()
+
+    def _flush_aged(self):
+        while not self._closed.wait(self.max_age / 2):
+            with self._lock:
+                aged = self._oldest is not None and time.monotonic() - self._oldest >= self.max_age
+            if aged:
+                try:
+                    self.flush()
+                except Exception as e:
+                    log_error(f"Error flushing buffered winners: {e}")
+
+    def close(self):
+        """
+        Stops age-based flushing and writes every pending winner.
+        """
+        self._closed.set()
+        if self._flusher:
+            self._flusher.join()
+        self.flush()
+        if self.stats["added"]:
+            log_info(
+                f"Write buffer stored {self.stats['written']} of {self.stats['added']} winners "
+                f"({self.stats['coalesced']} superseded writes coalesced away) in {self.stats['flushes']} flushes"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,120 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+
+# File header: magic, number of bits, number of hash functions, items added,
+# capacity and target error rate the filter was sized for
+HEADER = struct.Struct("<8sQQQQd")
+
+BLOOM_MAGIC = b"LOTBLM01"
+
+# Offset of the item count in the header
+COUNT_OFFSET = struct.calcsize("<8sQQ")
+
+
+def optimal_size(capacity: int, error_rate: float) -> tuple:
+    """
+    Returns the (bits, hash functions) that keep capacity items at error_rate.
+    """
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    """
+    Bloom filter of strings, persisted in a memory-mapped file.
+
+    Lookups read the mapped bits directly and never block. Additions take an
+    exclusive file lock, so several processes can share one filter file; since
+    bits are only ever set, a concurrent reader at worst misses an item that is
+    still being added.
+
+    Args:
+        path (str): Filter file; created, sized for capacity and error_rate, if missing.
+        capacity (int): Number of items the filter is sized for.
+        error_rate (float): Target false-positive rate at capacity.
+    """
+
+    def __init__(self, path: str, capacity: int, error_rate: float):
+        self.path = path
+        self._lock = threading.Lock()
+        if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+            self._create(capacity, error_rate)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.bits, self.hashes, _, self.capacity, self.error_rate = HEADER.unpack_from(self._map)
+        if magic != BLOOM_MAGIC or len(self._map) != HEADER.size + (self.bits + 7) // 8:
+            self.close()
+            raise ValueError(f"{path} is not a Bloom filter file")
+
+    def _create(self, capacity: int, error_rate: float):
+        bits, hashes = optimal_size(capacity, error_rate)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(BLOOM_MAGIC, bits, hashes, 0, capacity, error_rate))
+            f.truncate(HEADER.size + (bits + 7) // 8)
+        os.replace(temporary, self.path)
+
+    @property
+    def count(self) -> int:
+        """
+        Number of items added, including repeated additions of the same item.
+        """
+        return HEADER.unpack_from(self._map)[3]
+
+    def estimated_error_rate(self) -> float:
+        """
+        Returns the expected false-positive rate at the current item count.
+        """
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from the two halves of a single digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first, second = struct.unpack("<QQ", digest)
+        for i in range(self.hashes):
+            yield (first + i * second) % self.bits
+
+    def __contains__(self, item: str) -> bool:
+        bitmap = self._map
+        for position in self._positions(item):
+            if not bitmap[HEADER.size + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add_many(self, items) -> int:
+        """
+        Adds items and flushes the filter to disk.
+
+        Returns:
+            int: Number of items added.
+        """
+        added = 0
+        with self._lock:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                bitmap = self._map
+                for item in items:
+                    for position in self._positions(item):
+                        bitmap[HEADER.size + (position >> 3)] |= 1 << (position & 7)
+                    added += 1
+                struct.pack_into("<Q", bitmap, COUNT_OFFSET, self.count + added)
+                bitmap.flush()
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+        return added
+
+    def add(self, item: str):
+        self.add_many((item,))
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.close()
@@ -1,16 +1,264 @@
+"""
+Application settings, read from the environment (and .env) on first use.
+
+Settings are exposed as module attributes, e.g. config.FETCH_CONFIG, but
+nothing is read, and python-dotenv is not even imported, until the first
+attribute is accessed. Modules should therefore `from app.utils import config`
+and look settings up when they need them, rather than importing the values.
+"""
 import os
-from dotenv import load_dotenv
+from app.utils.constants import (
+    DEFAULT_DB_POOL_MIN_SIZE, DEFAULT_DB_POOL_MAX_SIZE, DEFAULT_DB_POOL_TIMEOUT, DEFAULT_DB_HEALTH_CHECK_INTERVAL,
+    DEFAULT_REQUEST_RATE, DEFAULT_REQUEST_BURST, DEFAULT_MAX_IN_FLIGHT,
+    DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, DEFAULT_MAX_RETRIES, DEFAULT_MAX_FAILURES, DEFAULT_RETRY_BACKOFF,
+    MAX_API_BATCH_SIZE, DEFAULT_SLEEP_TIME, DEFAULT_PAST_WINNERS_CAPACITY, DEFAULT_PAST_WINNERS_ERROR_RATE,
+    DEFAULT_PIPELINE_QUEUE_SIZE, DEFAULT_WRITE_BUFFER_MAX_SIZE, DEFAULT_WRITE_BUFFER_MAX_AGE,
+    DEFAULT_SCHEDULE, DEFAULT_RUN_STALE_AFTER, RUN_HEARTBEAT_INTERVAL
+)
+
+# Connection settings without which PostgreSQL storage cannot work, by DB_CONFIG key
+REQUIRED_DB_SETTINGS = {"dbname": "DB_NAME", "user": "DB_USER", "host": "DB_HOST"}
+
+# Loaded settings, see get_settings()
+_settings = None
+
+
+class ConfigError(ValueError):
+    """
+    Raised when a setting is missing or has an invalid value.
+    """
+
+
+def _int(name: str, default) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        raise ConfigError(f"{name} must be an integer, got {os.getenv(name)!r}") from None
+
+
+def _float(name: str, default) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        raise ConfigError(f"{name} must be a number, got {os.getenv(name)!r}") from None
+
+
+def _bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+def _choice(name: str, default: str, choices: tuple) -> str:
+    value = os.getenv(name, default).lower()
+    if value not in choices:
+        raise ConfigError(f"{name} must be one of {', '.join(choices)}, got {value!r}")
+    return value
+
+
+class Settings:
+    """
+    Every setting of the application, parsed from the environment.
+
+    Raises:
+        ConfigError: If a setting has a value that cannot be parsed.
+    """
+
+    def __init__(self):
+        self.API_URL = os.getenv("API_URL")
+
+        # "live" calls the API, "record" also appends every response to API_LOG_PATH,
+        # "replay" serves the recorded responses without network access
+        self.API_MODE = _choice("API_MODE", "live", ("live", "record", "replay"))
+
+        self.API_LOG_PATH = os.getenv("API_LOG_PATH", "api_log.jsonl.gz")
+
+        # "full" decodes whole API responses into dictionaries, "stream" parses the body
+        # incrementally into compact User records holding only email and state
+        self.API_PARSE_MODE = _choice("API_PARSE_MODE", "full", ("full", "stream"))
+
+        self.API_CLIENT_CONFIG = {
+            "connect_timeout": _float("API_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT),
+            "read_timeout": _float("API_READ_TIMEOUT", DEFAULT_READ_TIMEOUT),
+            "max_retries": _int("API_MAX_RETRIES", DEFAULT_MAX_RETRIES),
+            # Client errors or undecodable responses in a row before fetching gives up
+            "max_failures": _int("API_MAX_FAILURES", DEFAULT_MAX_FAILURES),
+            "retry_backoff": _float("API_RETRY_BACKOFF", DEFAULT_RETRY_BACKOFF)
+        }
+        if self.API_CLIENT_CONFIG["max_failures"] < 1:
+            raise ConfigError("API_MAX_FAILURES must be positive")
+
+        self.FETCH_CONFIG = {
+            "rate": _float("API_REQUEST_RATE", DEFAULT_REQUEST_RATE),
+            "burst": _float("API_REQUEST_BURST", DEFAULT_REQUEST_BURST),
+            "max_in_flight": _int("API_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT),
+            "adaptive_batch_size": _bool("API_ADAPTIVE_BATCH_SIZE", True),
+            "max_batch_size": _int("API_MAX_BATCH_SIZE", MAX_API_BATCH_SIZE),
+            # Longest single sleep after a failed or rate-limited request
+            "max_backoff": _float("API_MAX_BACKOFF", DEFAULT_SLEEP_TIME)
+        }
+
+        # Pipelined mode fetches and parses on a background stage that fills a bounded
+        # queue of batches, while the database writes drain it
+        self.PIPELINE_CONFIG = {
+            "enabled": _bool("PIPELINE_ENABLED", False),
+            "queue_size": _int("PIPELINE_QUEUE_SIZE", DEFAULT_PIPELINE_QUEUE_SIZE),
+        }
+        if self.PIPELINE_CONFIG["queue_size"] < 1:
+            raise ConfigError("PIPELINE_QUEUE_SIZE must be positive")
+
+        self.TABLE_PREFIX = os.getenv("TABLE_PREFIX", "winner_")
+
+        # "postgres", "sqlite" or "memory"
+        self.STORAGE_BACKEND = _choice("STORAGE_BACKEND", "postgres", ("postgres", "sqlite", "memory"))
+
+        self.SQLITE_PATH = os.getenv("SQLITE_PATH", "lottery.db")
+
+        # Postgres schema layout: "table_per_run" creates a winners table per run,
+        # "single" stores every run in one winners table keyed by run_id
+        self.SCHEMA_MODE = _choice("SCHEMA_MODE", "table_per_run", ("table_per_run", "single"))
+
+        # Hash partitions of the single winners table (0 disables partitioning)
+        self.WINNERS_PARTITIONS = _int("WINNERS_PARTITIONS", 0)
+
+        # Cross-run exclusion: winners of earlier runs cannot win again. Their emails
+        # are kept in a persistent Bloom filter at "path"; only probable hits are
+        # confirmed against the database
+        self.PAST_WINNERS_CONFIG = {
+            "enabled": _bool("EXCLUDE_PAST_WINNERS", False),
+            "path": os.getenv("PAST_WINNERS_FILTER_PATH", "past_winners.bloom"),
+            "capacity": _int("PAST_WINNERS_CAPACITY", DEFAULT_PAST_WINNERS_CAPACITY),
+            "error_rate": _float("PAST_WINNERS_ERROR_RATE", DEFAULT_PAST_WINNERS_ERROR_RATE),
+        }
+        if not 0 < self.PAST_WINNERS_CONFIG["error_rate"] < 1:
+            raise ConfigError("PAST_WINNERS_ERROR_RATE must be between 0 and 1")
+        if self.PAST_WINNERS_CONFIG["capacity"] < 1:
+            raise ConfigError("PAST_WINNERS_CAPACITY must be positive")
+
+        # Historical analytics: every finished run is added to per-state and per-day
+        # summary tables (PostgreSQL storage only)
+        self.ANALYTICS_ENABLED = _bool("ANALYTICS_ENABLED", True)
+
+        # Write-behind buffer of user_service.add_winner: only the latest winner per state
+        # is kept and written once max_size states are pending or max_age seconds passed
+        self.WRITE_BUFFER_CONFIG = {
+            "enabled": _bool("WRITE_BUFFER_ENABLED", False),
+            "max_size": _int("WRITE_BUFFER_MAX_SIZE", DEFAULT_WRITE_BUFFER_MAX_SIZE),
+            "max_age": _float("WRITE_BUFFER_MAX_AGE", DEFAULT_WRITE_BUFFER_MAX_AGE),
+        }
+        if self.WRITE_BUFFER_CONFIG["max_size"] < 1:
+            raise ConfigError("WRITE_BUFFER_MAX_SIZE must be positive")
+
+        # Runs left incomplete by a crash are continued on the next start instead of
+        # starting new ones (main.py --fresh overrides this). A run still marked running
+        # counts as crashed once it has made no progress for stale_after seconds.
+        self.RESUME_CONFIG = {
+            "enabled": _bool("RESUME_RUNS", True),
+            "stale_after": _float("RUN_STALE_AFTER", DEFAULT_RUN_STALE_AFTER),
+        }
+        if self.RESUME_CONFIG["stale_after"] <= RUN_HEARTBEAT_INTERVAL:
+            raise ConfigError(f"RUN_STALE_AFTER must be longer than the {RUN_HEARTBEAT_INTERVAL}s progress heartbeat")
+
+        # Daemon mode (main.py --daemon) draws on this schedule: an interval such as
+        # "every 10m" or a five-field cron expression such as "*/15 * * * *"
+        self.SCHEDULE = os.getenv("SCHEDULE", DEFAULT_SCHEDULE)
+
+        self.DB_CONFIG = {
+            "dbname": os.getenv("DB_NAME"),
+            "user": os.getenv("DB_USER"),
+            "password": os.getenv("DB_PASSWORD"),
+            "host": os.getenv("DB_HOST"),
+            "port": os.getenv("DB_PORT")
+        }
+
+        self.DB_POOL_CONFIG = {
+            "minconn": _int("DB_POOL_MIN_SIZE", DEFAULT_DB_POOL_MIN_SIZE),
+            "maxconn": _int("DB_POOL_MAX_SIZE", DEFAULT_DB_POOL_MAX_SIZE),
+            "timeout": _float("DB_POOL_TIMEOUT", DEFAULT_DB_POOL_TIMEOUT),
+            "health_check_interval": _float("DB_HEALTH_CHECK_INTERVAL", DEFAULT_DB_HEALTH_CHECK_INTERVAL)
+        }
+
+        # Logging: "sync" writes from the calling thread, "async" through a background
+        # writer; "text" or "json" output; LOG_LEVELS sets per-category levels, e.g.
+        # "repository=WARNING,winner=ERROR" (categories: app, api, db, repository, winner, result, metrics)
+        self.LOG_CONFIG = {
+            "mode": _choice("LOG_MODE", "sync", ("sync", "async")),
+            "format": _choice("LOG_FORMAT", "text", ("text", "json")),
+            "level": os.getenv("LOG_LEVEL", "INFO"),
+            "levels": os.getenv("LOG_LEVELS", ""),
+        }
+
+        # Instrumentation: METRICS_FILE receives Prometheus text at the end of every run,
+        # METRICS_PORT (0 = off) serves the same text at http://<METRICS_HOST>:<port>/metrics;
+        # only locally by default, since it exposes run names and DB/API statistics
+        self.METRICS_CONFIG = {
+            "enabled": _bool("METRICS_ENABLED", True),
+            "file": os.getenv("METRICS_FILE", ""),
+            "host": os.getenv("METRICS_HOST", "127.0.0.1"),
+            "port": _int("METRICS_PORT", 0),
+        }
+
+    def validate(self, database: bool = None, api: bool = None):
+        """
+        Checks that the settings needed by the configured backends are present.
+
+        Args:
+            database (bool): Require DB_NAME, DB_USER and DB_HOST; by default
+                only for PostgreSQL storage.
+            api (bool): Require API_URL; by default unless responses are
+                replayed from a log.
+
+        Raises:
+            ConfigError: Listing every missing setting.
+        """
+        if database is None:
+            database = self.STORAGE_BACKEND == "postgres"
+        if api is None:
+            api = self.API_MODE != "replay"
+        missing = []
+        if database:
+            missing += [name for key, name in REQUIRED_DB_SETTINGS.items() if not self.DB_CONFIG[key]]
+        if api and not self.API_URL:
+            missing.append("API_URL")
+        if missing:
+            raise ConfigError(f"Missing required settings: {', '.join(missing)} (see .env.example)")
+
+
+def get_settings() -> Settings:
+    """
+    Returns the settings, loading .env and parsing the environment on first use.
+
+    Raises:
+        ConfigError: If a setting has a value that cannot be parsed.
+    """
+    global _settings
+    if _settings is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        settings = Settings()
+        # Later lookups are plain module attribute reads
+        globals().update(vars(settings))
+        _settings = settings
+    return _settings
 
-load_dotenv()
 
-API_URL = os.getenv("API_URL")
+def reload_settings() -> Settings:
+    """
+    Re-reads the settings from the environment, e.g. after changing it in a test.
+    """
+    global _settings
+    if _settings is not None:
+        for name in vars(_settings):
+            globals().pop(name, None)
+    _settings = None
+    return get_settings()
 
-TABLE_PREFIX = os.getenv("TABLE_PREFIX")
 
-DB_CONFIG = {
-    "dbname": os.getenv("DB_NAME"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "host": os.getenv("DB_HOST"),
-    "port": os.getenv("DB_PORT")
-}
+def __getattr__(name: str):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    try:
+        return vars(get_settings())[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
@@ -4,5 +4,107 @@ MAX_WINNER_COUNT = 25
 # Default number of users to fetch per request
 DEFAULT_WINNER_SIZE = 5
 
-# Defaults to 10 seconds
+# Longest back-off after the API rate limits us or fails, defaults to 10 seconds
 DEFAULT_SLEEP_TIME = 10
+
+# Connections kept open in the database pool
+DEFAULT_DB_POOL_MIN_SIZE = 1
+
+# Upper bound on concurrently checked out database connections
+DEFAULT_DB_POOL_MAX_SIZE = 5
+
+# Seconds to wait for a free pooled connection before giving up
+DEFAULT_DB_POOL_TIMEOUT = 30
+
+# Seconds a pooled connection may sit idle before it is pinged on checkout
+DEFAULT_DB_HEALTH_CHECK_INTERVAL = 30
+
+# Sustained API request rate allowed by the fetch engine, in requests per second
+DEFAULT_REQUEST_RATE = 2.0
+
+# Number of API requests that may be sent back-to-back before rate limiting kicks in
+DEFAULT_REQUEST_BURST = 2
+
+# Maximum number of API requests in flight at once
+DEFAULT_MAX_IN_FLIGHT = 2
+
+# Lowest request rate the fetch engine backs off to, in requests per second
+MIN_REQUEST_RATE = 0.1
+
+# Seconds allowed to establish a connection to the API
+DEFAULT_CONNECT_TIMEOUT = 3.05
+
+# Seconds allowed between bytes of an API response
+DEFAULT_READ_TIMEOUT = 10
+
+# Retries of a single API request after a transient failure
+DEFAULT_MAX_RETRIES = 3
+
+# Non-retryable API failures in a row after which the fetch engine gives up
+DEFAULT_MAX_FAILURES = 5
+
+# Base delay of the jittered exponential retry back-off, in seconds
+DEFAULT_RETRY_BACKOFF = 0.5
+
+# Largest number of users the API returns in a single request
+MAX_API_BATCH_SIZE = 100
+
+# Number of distinct states the API draws addresses from
+US_STATE_COUNT = 50
+
+# Registry of lottery runs used by the single-table schema
+RUNS_TABLE = "lottery_runs"
+
+# Winners of every run when using the single-table schema
+WINNERS_TABLE = "winners"
+
+# Rows fetched per round trip by the export's server-side cursor
+EXPORT_FETCH_SIZE = 10000
+
+# Past winner emails the cross-run Bloom filter is sized for
+DEFAULT_PAST_WINNERS_CAPACITY = 100000
+
+# Target false-positive rate of the cross-run Bloom filter
+DEFAULT_PAST_WINNERS_ERROR_RATE = 0.001
+
+# Per-state totals of every summarized run
+STATE_STATS_TABLE = "state_stats"
+
+# Per-day totals of every summarized run
+DAILY_RUN_STATS_TABLE = "daily_run_stats"
+
+# Runs already added to the summary tables
+SUMMARIZED_RUNS_TABLE = "summarized_runs"
+
+# Status and progress of every table-per-run run, for resuming interrupted ones
+RUN_STATUS_TABLE = "run_status"
+
+# Batches a draw writes between saving its progress in the run registry
+RUN_CHECKPOINT_INTERVAL = 10
+
+# Seconds after which a draw renews its claim on its run even without new batches
+RUN_HEARTBEAT_INTERVAL = 60
+
+# Seconds without progress after which a running run is presumed dead and may be resumed
+DEFAULT_RUN_STALE_AFTER = 600
+
+# Fetched batches that may wait for the database writer in pipelined mode
+DEFAULT_PIPELINE_QUEUE_SIZE = 4
+
+# Seconds a blocked pipeline stage waits before checking whether it was stopped
+PIPELINE_POLL_INTERVAL = 0.1
+
+# Seconds to wait for the fetch stage to wind down once a pipelined run is complete
+PIPELINE_SHUTDOWN_TIMEOUT = 1.0
+
+# Pending states that make the winner write-behind buffer flush
+DEFAULT_WRITE_BUFFER_MAX_SIZE = 100
+
+# Seconds a winner may wait in the write-behind buffer before it is flushed
+DEFAULT_WRITE_BUFFER_MAX_AGE = 1.0
+
+# Schedule of draws in daemon mode when SCHEDULE is not set
+DEFAULT_SCHEDULE = "every 1h"
+
+# Prepared statements kept per database connection before the least recently used is deallocated
+STATEMENT_CACHE_SIZE = 64
@@ -1,20 +1,165 @@
+import atexit
+import functools
+import json
 import logging
+import logging.handlers
+import queue
 import sys
-from colorama import Fore, init
+from app.utils import config
 
 
-# Initialize colorama for colored log output
-init(autoreset=True)
+# Parent of the per-category loggers, e.g. "lottery.repository"
+LOGGER_NAMESPACE = "lottery"
 
+# Colour (colorama.Fore attribute) of each message tag in text output
+TAG_COLORS = {
+    "INFO": "BLUE",
+    "WARNING": "YELLOW",
+    "ERROR": "RED",
+    "NEW": "GREEN",
+    "UPDATE": "YELLOW",
+    "RESULT": "CYAN",
+    "WINNER": "MAGENTA",
+}
 
-# Configure logging settings
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout)  # Log to console
-    ]
-)
+# Background listener of the "async" logging mode
+_listener = None
+
+# Whether configure_logging() has run; logging is configured on first use
+_configured = False
+
+# Loggers of the message categories, by category
+_category_loggers = {}
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Console format: timestamp, level and the coloured "[TAG] message".
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(levelname)s - %(message)s")
+        self.colors = _tag_colors()
+
+    def formatMessage(self, record):
+        tag = getattr(record, "tag", None)
+        if not tag:
+            return super().formatMessage(record)
+        message = record.message
+        record.message = f"{self.colors.get(tag, '')}[{tag}] {message}"
+        try:
+            return super().formatMessage(record)
+        finally:
+            record.message = message
+
+
+@functools.cache
+def _tag_colors() -> dict:
+    # colorama is only needed, and initialized, once text output is configured
+    from colorama import Fore, init
+    init(autoreset=True)
+    return {tag: getattr(Fore, color) for tag, color in TAG_COLORS.items()}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line, with the structured fields of the record.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "category": record.name.removeprefix(f"{LOGGER_NAMESPACE}."),
+            "tag": getattr(record, "tag", None),
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread.
+
+    The stock QueueHandler formats every record before queueing it, which would
+    put the formatting cost back on the calling thread. Arguments of queued
+    records must therefore not be mutated after logging.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def parse_levels(spec: str) -> dict:
+    """
+    Parses per-category levels such as "repository=WARNING,api=DEBUG".
+
+    Returns:
+        dict: Category -> logging level number.
+    """
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        category, _, level = item.partition("=")
+        levels[category.strip()] = logging.getLevelName(level.strip().upper())
+        if not isinstance(levels[category.strip()], int):
+            raise ValueError(f"Unknown log level in LOG_LEVELS: {item}")
+    return levels
+
+
+def configure_logging(mode: str = None, fmt: str = None, level: str = None, levels: str = None):
+    """
+    Configures console logging; can be called again to switch modes.
+
+    Called automatically with the LOG_* settings the first time a message is
+    logged, so importing the application has no logging side effects.
+
+    Args:
+        mode (str): "sync" writes from the logging thread, "async" hands records
+            to a background writer through a queue.
+        fmt (str): "text" (coloured) or "json" (one object per line).
+        level (str): Default level of all categories.
+        levels (str): Per-category levels, e.g. "repository=WARNING,winner=ERROR".
+    """
+    global _listener, _configured
+    _configured = True
+    mode = mode or config.LOG_CONFIG["mode"]
+    fmt = fmt or config.LOG_CONFIG["format"]
+    if mode not in ("sync", "async"):
+        raise ValueError(f"Unknown LOG_MODE: {mode}")
+    if fmt not in ("text", "json"):
+        raise ValueError(f"Unknown LOG_FORMAT: {fmt}")
+
+    stop_listener()
+    # Created first: colorama wraps sys.stdout when text output is first configured
+    formatter = JSONFormatter() if fmt == "json" else TextFormatter()
+    handler = logging.StreamHandler(sys.stdout)  # Log to console
+    handler.setFormatter(formatter)
+    if mode == "async":
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, handler)
+        _listener.start()
+        handler = DeferredQueueHandler(records)
+
+    logging.basicConfig(level=(level or config.LOG_CONFIG["level"]).upper(), handlers=[handler], force=True)
+
+    for category, category_level in parse_levels(levels if levels is not None else config.LOG_CONFIG["levels"]).items():
+        category_logger(category).setLevel(category_level)
+
+
+def stop_listener():
+    """
+    Flushes and stops the background writer of the "async" mode, if running.
+    """
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_listener)
 
 
 def get_logger(name):
@@ -30,6 +175,27 @@ def get_logger(name):
     return logging.getLogger(name)
 
 
+def category_logger(category: str) -> logging.Logger:
+    """
+    Returns the logger of a message category, e.g. "repository" or "api".
+    """
+    # Cached, since logging.getLogger() takes the module-wide logging lock
+    logger = _category_loggers.get(category)
+    if logger is None:
+        if not _configured:
+            configure_logging()
+        logger = _category_loggers[category] = logging.getLogger(f"{LOGGER_NAMESPACE}.{category}")
+    return logger
+
+
+def _log(category, level, tag, message, args, fields=None):
+    logger = category_logger(category)
+    # Checked first so that disabled categories cost no formatting at all
+    if logger.isEnabledFor(level):
+        extra = {"tag": tag, "fields": fields} if fields else {"tag": tag}
+        logger.log(level, message, *args, extra=extra)
+
+
 def log_winner(email, state, table_name, is_update=False):
     """
     Logs information about adding or updating a winner.
@@ -40,10 +206,14 @@ def log_winner(email, state, table_name, is_update=False):
         table_name (str): Name of the table where winner is stored.
         is_update (bool): Indicates if it's an update (True) or a new addition (False).
     """
+    logger = category_logger("winner")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    fields = {"email": email, "state": state, "table": table_name, "is_update": is_update}
     if is_update:
-        logging.info(Fore.YELLOW + f"[UPDATE] Winner updated: {email} for {state} in {table_name}")
+        logger.info("Winner updated: %s for %s in %s", email, state, table_name, extra={"tag": "UPDATE", "fields": fields})
     else:
-        logging.info(Fore.GREEN + f"[NEW] Winner added: {email} for {state} in {table_name}")
+        logger.info("Winner added: %s for %s in %s", email, state, table_name, extra={"tag": "NEW", "fields": fields})
 
 
 def log_final_winners(table_name, winners):
@@ -54,37 +224,44 @@ def log_final_winners(table_name, winners):
         table_name (str): Name of the table where winners are stored.
         winners (list): List of winners.
     """
-    logging.info(Fore.CYAN + f"[RESULT] Final Winners Table: {table_name}")
+    _log("result", logging.INFO, "RESULT", "Final Winners Table: %s", (table_name,), {"table": table_name})
     for winner in winners:
-        logging.info(Fore.MAGENTA + f"[WINNER] {winner}")
+        _log("result", logging.INFO, "WINNER", "%s", (winner,))
 
 
-def log_info(message):
+def log_info(message, *args, category="app"):
     """
     Logs a general informational message.
 
     Args:
-        message (str): The info message to log.
+        message (str): The info message to log, optionally with %-style placeholders
+            that are only filled in if the message is actually written.
+        *args: Values for the placeholders.
+        category (str): Message category, see LOG_LEVELS.
     """
-    logging.info(Fore.BLUE + f"[INFO] {message}")
+    _log(category, logging.INFO, "INFO", message, args)
 
 
-def log_warning(message):
+def log_warning(message, *args, category="app"):
     """
     Logs a warning message.
 
     Args:
-        message (str): The warning message to log.
+        message (str): The warning message to log, optionally with %-style placeholders.
+        *args: Values for the placeholders.
+        category (str): Message category, see LOG_LEVELS.
     """
-    logging.warning(Fore.YELLOW + f"[WARNING] {message}")
+    _log(category, logging.WARNING, "WARNING", message, args)
 
 
-def log_error(message):
+def log_error(message, *args, category="app"):
     """
     Logs an error message.
 
     Args:
-        message (str): The error message to log.
+        message (str): The error message to log, optionally with %-style placeholders.
+        *args: Values for the placeholders.
+        category (str): Message category, see LOG_LEVELS.
     """
-    logging.error(Fore.RED + f"[ERROR] {message}")
+    _log(category, logging.ERROR, "ERROR", message, args)
 
@@ -0,0 +1,346 @@
+import bisect
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from app.utils import config
+from app.utils.logger import log_info, log_warning
+
+# Prefix of every exported metric name
+METRIC_PREFIX = "lottery"
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram in the Prometheus style.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction: float) -> float:
+        """
+        Returns the upper bound of the bucket holding the given quantile.
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of labelled counters and latency histograms.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        Adds value to a counter.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """
+        Records one latency observation in a histogram.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def counter_value(self, name: str, **labels) -> float:
+        """
+        Returns a counter's value, summed over every label set matching labels.
+        """
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(value for (key, key_labels), value in self.counters.items()
+                       if key == name and wanted <= set(key_labels))
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            lines = []
+            declared = set()
+            for (name, labels), value in counters:
+                full_name = f"{METRIC_PREFIX}_{name}"
+                if full_name not in declared:
+                    declared.add(full_name)
+                    lines.append(f"# TYPE {full_name} counter")
+                lines.append(f"{full_name}{_labels(labels)} {value:g}")
+            for (name, labels), histogram in histograms:
+                full_name = f"{METRIC_PREFIX}_{name}"
+                if full_name not in declared:
+                    declared.add(full_name)
+                    lines.append(f"# TYPE {full_name} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{full_name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{full_name}_sum{_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{full_name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """
+        Returns count, mean and approximate p50/p99 per histogram, plus every counter.
+        """
+        with self._lock:
+            latencies = {
+                f"{name}{_labels(labels)}": {
+                    "count": histogram.count,
+                    "mean_ms": histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+                    "p50_ms": histogram.quantile(0.50) * 1000,
+                    "p99_ms": histogram.quantile(0.99) * 1000,
+                    "total_s": histogram.sum,
+                }
+                for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0])
+            }
+            counters = {f"{name}{_labels(labels)}": value for (name, labels), value in sorted(self.counters.items())}
+        return {"latencies": latencies, "counters": counters}
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+# Shared registry every instrumented layer reports to
+metrics = MetricsRegistry()
+
+
+def timed(name: str, rows=None, **labels):
+    """
+    Decorator recording calls, errors, latency and optionally rows of a function.
+
+    Records <name>_calls_total (labelled with outcome "ok" or "error"),
+    <name>_duration_seconds and, when rows is given, <name>_rows_total.
+
+    Args:
+        name (str): Metric name stem, e.g. "db_operation".
+        rows (callable): Maps the function's result to the number of rows affected.
+        **labels: Constant labels, e.g. operation="get_winners".
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not config.METRICS_CONFIG["enabled"]:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except Exception:
+                metrics.inc(f"{name}_calls_total", outcome="error", **labels)
+                raise
+            finally:
+                metrics.observe(f"{name}_duration_seconds", time.perf_counter() - started, **labels)
+            metrics.inc(f"{name}_calls_total", outcome="ok", **labels)
+            if rows is not None:
+                metrics.inc(f"{name}_rows_total", rows(result), **labels)
+            return result
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Times a phase of a lottery run as lottery_phase_duration_seconds{phase=name}.
+
+    While tracemalloc is tracing (see app.utils.profiling), the net change of
+    traced memory over the phase is added to phase_memory_allocated_bytes_total
+    when it grew and to phase_memory_freed_bytes_total when it shrank, so that
+    both remain valid, never decreasing, counters.
+    """
+    tracing = tracemalloc.is_tracing()
+    memory_before = tracemalloc.get_traced_memory()[0] if tracing else 0
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if config.METRICS_CONFIG["enabled"]:
+            metrics.observe("phase_duration_seconds", time.perf_counter() - started, phase=name)
+            if tracing:
+                change = tracemalloc.get_traced_memory()[0] - memory_before
+                if change > 0:
+                    metrics.inc("phase_memory_allocated_bytes_total", change, phase=name)
+                elif change < 0:
+                    metrics.inc("phase_memory_freed_bytes_total", -change, phase=name)
+
+
+def timed_iteration(iterable, name: str):
+    """
+    Yields the items of iterable, timing every wait for the next item as a phase.
+    """
+    iterator = iter(iterable)
+    try:
+        while True:
+            with phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close:
+            close()
+
+
+def record_winner_writes(results: list):
+    """
+    Counts inserted vs. updated winners from (email, state, is_update) results.
+    """
+    if not config.METRICS_CONFIG["enabled"] or not results:
+        return
+    updates = sum(1 for _, _, is_update in results if is_update)
+    if updates:
+        metrics.inc("winner_writes_total", updates, kind="update")
+    if len(results) > updates:
+        metrics.inc("winner_writes_total", len(results) - updates, kind="insert")
+
+
+def write_metrics_file(path: str):
+    """
+    Atomically writes the metrics to path, e.g. for node_exporter's textfile collector.
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        f.write(metrics.render_prometheus())
+    os.replace(temporary, path)
+
+
+# Metrics HTTP server, if started
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = None):
+    """
+    Serves the metrics at http://<host>:<port>/metrics from a background thread.
+
+    Args:
+        host (str): Interface to listen on; defaults to METRICS_HOST (127.0.0.1).
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    global _server
+    from http.server import ThreadingHTTPServer
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host or config.METRICS_CONFIG["host"], port), metrics_handler())
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+            log_info("Serving metrics on %s:%s", *_server.server_address[:2], category="metrics")
+    return _server
+
+
+def stop_metrics_server():
+    """
+    Stops the metrics HTTP server if it is running.
+    """
+    global _server
+    with _server_lock:
+        if _server:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
+
+
+@functools.cache
+def metrics_handler():
+    """
+    Returns the request handler class serving /metrics.
+
+    Defined on first use so that http.server is only imported when serving.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+def log_run_summary():
+    """
+    Logs where the run spent its time and how much API and database work it did.
+    """
+    if not config.METRICS_CONFIG["enabled"]:
+        return
+    summary = metrics.summary()
+    for name, stats in summary["latencies"].items():
+        log_info("%s: n=%s total=%.3fs mean=%.2fms p50<=%.1fms p99<=%.1fms", name, stats["count"],
+                 stats["total_s"], stats["mean_ms"], stats["p50_ms"], stats["p99_ms"], category="metrics")
+    inserts = metrics.counter_value("winner_writes_total", kind="insert")
+    updates = metrics.counter_value("winner_writes_total", kind="update")
+    if inserts + updates:
+        log_info("Winner writes: %d inserts, %d updates (%.0f%% updates)", inserts, updates,
+                 updates / (inserts + updates) * 100, category="metrics")
+    log_info("API requests: %d (%d users); database operations: %d (%d rows)",
+             metrics.counter_value("api_request_calls_total"), metrics.counter_value("api_request_rows_total"),
+             metrics.counter_value("db_operation_calls_total"), metrics.counter_value("db_operation_rows_total"),
+             category="metrics")
+
+
+def publish_metrics():
+    """
+    Logs the end-of-run summary and writes METRICS_FILE, if configured.
+    """
+    log_run_summary()
+    if config.METRICS_CONFIG["enabled"] and config.METRICS_CONFIG["file"]:
+        try:
+            write_metrics_file(config.METRICS_CONFIG["file"])
+        except OSError as e:
+            log_warning("Could not write metrics to %s: %s", config.METRICS_CONFIG["file"], e, category="metrics")
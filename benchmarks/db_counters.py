@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import defaultdict
+import psycopg2.extensions
+
+
+class OperationRecorder:
+    """
+    Thread-safe collector of per-operation call latencies.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+
+    def record(self, operation: str, seconds: float):
+        with self._lock:
+            self.latencies[operation].append(seconds)
+
+    def count(self, prefix: str = "") -> int:
+        """
+        Returns the number of recorded calls whose operation starts with prefix.
+        """
+        with self._lock:
+            return sum(len(values) for name, values in self.latencies.items() if name.startswith(prefix))
+
+    def reset(self):
+        with self._lock:
+            self.latencies.clear()
+
+    def summary(self) -> dict:
+        """
+        Returns count, p50, p99 and max latency in milliseconds per operation.
+        """
+        with self._lock:
+            latencies = {name: sorted(values) for name, values in self.latencies.items()}
+        return {
+            name: {
+                "count": len(values),
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+            for name, values in latencies.items() if values
+        }
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+# Shared recorder the counting connection and cursor report to
+recorder = OperationRecorder()
+
+
+def statement_name(query, cursor) -> str:
+    """
+    Names a statement after its SQL verb, e.g. "db.INSERT".
+    """
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    elif not isinstance(query, str):
+        query = query.as_string(cursor)
+    words = query.split(None, 1)
+    return f"db.{words[0].upper()}" if words else "db.EMPTY"
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    """
+    Cursor that times every round trip to the server.
+    """
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            recorder.record(statement_name(query, self), time.perf_counter() - started)
+
+
+class CountingConnection(psycopg2.extensions.connection):
+    """
+    Connection whose cursors and commits are timed by the shared recorder.
+
+    Pass as connection_factory to psycopg2.connect() (or init_connection_pool()).
+    """
+
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault("cursor_factory", CountingCursor)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            recorder.record("db.commit", time.perf_counter() - started)
@@ -0,0 +1,166 @@
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+US_STATES = [
+    "Alabama", "Alaska", "Arizona", "Arkansas", "California", "Colorado", "Connecticut", "Delaware",
+    "Florida", "Georgia", "Hawaii", "Idaho", "Illinois", "Indiana", "Iowa", "Kansas", "Kentucky",
+    "Louisiana", "Maine", "Maryland", "Massachusetts", "Michigan", "Minnesota", "Mississippi",
+    "Missouri", "Montana", "Nebraska", "Nevada", "New Hampshire", "New Jersey", "New Mexico",
+    "New York", "North Carolina", "North Dakota", "Ohio", "Oklahoma", "Oregon", "Pennsylvania",
+    "Rhode Island", "South Carolina", "South Dakota", "Tennessee", "Texas", "Utah", "Vermont",
+    "Virginia", "Washington", "West Virginia", "Wisconsin", "Wyoming",
+]
+
+
+def state_weights(distribution: str) -> list:
+    """
+    Parses a state distribution specification into one weight per state.
+
+    Args:
+        distribution (str): "uniform", "zipf:<exponent>" or the path of a JSON
+            object mapping state names to weights.
+
+    Returns:
+        list: Weights aligned with US_STATES.
+    """
+    if distribution == "uniform":
+        return [1.0] * len(US_STATES)
+    if distribution.startswith("zipf:"):
+        exponent = float(distribution.split(":", 1)[1])
+        return [1 / (rank ** exponent) for rank in range(1, len(US_STATES) + 1)]
+    with open(distribution) as f:
+        weights = json.load(f)
+    return [float(weights.get(state, 0)) for state in US_STATES]
+
+
+class FakeRandomUserAPI:
+    """
+    Threaded HTTP server imitating GET <url>?size=N of the random user API.
+
+    Lets lottery runs be measured without depending on, or being rate limited
+    by, the real endpoint.
+
+    Args:
+        latency (float): Mean response delay in seconds.
+        jitter (float): Maximum extra random delay in seconds.
+        error_rate (float): Fraction of requests answered with a 503.
+        distribution (str): State distribution, see state_weights().
+        seed (int): Seed for reproducible users and failures.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 distribution: str = "uniform", seed: int = None, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.weights = state_weights(distribution)
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.users_served = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/users/random_user"
+
+    def start(self) -> str:
+        """
+        Starts serving in a background thread and returns the endpoint URL.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-api", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        """
+        Stops the server.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def make_users(self, size: int) -> list:
+        """
+        Generates size users shaped like the real API's responses.
+        """
+        with self._lock:
+            states = self.random.choices(US_STATES, weights=self.weights, k=size)
+            ids = [self.random.randrange(10 ** 9) for _ in range(size)]
+            self.users_served += size
+        return [
+            {
+                "id": user_id,
+                "uid": str(uuid.UUID(int=user_id)),
+                "first_name": "Bench",
+                "last_name": f"User{user_id}",
+                "username": f"bench.user{user_id}",
+                "email": f"bench.user{user_id}@email.com",
+                "avatar": "https://robohash.org/bench.png?size=300x300&set=set1",
+                "gender": "Agender",
+                "phone_number": "+1 555-555-5555",
+                "date_of_birth": "1990-01-01",
+                "employment": {"title": "Engineer", "key_skill": "Benchmarking"},
+                "address": {
+                    "city": "Benchville",
+                    "street_name": "Bench Street",
+                    "street_address": "1 Bench Street",
+                    "zip_code": "00000",
+                    "state": state,
+                    "country": "United States",
+                    "coordinates": {"lat": 0.0, "lng": 0.0},
+                },
+                "credit_card": {"cc_number": "0000-0000-0000-0000"},
+                "subscription": {"plan": "Basic", "status": "Active", "payment_method": "Cash", "term": "Monthly"},
+            }
+            for user_id, state in zip(ids, states)
+        ]
+
+    def _respond(self, size: int):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return 503, b'{"error": "Service Unavailable"}'
+        return 200, json.dumps(self.make_users(size)).encode("utf-8")
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                size = int(query.get("size", ["1"])[0])
+                status, body = api._respond(size)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,88 @@
+"""
+Measures the start-up cost of importing the application.
+
+Each module is imported in a fresh interpreter several times; the median wall
+time minus that of a bare interpreter is reported, together with the
+cumulative import time of the module itself (python -X importtime) and which
+heavy third-party packages the import pulled in. Test collection is timed the
+same way.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules whose import time is measured
+MODULES = [
+    "app.utils.config",
+    "app.utils.logger",
+    "app.utils.metrics",
+    "app.repositories.factory",
+    "app.api.fetch_engine",
+    "app.services.lottery_service",
+    "main",
+]
+
+# Dependencies that should only be imported when actually used
+HEAVY_PACKAGES = ["requests", "psycopg2", "dotenv", "colorama", "http.server"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="Interpreter starts per module")
+    parser.add_argument("--no-collect", action="store_true", help="Skip timing pytest's test collection")
+    return parser.parse_args()
+
+
+def wall_time(args: list, runs: int) -> float:
+    """
+    Returns the median wall time in seconds of running the interpreter with args.
+    """
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def import_time(module: str) -> float:
+    """
+    Returns the cumulative import time of module in seconds, as reported by -X importtime.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            check=True, capture_output=True, text=True)
+    for line in reversed(result.stderr.splitlines()):
+        fields = [field.strip() for field in line.removeprefix("import time:").split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1e6
+    return float("nan")
+
+
+def loaded_heavy_packages(module: str) -> list:
+    """
+    Returns the heavy packages found in sys.modules after importing module.
+    """
+    code = f"import sys, {module}; print(','.join(p for p in {HEAVY_PACKAGES!r} if p in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    return [package for package in result.stdout.strip().split(",") if package]
+
+
+def main():
+    args = parse_args()
+    baseline = wall_time(["-c", "pass"], args.runs)
+    print(f"Bare interpreter: {baseline * 1000:.1f} ms\n")
+    print(f"{'module':<32}{'wall':>10}{'importtime':>12}  heavy packages loaded")
+    for module in MODULES:
+        wall = wall_time(["-c", f"import {module}"], args.runs) - baseline
+        heavy = ", ".join(loaded_heavy_packages(module)) or "-"
+        print(f"{module:<32}{wall * 1000:>7.1f} ms{import_time(module) * 1000:>9.1f} ms  {heavy}")
+
+    if not args.no_collect:
+        collect = wall_time(["-m", "pytest", "--collect-only", "-q", "-p", "no:cacheprovider"], max(1, args.runs // 2))
+        print(f"\npytest --collect-only: {collect * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
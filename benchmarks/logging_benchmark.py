@@ -0,0 +1,67 @@
+"""
+Micro-benchmark of logging overhead on the lottery's hot path.
+
+Times log_winner() and a repository log_info() call, as made once per written
+winner and once per repository call, in every logging mode. Output goes to
+os.devnull so only the cost of logging itself is measured. For the "async"
+mode the calling-thread cost and the time to drain the queue are reported
+separately.
+"""
+import argparse
+import os
+import sys
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50000, help="Log calls per mode")
+    return parser.parse_args()
+
+
+# (label, LOG_MODE, LOG_FORMAT, LOG_LEVELS)
+MODES = [
+    ("sync text", "sync", "text", ""),
+    ("sync json", "sync", "json", ""),
+    ("async text", "async", "text", ""),
+    ("async json", "async", "json", ""),
+    ("disabled", "sync", "text", "winner=WARNING,repository=WARNING"),
+]
+
+
+def measure(calls: int, label: str, mode: str, fmt: str, levels: str) -> dict:
+    from app.utils.logger import configure_logging, stop_listener, log_winner, log_info
+
+    configure_logging(mode=mode, fmt=fmt, level="INFO", levels=levels)
+    started = time.perf_counter()
+    for i in range(calls):
+        log_winner("bench.user@email.com", "Ohio", "winner_20240101_000000_v1", is_update=bool(i & 1))
+        log_info("Total winners in %s: %s", "winner_20240101_000000_v1", i, category="repository")
+    calling = time.perf_counter() - started
+    stop_listener()
+    total = time.perf_counter() - started
+    return {
+        "mode": label,
+        "calling_us": calling / (2 * calls) * 1e6,
+        "total_us": total / (2 * calls) * 1e6,
+    }
+
+
+def main():
+    args = parse_args()
+    stdout = sys.stdout
+    # Handlers write to sys.stdout as it is when logging is configured
+    sys.stdout = open(os.devnull, "w")
+    try:
+        results = [measure(args.calls, *mode) for mode in MODES]
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"{'mode':<12}{'calling thread':>16}{'incl. writer':>16}")
+    for result in results:
+        print(f"{result['mode']:<12}{result['calling_us']:>13.2f} us{result['total_us']:>13.2f} us")
+
+
+if __name__ == "__main__":
+    main()
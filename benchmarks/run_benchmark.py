@@ -0,0 +1,179 @@
+"""
+End-to-end benchmark of the lottery pipeline.
+
+Starts a local fake random user API, runs process_winners against the configured
+storage backend (for Postgres, point DB_* at a local, disposable database;
+database round trips are only counted for Postgres), and reports time to
+completion, API calls, database round trips, commits and p50/p99 latency per
+operation. Results are written as JSON so runs on different commits can be
+compared with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from benchmarks.db_counters import CountingConnection, recorder
+from benchmarks.fake_api import FakeRandomUserAPI
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Metrics compared by --compare, all "lower is better"
+SUMMARY_METRICS = ["time_s", "api_calls", "api_calls_per_lottery", "users_served", "db_round_trips", "commits"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Number of lottery runs to measure")
+    parser.add_argument("--lotteries", type=int, default=1, help="Concurrent lotteries sharing one user stream per run")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean fake API latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Maximum extra fake API latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API requests failing with 503")
+    parser.add_argument("--distribution", default="uniform",
+                        help='State distribution: "uniform", "zipf:<exponent>" or a JSON file of weights')
+    parser.add_argument("--rate", type=float, default=50, help="API request rate limit for the fetch engine")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="Concurrent API requests")
+    parser.add_argument("--parse-mode", choices=["full", "stream"], default="full", help="API response parsing mode")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the fake API")
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier result file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Keep the application's INFO logging")
+    return parser.parse_args()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def api_operation_summary(client_stats: dict) -> dict:
+    if "latency_p50" not in client_stats:
+        return {}
+    return {
+        "count": client_stats["requests"],
+        "p50_ms": client_stats["latency_p50"] * 1000,
+        "p99_ms": client_stats["latency_p99"] * 1000,
+        "max_ms": client_stats["latency_max"] * 1000,
+    }
+
+
+def run_benchmark(args) -> dict:
+    with FakeRandomUserAPI(args.latency, args.jitter, args.error_rate, args.distribution, args.seed) as api:
+        # Settings are read from the environment the first time one is used (the
+        # STORAGE_BACKEND import below), so the environment has to be in place first.
+        os.environ["API_URL"] = api.url
+        os.environ["API_MODE"] = "live"
+        os.environ["API_PARSE_MODE"] = args.parse_mode
+        os.environ["API_REQUEST_RATE"] = str(args.rate)
+        os.environ["API_REQUEST_BURST"] = str(max(args.rate / 10, 1))
+        if args.max_in_flight:
+            os.environ["API_MAX_IN_FLIGHT"] = str(args.max_in_flight)
+
+        from app.api.fetch_random_users import get_api_client, close_api_client
+        from app.repositories.factory import close_winner_repository
+        from app.services.lottery_service import process_lotteries
+        from app.utils.config import STORAGE_BACKEND
+        from app.utils.logger import configure_logging
+
+        # Configured now, since logging is otherwise set up with LOG_LEVEL on the first message
+        if not args.verbose:
+            configure_logging(level="WARNING")
+
+        if STORAGE_BACKEND == "postgres":
+            from app.db.db_connection import init_connection_pool
+            init_connection_pool(connection_factory=CountingConnection)
+        runs = []
+        try:
+            for run in range(args.runs):
+                close_api_client()
+                recorder.reset()
+                requests_before, users_before = api.requests, api.users_served
+
+                started = time.perf_counter()
+                process_lotteries(args.lotteries)
+                elapsed = time.perf_counter() - started
+
+                operations = recorder.summary()
+                api_operations = api_operation_summary(get_api_client().latency_stats())
+                if api_operations:
+                    operations["api.get_users"] = api_operations
+                runs.append({
+                    "time_s": elapsed,
+                    "api_calls": api.requests - requests_before,
+                    "api_calls_per_lottery": (api.requests - requests_before) / args.lotteries,
+                    "users_served": api.users_served - users_before,
+                    "db_round_trips": recorder.count("db."),
+                    "commits": recorder.count("db.commit"),
+                    "operations": operations,
+                })
+                print(f"run {run + 1}/{args.runs}: {elapsed:.3f}s, {runs[-1]['api_calls']} API calls, "
+                      f"{runs[-1]['db_round_trips']} DB round trips")
+        finally:
+            close_api_client()
+            close_winner_repository()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "params": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        "summary": {
+            metric: {
+                "median": statistics.median(run[metric] for run in runs),
+                "min": min(run[metric] for run in runs),
+                "max": max(run[metric] for run in runs),
+            }
+            for metric in SUMMARY_METRICS
+        },
+        "runs": runs,
+    }
+
+
+def compare(result: dict, baseline: dict):
+    print(f"\nComparison with {baseline['meta']['commit']} ({baseline['meta']['timestamp']}):")
+    print(f"{'metric':<22}{'baseline':>12}{'current':>12}{'change':>10}")
+    for metric in SUMMARY_METRICS:
+        if metric not in baseline["summary"]:
+            continue
+        old = baseline["summary"][metric]["median"]
+        new = result["summary"][metric]["median"]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{metric:<22}{old:>12.3f}{new:>12.3f}{change:>10}")
+
+
+def main():
+    args = parse_args()
+    result = run_benchmark(args)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{result['meta']['commit']}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    print("\nSummary (median of runs):")
+    for metric in SUMMARY_METRICS:
+        print(f"  {metric:<22}{result['summary'][metric]['median']:.3f}")
+    print("Per-operation latency (last run):")
+    for name, stats in sorted(result["runs"][-1]["operations"].items()):
+        print(f"  {name:<16}n={stats['count']:<6}p50={stats['p50_ms']:.2f}ms  p99={stats['p99_ms']:.2f}ms")
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Micro-benchmark of per-table statements: interpolated SQL vs. prepared statements.
+
+Against the configured PostgreSQL database (point DB_* at a disposable one),
+a run table is filled with a full set of winners and every operation is timed
+both ways on one connection: as ad-hoc SQL with the table name interpolated,
+parsed and planned by the server on every call (how the repository used to
+issue them), and through the prepared statement cache. The table is dropped
+afterwards.
+"""
+import argparse
+import time
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+from app.db.db_connection import get_connection, close_connection
+from app.repositories import winner_repository
+from app.repositories.statement_cache import StatementCache
+from app.utils import config
+from app.utils.constants import MAX_WINNER_COUNT
+from benchmarks.db_counters import percentile
+
+UPSERT_SQL = """
+    INSERT INTO {table} (email, state) VALUES %s
+    ON CONFLICT (state) DO UPDATE SET email = EXCLUDED.email
+    RETURNING state, (xmax = 0) AS inserted
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="Calls per operation and method")
+    return parser.parse_args()
+
+
+def adhoc(cursor, table_name: str, operation: str, rows: list):
+    if operation == "upsert":
+        execute_values(cursor, UPSERT_SQL.format(table=table_name), rows, fetch=True)
+        return
+    query = {"select": "SELECT * FROM {}", "by_state": "SELECT state, email FROM {}",
+             "count": "SELECT COUNT(*) FROM {}"}[operation]
+    cursor.execute(query.format(table_name))
+    cursor.fetchall()
+
+
+def prepared(cache: StatementCache, cursor, table_name: str, operation: str, rows: list):
+    params = ([email for email, _ in rows], [state for _, state in rows]) if operation == "upsert" else ()
+    cache.execute(cursor, table_name, operation, params)
+    cursor.fetchall()
+
+
+def measure(call, iterations: int) -> list:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)
+
+
+def main():
+    args = parse_args()
+    config.get_settings().validate(database=True, api=False)
+    table_name = winner_repository.create_versioned_table(winner_repository.get_new_version())
+    rows = [(f"bench{i}@example.com", f"State {i}") for i in range(MAX_WINNER_COUNT)]
+    cache = StatementCache()
+    try:
+        with get_connection() as conn:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                adhoc(cursor, table_name, "upsert", rows)
+                print(f"{'operation':<10}{'ad-hoc p50':>12}{'prepared p50':>14}{'ad-hoc mean':>13}"
+                      f"{'prepared mean':>15}{'speed-up':>10}")
+                for operation in ("select", "by_state", "count", "upsert"):
+                    plain = measure(lambda: adhoc(cursor, table_name, operation, rows), args.iterations)
+                    cached = measure(lambda: prepared(cache, cursor, table_name, operation, rows), args.iterations)
+                    plain_mean, cached_mean = sum(plain) / len(plain), sum(cached) / len(cached)
+                    print(f"{operation:<10}{percentile(plain, 0.5) * 1e6:>9.0f} us{percentile(cached, 0.5) * 1e6:>11.0f} us"
+                          f"{plain_mean * 1e6:>10.0f} us{cached_mean * 1e6:>12.0f} us{plain_mean / cached_mean:>9.2f}x")
+                cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(table_name)))
+            conn.autocommit = False
+    finally:
+        close_connection()
+
+
+if __name__ == "__main__":
+    main()
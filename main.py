@@ -1,10 +1,89 @@
-from app.services.lottery_service import process_winners
+import argparse
+import signal
+import sys
+from app.services.lottery_service import process_winners, process_lotteries
+from app.services.scheduler import DrawScheduler, parse_schedule, warm_up
+from app.utils import config
+from app.utils.metrics import start_metrics_server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Runs the lottery.")
+    parser.add_argument("--lotteries", type=int, default=1,
+                        help="Number of lotteries to run concurrently from one shared user stream")
+    parser.add_argument("--profile", nargs="?", const="profile", metavar="PREFIX",
+                        help="Profile the run, writing PREFIX.pstats and PREFIX.txt (default prefix: profile)")
+    parser.add_argument("--profile-top", type=int, default=25, metavar="N",
+                        help="Functions and allocation sites listed in the profile report")
+    parser.add_argument("--max-sleep", type=float, metavar="SECONDS",
+                        help="Cap on each retry/rate-limit sleep (overrides API_MAX_BACKOFF)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Fetch on a background stage while writing (overrides PIPELINE_ENABLED)")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running and draw on a schedule until SIGTERM or Ctrl+C")
+    parser.add_argument("--schedule", metavar="SPEC",
+                        help='Daemon schedule: an interval ("every 10m", "30s") or a cron expression '
+                             '("0 9 * * 1-5"); overrides SCHEDULE')
+    parser.add_argument("--max-draws", type=int, metavar="N", help="Exit the daemon after N draws")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Start new runs instead of resuming incomplete ones, which are marked abandoned "
+                             "(overrides RESUME_RUNS)")
+    return parser.parse_args()
 
 
 def main():
-    process_winners()
+    args = parse_args()
+    try:
+        config.get_settings().validate()
+    except config.ConfigError as e:
+        sys.exit(f"Configuration error: {e}")
+    if args.max_sleep is not None:
+        config.FETCH_CONFIG["max_backoff"] = args.max_sleep
+    if args.pipeline:
+        config.PIPELINE_CONFIG["enabled"] = True
+    if config.METRICS_CONFIG["port"]:
+        start_metrics_server(config.METRICS_CONFIG["port"], config.METRICS_CONFIG["host"])
+
+    resume = False if args.fresh else None
+
+    def run():
+        if args.lotteries > 1:
+            return process_lotteries(args.lotteries, resume=resume)
+        return process_winners(resume=resume)
+
+    try:
+        if args.daemon:
+            try:
+                schedule = parse_schedule(args.schedule or config.SCHEDULE)
+            except ValueError as e:
+                sys.exit(f"Invalid schedule: {e}")
+            scheduler = DrawScheduler(schedule, run, args.max_draws)
+            signal.signal(signal.SIGTERM, scheduler.stop)
+            signal.signal(signal.SIGINT, scheduler.stop)
+            warm_up()
+            scheduler.run()
+        elif args.profile:
+            from app.utils.profiling import profile_call
+            profile_call(run, args.profile, args.profile_top)
+        else:
+            run()
+    finally:
+        shut_down()
+
+
+def shut_down():
+    """
+    Flushes buffered winners, then closes the API client's session and the shared
+    repository with its connection pool.
+    """
+    from app.api.fetch_random_users import close_api_client
+    from app.repositories.factory import close_winner_repository
+    from app.services.user_service import close_write_buffer
+
+    close_write_buffer()
+    close_api_client()
+    close_winner_repository()
 
 
 if __name__ == "__main__":
     main()
-
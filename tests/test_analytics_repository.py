@@ -0,0 +1,88 @@
+import unittest
+from datetime import date
+from unittest.mock import patch, MagicMock
+from app.repositories import analytics_repository
+from app.repositories.analytics_repository import record_run, run_day, backfill
+from app.repositories.base import RUN_RUNNING, RUN_COMPLETE, RUN_ABANDONED
+from app.repositories.memory_repository import MemoryWinnerRepository
+
+
+class TestRecordRun(unittest.TestCase):
+    def setUp(self):
+        """Set up a mock connection and skip creating the summary tables"""
+        self.mock_conn = MagicMock()
+        self.cursor = self.mock_conn.cursor.return_value.__enter__.return_value
+        patcher = patch.object(analytics_repository, "_schema_ready", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("app.repositories.analytics_repository.execute_values")
+    @patch("app.repositories.analytics_repository.get_connection")
+    def test_run_is_added_in_one_transaction(self, mock_get_conn, mock_execute_values):
+        """Test that a new run updates both summary tables and commits once"""
+        mock_get_conn.return_value.__enter__.return_value = self.mock_conn
+        self.cursor.fetchone.return_value = ("winner_20240102_090000_v7",)
+
+        added = record_run("winner_20240102_090000_v7", {"CA": "a@example.com", "NY": "b@example.com"},
+                           {"CA": 2, "TX": 1}, users_processed=40)
+
+        self.assertTrue(added)
+        state_rows = mock_execute_values.call_args.args[2]
+        self.assertEqual(state_rows, [
+            ("CA", 1, 2, "winner_20240102_090000_v7"),
+            ("NY", 1, 0, "winner_20240102_090000_v7"),
+            ("TX", 0, 1, None),
+        ])
+        daily_params = self.cursor.execute.call_args.args[1]
+        self.assertEqual(daily_params, (date(2024, 1, 2), 2, 3, 40))
+        self.mock_conn.commit.assert_called_once()
+
+    @patch("app.repositories.analytics_repository.execute_values")
+    @patch("app.repositories.analytics_repository.get_connection")
+    def test_summarized_run_is_skipped(self, mock_get_conn, mock_execute_values):
+        """Test that recording a run twice does not count it twice"""
+        mock_get_conn.return_value.__enter__.return_value = self.mock_conn
+        self.cursor.fetchone.return_value = None
+
+        self.assertFalse(record_run("winner_20240102_090000_v7", {"CA": "a@example.com"}))
+
+        mock_execute_values.assert_not_called()
+        self.assertEqual(self.cursor.execute.call_count, 1)
+        self.mock_conn.commit.assert_not_called()
+
+    def test_run_day(self):
+        """Test that the day comes from the run name's timestamp"""
+        self.assertEqual(run_day("winner_20231231_235959_v12"), date(2023, 12, 31))
+        self.assertEqual(run_day("winner_v3"), date.today())
+
+    @patch("app.repositories.analytics_repository.record_run", return_value=True)
+    @patch("app.repositories.analytics_repository.get_summarized_runs")
+    def test_backfill_adds_missing_runs(self, mock_summarized, mock_record_run):
+        """Test that backfill summarizes only the runs not summarized yet"""
+        repository = MemoryWinnerRepository()
+        first = repository.create_versioned_table(repository.get_new_version())
+        second = repository.create_versioned_table(repository.get_new_version())
+        repository.insert_winner("a@example.com", "CA", second)
+        for table_name in (first, second):
+            repository.record_run_progress(table_name, RUN_COMPLETE)
+        mock_summarized.return_value = {first}
+
+        self.assertEqual(backfill(repository), 1)
+        mock_record_run.assert_called_once_with(second, {"CA": "a@example.com"})
+
+    @patch("app.repositories.analytics_repository.record_run", return_value=True)
+    @patch("app.repositories.analytics_repository.get_summarized_runs", return_value=set())
+    def test_backfill_skips_unfinished_runs(self, mock_summarized, mock_record_run):
+        """Test that runs in progress and abandoned runs are not summarized"""
+        repository = MemoryWinnerRepository()
+        tables = [repository.create_versioned_table(repository.get_new_version()) for _ in range(3)]
+        for table_name, status in zip(tables, (RUN_RUNNING, RUN_ABANDONED, RUN_COMPLETE)):
+            repository.insert_winner(f"{status}@example.com", "CA", table_name)
+            repository.record_run_progress(table_name, status)
+
+        self.assertEqual(backfill(repository), 1)
+        mock_record_run.assert_called_once_with(tables[2], {"CA": "complete@example.com"})
+
+
+if __name__ == "__main__":
+    unittest.main()
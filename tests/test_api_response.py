@@ -1,8 +1,10 @@
 import unittest
 from unittest.mock import patch, Mock
 import requests
-from app.api.fetch_random_users import fetch_random_users
-from app.utils.config import API_URL
+from app.api.fetch_random_users import (
+    fetch_random_users, RandomUserClient, RandomUserAPIError, close_api_client
+)
+from app.utils.config import API_URL, API_CLIENT_CONFIG
 
 class TestRandomUserAPI(unittest.TestCase):
     def setUp(self):
@@ -42,7 +44,11 @@ class TestRandomUserAPI(unittest.TestCase):
             }
         }
 
-    @patch('requests.get')
+    def tearDown(self):
+        """Drop the shared client so every test starts with fresh statistics"""
+        close_api_client()
+
+    @patch('requests.Session.get')
     def test_response_structure(self, mock_get):
         """Test the basic structure and data types of the API response"""
         # Setup mock response
@@ -131,8 +137,9 @@ class TestRandomUserAPI(unittest.TestCase):
         for field in required_str_fields:
             self.assertIsInstance(subscription.get(field), str)
 
-    @patch('requests.get')
-    def test_error_handling(self, mock_get):
+    @patch('app.api.fetch_random_users.time.sleep')
+    @patch('requests.Session.get')
+    def test_error_handling(self, mock_get, mock_sleep):
         """Test API error handling"""
         # Use actual requests exceptions
         error_cases = [
@@ -150,7 +157,7 @@ class TestRandomUserAPI(unittest.TestCase):
                 # Should return empty list on error
                 self.assertEqual(result, [])
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_size_parameter(self, mock_get):
         """Test that the size parameter is correctly passed to the API"""
         mock_response = Mock()
@@ -161,7 +168,79 @@ class TestRandomUserAPI(unittest.TestCase):
         sizes_to_test = [1, 3, 5, 10]
         for size in sizes_to_test:
             fetch_random_users(size)
-            mock_get.assert_called_with(f"{API_URL}?size={size}")
+            mock_get.assert_called_with(
+                f"{API_URL}?size={size}",
+                timeout=(API_CLIENT_CONFIG["connect_timeout"], API_CLIENT_CONFIG["read_timeout"])
+            )
+
+    @patch('app.api.fetch_random_users.time.sleep')
+    @patch('requests.Session.get')
+    def test_transient_errors_are_retried(self, mock_get, mock_sleep):
+        """Test that transient failures are retried with back-off and then succeed"""
+        mock_response = Mock()
+        mock_response.json.return_value = [self.sample_user]
+        mock_response.raise_for_status.return_value = None
+        mock_get.side_effect = [
+            requests.exceptions.ConnectionError("Connection reset"),
+            requests.exceptions.Timeout("Read timed out"),
+            mock_response,
+        ]
+
+        client = RandomUserClient(max_retries=3, retry_backoff=0.5)
+        users = client.get_users(1)
+
+        self.assertEqual(users, [self.sample_user])
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        # Full jitter never sleeps longer than the exponential cap
+        self.assertLessEqual(mock_sleep.call_args_list[0].args[0], 0.5)
+        self.assertLessEqual(mock_sleep.call_args_list[1].args[0], 1.0)
+
+        stats = client.latency_stats()
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["errors"], {"connection": 1, "timeout": 1})
+        self.assertIn("latency_p99", stats)
+
+    @patch('app.api.fetch_random_users.time.sleep')
+    @patch('requests.Session.get')
+    def test_truncated_bodies_are_retried(self, mock_get, mock_sleep):
+        """Test that a response body cut off or garbled mid-transfer counts as a connection error"""
+        mock_response = Mock()
+        mock_response.json.return_value = [self.sample_user]
+        mock_response.raise_for_status.return_value = None
+        mock_get.side_effect = [
+            requests.exceptions.ChunkedEncodingError("Connection broken: IncompleteRead"),
+            requests.exceptions.ContentDecodingError("Received response with content-encoding: gzip"),
+            mock_response,
+        ]
+
+        client = RandomUserClient(max_retries=3, retry_backoff=0.5)
+
+        self.assertEqual(client.get_users(1), [self.sample_user])
+        self.assertEqual(client.latency_stats()["errors"], {"connection": 2})
+
+    @patch('app.api.fetch_random_users.time.sleep')
+    @patch('requests.Session.get')
+    def test_error_classification(self, mock_get, mock_sleep):
+        """Test that HTTP errors are classified and only transient ones are retried"""
+        cases = [(429, "rate_limited", True), (503, "server", True), (404, "client", False)]
+
+        for status, category, transient in cases:
+            with self.subTest(status=status):
+                mock_get.reset_mock()
+                response = Mock(status_code=status, headers={"Retry-After": "2"})
+                response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=response)
+                mock_get.return_value = response
+
+                client = RandomUserClient(max_retries=1)
+                with self.assertRaises(RandomUserAPIError) as ctx:
+                    client.get_users(1)
+
+                self.assertEqual(ctx.exception.category, category)
+                self.assertEqual(ctx.exception.status, status)
+                self.assertEqual(ctx.exception.transient, transient)
+                self.assertEqual(mock_get.call_count, 2 if transient else 1)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from app.services.batch_sizing import AdaptiveBatchSizer
+from app.services.winner_index import WinnerIndex
+
+
+class TestAdaptiveBatchSizer(unittest.TestCase):
+    def test_initial_estimate_matches_coupon_collector(self):
+        """Test that with no observations the estimate is the uniform coupon-collector expectation"""
+        index = WinnerIndex(target=25)
+        sizer = AdaptiveBatchSizer(index, min_size=1, max_size=1000, state_count=50)
+
+        expected = sum(50 / (50 - i) for i in range(25))
+        self.assertAlmostEqual(sizer.expected_draws(), expected)
+
+    def test_size_grows_as_coverage_gets_harder(self):
+        """Test that the batch size increases when the remaining states are rare"""
+        index = WinnerIndex(target=4)
+        sizer = AdaptiveBatchSizer(index, min_size=1, max_size=1000, state_count=4)
+        first = sizer.next_size()
+
+        # Three common states are covered, the missing one has never been seen
+        for state in ["A", "B", "C"]:
+            index.record(f"{state}@example.com", state)
+        sizer.observe(["A", "B", "C"] * 30)
+
+        self.assertGreater(sizer.next_size(), first)
+        self.assertEqual(sizer.calls, 2)
+
+    def test_size_is_bounded_and_split_across_parallel_requests(self):
+        """Test that sizes respect the minimum, the API maximum and the parallelism"""
+        index = WinnerIndex(target=25)
+        serial = AdaptiveBatchSizer(index, min_size=5, max_size=100, state_count=50)
+        parallel = AdaptiveBatchSizer(index, min_size=5, max_size=100, parallelism=4, state_count=50)
+        capped = AdaptiveBatchSizer(index, min_size=5, max_size=10, state_count=50)
+
+        self.assertEqual(serial.next_size(), 35)
+        self.assertEqual(parallel.next_size(), 9)
+        self.assertEqual(capped.next_size(), 10)
+
+        complete = WinnerIndex(target=0)
+        self.assertEqual(AdaptiveBatchSizer(complete, min_size=5).next_size(), 5)
+
+    def test_summary_reports_calls_saved(self):
+        """Test that the summary compares actual calls with the fixed-size policy"""
+        sizer = AdaptiveBatchSizer(WinnerIndex(target=25), min_size=5, max_size=100, state_count=50)
+        sizer.next_size()
+        sizer.next_size()
+
+        summary = sizer.summary(users_processed=40)
+        self.assertEqual(summary["calls"], 2)
+        self.assertEqual(summary["fixed_calls_actual"], 8)
+        self.assertEqual(summary["calls_saved"], 6)
+        self.assertEqual(summary["fixed_calls_expected"], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
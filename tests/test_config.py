@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+from app.utils import config
+
+
+class TestConfig(unittest.TestCase):
+    def tearDown(self):
+        """Restore the settings of the real environment"""
+        config.reload_settings()
+
+    def test_invalid_number_fails_on_load(self):
+        """Test that an unparsable setting raises a ConfigError naming it"""
+        with patch.dict(os.environ, {"API_MAX_RETRIES": "three"}):
+            with self.assertRaisesRegex(config.ConfigError, "API_MAX_RETRIES"):
+                config.reload_settings()
+
+    def test_boolean_settings_accept_the_same_values(self):
+        """Test that every flag accepts 1, true and yes in any case, and anything else disables it"""
+        for value, expected in (("1", True), ("Yes", True), ("TRUE", True), ("0", False), ("off", False)):
+            with self.subTest(value=value), patch.dict(os.environ, {"API_ADAPTIVE_BATCH_SIZE": value,
+                                                                    "RESUME_RUNS": value}):
+                config.reload_settings()
+                self.assertIs(config.FETCH_CONFIG["adaptive_batch_size"], expected)
+                self.assertIs(config.RESUME_CONFIG["enabled"], expected)
+
+    def test_validate_lists_missing_settings(self):
+        """Test that validation reports every missing database and API setting"""
+        environment = {"STORAGE_BACKEND": "postgres", "API_MODE": "live", "DB_NAME": "lottery",
+                       "DB_USER": "", "DB_HOST": "", "API_URL": ""}
+        with patch.dict(os.environ, environment):
+            settings = config.reload_settings()
+            with self.assertRaisesRegex(config.ConfigError, "DB_USER, DB_HOST, API_URL"):
+                settings.validate()
+            settings.validate(database=False, api=False)
+
+    def test_settings_are_module_attributes(self):
+        """Test that reloaded settings replace the module attributes"""
+        with patch.dict(os.environ, {"TABLE_PREFIX": "draw_"}):
+            config.reload_settings()
+            self.assertEqual(config.TABLE_PREFIX, "draw_")
+
+    def test_import_defers_heavy_dependencies(self):
+        """Test that importing the entry point neither loads settings nor heavy packages"""
+        code = ("import sys, main; from app.utils import config; "
+                "print(config._settings is None, [m for m in ('requests', 'psycopg2', 'dotenv', 'colorama') "
+                "if m in sys.modules])")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(result.stdout.strip(), "True []")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,73 +1,155 @@
+import threading
 import unittest
 from unittest.mock import patch, MagicMock
-from app.db.db_connection import get_db_connection, close_connection
-from app.utils.config import DB_CONFIG
+import psycopg2
+from app.db.db_connection import (
+    ConnectionPool, DatabaseConnectionError, get_connection, get_connection_pool, close_connection
+)
+from app.utils.config import DB_CONFIG, DB_POOL_CONFIG
+
+
+def make_connection(closed=0):
+    """Creates a mock psycopg2 connection"""
+    conn = MagicMock()
+    conn.closed = closed
+    return conn
+
 
 class TestDatabaseConnection(unittest.TestCase):
     def setUp(self):
-        """Reset the connection before each test"""
-        # Access the global _connection variable through the module
+        """Reset the connection pool before each test"""
+        # Access the global _pool variable through the module
         import app.db.db_connection as db_module
-        db_module._connection = None
+        db_module._pool = None
 
     def tearDown(self):
         """Clean up after each test"""
         close_connection()
 
-    @patch('psycopg2.connect')
-    def test_successful_connection(self, mock_connect):
-        """Test successful database connection"""
+    @patch('psycopg2.pool.ThreadedConnectionPool')
+    def test_successful_connection(self, mock_pool_cls):
+        """Test successful database connection pool creation"""
         # Create a mock connection
-        mock_conn = MagicMock()
-        mock_connect.return_value = mock_conn
+        mock_conn = make_connection()
+        mock_pool_cls.return_value.getconn.return_value = mock_conn
 
         # Get connection
-        connection = get_db_connection()
+        with get_connection() as connection:
+            self.assertEqual(connection, mock_conn)
 
         # Assertions
-        mock_connect.assert_called_once_with(**DB_CONFIG)
-        self.assertIsNotNone(connection)
+        mock_pool_cls.assert_called_once_with(DB_POOL_CONFIG["minconn"], DB_POOL_CONFIG["maxconn"], **DB_CONFIG)
+        mock_pool_cls.return_value.putconn.assert_called_once_with(mock_conn, close=False)
 
-        # Test connection reuse (should not create new connection)
-        second_connection = get_db_connection()
-        self.assertEqual(connection, second_connection)
-        mock_connect.assert_called_once()  # Should still be called only once
+        # Test pool reuse (should not create a new pool)
+        self.assertIs(get_connection_pool(), get_connection_pool())
+        mock_pool_cls.assert_called_once()  # Should still be called only once
 
-    @patch('psycopg2.connect')
-    def test_failed_connection(self, mock_connect):
+    @patch('psycopg2.pool.ThreadedConnectionPool')
+    def test_failed_connection(self, mock_pool_cls):
         """Test database connection failure"""
         # Make the connection fail
-        mock_connect.side_effect = Exception("Connection failed")
+        mock_pool_cls.side_effect = psycopg2.OperationalError("Connection failed")
 
         # Attempt to get connection
-        connection = get_db_connection()
+        with self.assertRaises(DatabaseConnectionError):
+            with get_connection():
+                pass
 
-        # Assertions
-        mock_connect.assert_called_once_with(**DB_CONFIG)
-        self.assertIsNone(connection)
-
-    def test_close_connection(self):
-        """Test closing the database connection"""
-        # Create a mock connection first
+    @patch('psycopg2.pool.ThreadedConnectionPool')
+    def test_close_connection(self, mock_pool_cls):
+        """Test closing the database connection pool"""
         import app.db.db_connection as db_module
-        mock_conn = MagicMock()
-        db_module._connection = mock_conn
+        get_connection_pool()
 
-        # Close the connection
+        # Close the pool
         close_connection()
 
         # Assertions
-        mock_conn.close.assert_called_once()
-        self.assertIsNone(db_module._connection)
+        mock_pool_cls.return_value.closeall.assert_called_once()
+        self.assertIsNone(db_module._pool)
 
     def test_close_nonexistent_connection(self):
-        """Test closing when no connection exists"""
-        # Ensure no connection exists
+        """Test closing when no pool exists"""
+        # Ensure no pool exists
         import app.db.db_connection as db_module
-        db_module._connection = None
+        db_module._pool = None
 
         # This should not raise any errors
         close_connection()
 
+
+class TestConnectionPool(unittest.TestCase):
+    def make_pool(self, mock_pool_cls, **kwargs):
+        options = {"minconn": 1, "maxconn": 2, "timeout": 0.1, "health_check_interval": 0}
+        options.update(kwargs)
+        return ConnectionPool(**options, dbname="test")
+
+    @patch('psycopg2.pool.ThreadedConnectionPool')
+    def test_dead_connection_is_replaced(self, mock_pool_cls):
+        """Test that a closed connection is discarded and reopened on checkout"""
+        dead_conn, fresh_conn = make_connection(closed=1), make_connection()
+        mock_pool_cls.return_value.getconn.side_effect = [dead_conn, fresh_conn]
+        pool = self.make_pool(mock_pool_cls)
+
+        with pool.connection() as conn:
+            self.assertIs(conn, fresh_conn)
+
+        mock_pool_cls.return_value.putconn.assert_any_call(dead_conn, close=True)
+        self.assertEqual(pool.stats()["reconnects"], 1)
+
+    @patch('psycopg2.pool.ThreadedConnectionPool')
+    def test_idle_connection_is_pinged(self, mock_pool_cls):
+        """Test that a connection idle past the health check interval is pinged"""
+        conn = make_connection()
+        broken_conn = make_connection()
+        broken_conn.cursor.return_value.__enter__.return_value.execute.side_effect = psycopg2.OperationalError("gone")
+        mock_pool_cls.return_value.getconn.side_effect = [broken_conn, broken_conn, conn]
+        pool = self.make_pool(mock_pool_cls)
+
+        # First checkout of a new connection is not pinged
+        with pool.connection():
+            pass
+        with pool.connection() as checked_out:
+            self.assertIs(checked_out, conn)
+
+        self.assertEqual(pool.stats()["reconnects"], 1)
+
+    @patch('psycopg2.pool.ThreadedConnectionPool')
+    def test_error_rolls_back_and_returns_connection(self, mock_pool_cls):
+        """Test that an error inside the block rolls back and still returns the connection"""
+        conn = make_connection()
+        mock_pool_cls.return_value.getconn.return_value = conn
+        pool = self.make_pool(mock_pool_cls)
+
+        with self.assertRaises(ValueError):
+            with pool.connection():
+                raise ValueError("boom")
+
+        conn.rollback.assert_called_once()
+        mock_pool_cls.return_value.putconn.assert_called_once_with(conn, close=False)
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+    @patch('psycopg2.pool.ThreadedConnectionPool')
+    def test_checkout_waits_and_times_out(self, mock_pool_cls):
+        """Test that checkouts beyond the pool size wait and eventually time out"""
+        mock_pool_cls.return_value.getconn.side_effect = lambda: make_connection()
+        pool = self.make_pool(mock_pool_cls, maxconn=1)
+
+        held = pool.checkout()
+        with self.assertRaises(DatabaseConnectionError):
+            pool.checkout()
+
+        releaser = threading.Timer(0.02, pool.checkin, args=(held,))
+        releaser.start()
+        pool.checkin(pool.checkout())
+        releaser.join()
+
+        stats = pool.stats()
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreater(stats["wait_time_max"], 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,91 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from app.db.export_winners import export, select_runs, parse_run_version
+from app.repositories.base import RUN_RUNNING, RUN_COMPLETE, RUN_ABANDONED
+from app.repositories.sqlite_repository import SQLiteWinnerRepository
+from app.utils import config
+
+
+class TestExportWinners(unittest.TestCase):
+    def setUp(self):
+        """Three runs of two winners each in an SQLite database"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.repository = SQLiteWinnerRepository()
+        self.runs = []
+        for run in range(3):
+            table_name = self.repository.create_versioned_table(self.repository.get_new_version())
+            self.repository.upsert_winners([(f"a{run}@example.com", "CA"), (f"b{run}@example.com", "NY")], table_name)
+            self.repository.record_run_progress(table_name, RUN_COMPLETE)
+            self.runs.append(table_name)
+        config.get_settings()
+        self.patches = [
+            patch("app.db.export_winners.create_winner_repository", return_value=self.repository),
+            patch.object(config, "STORAGE_BACKEND", "sqlite"),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.directory.cleanup()
+
+    def test_select_runs(self):
+        """Test run selection by name and by version"""
+        self.assertEqual(select_runs(self.repository), self.runs)
+        self.assertEqual(select_runs(self.repository, since_version=1), self.runs[1:])
+        self.assertEqual(select_runs(self.repository, runs=[self.runs[2]], since_version=1), self.runs[2:])
+        with self.assertRaises(ValueError):
+            select_runs(self.repository, runs=["winner_unknown"])
+        self.assertEqual(parse_run_version(self.runs[2]), 3)
+
+    def test_unfinished_runs_are_not_selected(self):
+        """Test that unfinished runs are skipped, and an incremental export stops at a run in progress"""
+        rows = [("c@example.com", "TX")]
+        abandoned, running, complete = (self.repository.create_versioned_table(self.repository.get_new_version())
+                                        for _ in range(3))
+        for table_name, status in ((abandoned, RUN_ABANDONED), (running, RUN_RUNNING), (complete, RUN_COMPLETE)):
+            self.repository.upsert_winners(rows, table_name)
+            self.repository.record_run_progress(table_name, status)
+
+        self.assertEqual(select_runs(self.repository), self.runs + [complete])
+        self.assertEqual(select_runs(self.repository, since_version=0), self.runs)
+        for unfinished in (abandoned, running):
+            with self.assertRaises(ValueError):
+                select_runs(self.repository, runs=[unfinished])
+
+        self.repository.record_run_progress(running, RUN_COMPLETE)
+        self.assertEqual(select_runs(self.repository, since_version=3), [running, complete])
+
+    def test_compressed_csv_export(self):
+        """Test that a .gz path writes a compressed CSV with a header row"""
+        path = os.path.join(self.directory.name, "winners.csv.gz")
+
+        summary = export(path, "csv")
+
+        with gzip.open(path, "rt", newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["run", "id", "email", "state"])
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(summary, {"runs": 3, "rows": 6, "last_version": 3})
+
+    def test_incremental_jsonl_export(self):
+        """Test that --since-version exports only newer runs"""
+        path = os.path.join(self.directory.name, "winners.jsonl")
+
+        summary = export(path, "jsonl", since_version=2)
+
+        with open(path) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual({row["run"] for row in rows}, {self.runs[2]})
+        self.assertEqual(rows[0]["email"], "a2@example.com")
+        self.assertEqual(summary["last_version"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+from app.api.fetch_engine import FetchEngine, TokenBucket
+from app.api.fetch_random_users import RandomUserAPIError
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate_limited(self):
+        """Test that the burst is served immediately and later tokens are paced"""
+        bucket = TokenBucket(rate=50, capacity=2)
+
+        started = time.monotonic()
+        for _ in range(4):
+            self.assertTrue(bucket.acquire())
+        elapsed = time.monotonic() - started
+
+        # Two tokens come from the burst, the other two take 1/50s each
+        self.assertGreaterEqual(elapsed, 0.035)
+
+    def test_acquire_aborts_on_stop(self):
+        """Test that a waiting acquire returns False once the stop event is set"""
+        bucket = TokenBucket(rate=0.01, capacity=1)
+        bucket.acquire()
+        stop = threading.Event()
+        threading.Timer(0.02, stop.set).start()
+
+        self.assertFalse(bucket.acquire(stop))
+
+
+class TestFetchEngine(unittest.TestCase):
+    def test_streams_batches_until_consumer_stops(self):
+        """Test that batches are streamed and fetching stops when the consumer breaks"""
+        fetch = Mock(side_effect=lambda size: [{"email": "a@example.com"}] * size)
+        engine = FetchEngine(fetch=fetch, rate=1000, burst=10, max_in_flight=3)
+
+        batches = []
+        for users in engine.stream(5):
+            batches.append(users)
+            if len(batches) == 4:
+                break
+
+        self.assertEqual(len(batches), 4)
+        self.assertTrue(all(len(users) == 5 for users in batches))
+        fetch.assert_called_with(5)
+        calls = fetch.call_count
+        time.sleep(0.05)
+        self.assertLessEqual(fetch.call_count - calls, engine.max_in_flight)
+
+    def test_backs_off_on_rate_limit(self):
+        """Test that a 429 halves the rate, pauses and is followed by a retry"""
+        responses = iter([RandomUserAPIError("429 Error", "rate_limited", 429, 0.05), [{"email": "a@example.com"}]])
+
+        def fetch(size):
+            response = next(responses)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        engine = FetchEngine(fetch=fetch, rate=100, burst=1, max_in_flight=1)
+
+        started = time.monotonic()
+        batches = []
+        for users in engine.stream(1):
+            batches.append(users)
+            if users:
+                break
+
+        self.assertEqual(batches, [[], [{"email": "a@example.com"}]])
+        self.assertGreaterEqual(time.monotonic() - started, 0.025)
+        self.assertEqual(engine.stats["backoffs"], 1)
+        self.assertLess(engine.bucket.rate, 100)
+
+    def test_client_errors_back_off(self):
+        """Test that non-retryable errors are reported as empty batches after a back-off"""
+        fetch = Mock(side_effect=[RandomUserAPIError("404 Error", "client", 404), RandomUserAPIError("Invalid JSON", "decode"), [1]])
+        engine = FetchEngine(fetch=fetch, rate=1000, burst=3, max_in_flight=1, max_backoff=0.01)
+
+        batches = []
+        for users in engine.stream(1):
+            batches.append(users)
+            if users:
+                break
+
+        self.assertEqual(batches, [[], [], [1]])
+        self.assertEqual(engine.stats["backoffs"], 2)
+        self.assertEqual(engine.stats["failures"], 2)
+
+    def test_gives_up_after_consecutive_client_errors(self):
+        """Test that a permanently failing API ends the stream with an error"""
+        fetch = Mock(side_effect=RandomUserAPIError("404 Error", "client", 404))
+        engine = FetchEngine(fetch=fetch, rate=1000, burst=3, max_in_flight=1, max_backoff=0.01, max_failures=3)
+
+        batches = []
+        with self.assertRaises(RandomUserAPIError) as raised:
+            for users in engine.stream(1):
+                batches.append(users)
+
+        self.assertEqual(raised.exception.category, "client")
+        self.assertEqual(batches, [[], []])
+        self.assertEqual(engine.stats["backoffs"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
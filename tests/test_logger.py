@@ -0,0 +1,74 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+from app.utils.logger import configure_logging, stop_listener, log_info, log_winner, parse_levels
+
+
+class CountingArg:
+    """Counts how often it is rendered into a message."""
+
+    def __init__(self):
+        self.renders = 0
+
+    def __str__(self):
+        self.renders += 1
+        return "rendered"
+
+
+class TestLogger(unittest.TestCase):
+    def setUp(self):
+        """Send log output to a buffer"""
+        self.output = io.StringIO()
+        self.stdout = patch("sys.stdout", self.output)
+        self.stdout.start()
+
+    def tearDown(self):
+        """Restore the default logging configuration"""
+        self.stdout.stop()
+        configure_logging()
+
+    def test_json_output_has_structured_fields(self):
+        """Test that JSON output carries the category and winner fields"""
+        configure_logging(mode="sync", fmt="json", level="INFO", levels="")
+
+        log_winner("a@example.com", "CA", "winner_test_v1", is_update=True)
+
+        entry = json.loads(self.output.getvalue())
+        self.assertEqual(entry["category"], "winner")
+        self.assertEqual(entry["tag"], "UPDATE")
+        self.assertEqual((entry["email"], entry["state"], entry["is_update"]), ("a@example.com", "CA", True))
+
+    def test_disabled_category_is_not_formatted(self):
+        """Test that a switched-off category neither writes nor renders its arguments"""
+        configure_logging(mode="sync", fmt="text", level="INFO", levels="repository=WARNING")
+        arg = CountingArg()
+
+        log_info("Total winners in %s", arg, category="repository")
+        log_info("Kept %s", arg)
+
+        self.assertEqual(arg.renders, 1)
+        self.assertNotIn("Total winners", self.output.getvalue())
+        self.assertIn("[INFO] Kept rendered", self.output.getvalue())
+
+    def test_async_mode_writes_in_background(self):
+        """Test that queued records are formatted by the writer and flushed on stop"""
+        configure_logging(mode="async", fmt="text", level="INFO", levels="")
+
+        for i in range(100):
+            log_info("message %s", i)
+        stop_listener()
+
+        lines = self.output.getvalue().splitlines()
+        self.assertEqual(len(lines), 100)
+        self.assertTrue(lines[-1].endswith("message 99"))
+
+    def test_parse_levels(self):
+        """Test per-category level parsing"""
+        self.assertEqual(parse_levels(" repository=warning, api=DEBUG "), {"repository": 30, "api": 10})
+        with self.assertRaises(ValueError):
+            parse_levels("repository=LOUD")
+
+
+if __name__ == "__main__":
+    unittest.main()
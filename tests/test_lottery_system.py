@@ -1,50 +1,327 @@
+import os
+import tempfile
+import threading
 import unittest
 from unittest.mock import patch, MagicMock
-from app.services.lottery_service import process_winners
-from app.repositories.winner_repository import (
-    create_versioned_table, insert_winner, get_winner_count, get_winners, get_new_version
-)
-from app.api.fetch_random_users import fetch_default_users
+from app.repositories.memory_repository import MemoryWinnerRepository
+from app.services.lottery_service import process_winners, process_lotteries
+from app.services.past_winners import PastWinnerFilter
+from app.services.winner_index import WinnerIndex
+from app.utils import config
 from app.utils.logger import get_logger
 from app.utils.constants import MAX_WINNER_COUNT
 
 logger = get_logger(__name__)
 
 
+def make_users(states):
+    """Builds API-shaped user dictionaries for the given states."""
+    return [
+        {"email": f"user{i}@example.com", "address": {"state": state}}
+        for i, state in enumerate(states)
+    ]
+
+
+class FakeFetchEngine:
+    """Stands in for FetchEngine, streaming a fixed list of batches."""
+
+    max_in_flight = 1
+
+    def __init__(self, batches):
+        self.batches = batches
+        self.fetches = 0
+        self.sizes = []
+        self.stats = {"requests": 0}
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def stream(self, size):
+        for batch in self.batches:
+            if isinstance(batch, Exception):
+                raise batch
+            self.fetches += 1
+            self.stats["requests"] += 1
+            self.sizes.append(size() if callable(size) else size)
+            yield batch
+
+    def stop(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
 class TestLotteryService(unittest.TestCase):
     def setUp(self):
         """Set up test environment."""
-        self.table_name = "winners_test_table"
-
-    @patch("app.repositories.winner_repository.get_new_version", return_value=1)
-    @patch("app.repositories.winner_repository.create_versioned_table", return_value="winners_test_table")
-    @patch("app.repositories.winner_repository.get_winner_count")
-    @patch("app.repositories.winner_repository.insert_winner")
-    @patch("app.repositories.winner_repository.get_winners", return_value=[{"email": "test@example.com", "state": "CA"}])
-    @patch("app.api.fetch_random_users.fetch_default_users", return_value=[{"email": "test@example.com", "address": {"state": "CA"}}])
-    def test_process_winners(self, mock_fetch_users, mock_get_winners, mock_insert, mock_get_count, mock_create_table, mock_get_version):
-        """Test the complete lottery process with proper winner count increments and validations."""
-        mock_get_count.side_effect = [0] + [i for i in range(1, MAX_WINNER_COUNT)]
+        self.states = [f"State {i}" for i in range(MAX_WINNER_COUNT)]
+        self.repository = MagicMock(wraps=MemoryWinnerRepository())
 
-        # Ensure function calls are recorded
-        mock_create_table.reset_mock()
-        mock_fetch_users.reset_mock()
-        mock_insert.reset_mock()
-        mock_get_winners.reset_mock()
+    def test_process_winners(self):
+        """Test the complete lottery process with proper winner count increments and validations."""
+        users = make_users(self.states)
+        # Five batches of five users, with a duplicate state in the first batch
+        batches = [users[i:i + 5] for i in range(0, len(users), 5)]
+        batches[0] = batches[0] + [{"email": "late@example.com", "address": {"state": self.states[0]}}]
+        engine = FakeFetchEngine(batches)
 
-        winners = process_winners()
+        with patch("app.services.lottery_service.FetchEngine", engine):
+            winners = process_winners(self.repository)
 
         # Ensure the number of winners is correct
         self.assertIsInstance(winners, list)
         self.assertEqual(len(winners), MAX_WINNER_COUNT, "The number of winners does not match the expected count.")
 
         # Ensure all states are unique
-        states = [winner[1] for winner in winners]
+        states = [winner[2] for winner in winners]
         self.assertEqual(len(states), len(set(states)), "Duplicate states found among winners.")
 
+        # Last write wins for the duplicated state
+        self.assertIn("late@example.com", [winner[1] for winner in winners])
+
+        # The table is seeded and read back exactly once
+        self.repository.get_winners_by_state.assert_called_once()
+        self.repository.get_winners.assert_called_once()
+        self.repository.get_winner_count.assert_not_called()
+        # One batched write per fetched batch, carrying every accepted row
+        self.assertEqual(self.repository.upsert_winners.call_count, len(batches))
+        written = [row for call in self.repository.upsert_winners.call_args_list for row in call.args[0]]
+        self.assertEqual(len(written), MAX_WINNER_COUNT + 1)
+
         logger.info("Test for process_winners passed with full validation.")
 
+    def test_process_winners_stops_mid_batch(self):
+        """Test that processing stops as soon as the target is reached, without fetching again."""
+        extra = make_users(["Extra State"])
+        engine = FakeFetchEngine([make_users(self.states) + extra, extra])
+
+        with patch("app.services.lottery_service.FetchEngine", engine):
+            winners = process_winners(self.repository)
+
+        self.assertEqual(engine.fetches, 1)
+        self.repository.upsert_winners.assert_called_once()
+        self.assertEqual(len(self.repository.upsert_winners.call_args.args[0]), MAX_WINNER_COUNT)
+        self.assertNotIn("Extra State", [winner[2] for winner in winners])
+
+    def test_process_lotteries_shares_one_stream(self):
+        """Test that several draws complete from the same fetched batches, each in its own table."""
+        users = make_users(self.states)
+        engine = FakeFetchEngine([users[:10], users[10:20], users[20:]])
+
+        with patch("app.services.lottery_service.FetchEngine", engine):
+            results = process_lotteries(3, self.repository)
+
+        self.assertEqual(engine.fetches, 3)
+        self.assertEqual(len(results), 3)
+        for winners in results:
+            self.assertEqual(sorted(winner[2] for winner in winners), sorted(self.states))
+        tables = {call.args[1] for call in self.repository.upsert_winners.call_args_list}
+        self.assertEqual(len(tables), 3)
+        # One write per draw per batch
+        self.assertEqual(self.repository.upsert_winners.call_count, 9)
+
+    def test_pipelined_process_lotteries(self):
+        """Test that pipelined draws complete from batches fetched ahead of the writes."""
+        users = make_users(self.states)
+        extra = {"email": "extra@example.com", "address": {"state": "Extra State"}}
+        engine = FakeFetchEngine([users[:10], users[10:20], users[20:], [extra]])
+
+        with patch("app.services.lottery_service.FetchEngine", engine), \
+                patch.dict(config.PIPELINE_CONFIG, enabled=True, queue_size=2):
+            results = process_lotteries(2, self.repository)
+
+        # The first draw takes users in arrival order, so the extra user is never reached
+        self.assertEqual(sorted(winner[2] for winner in results[0]), sorted(self.states))
+        for winners in results:
+            self.assertEqual(len({winner[2] for winner in winners}), MAX_WINNER_COUNT)
+
+    @patch("app.services.lottery_service.record_run_summary")
+    @patch("app.services.lottery_service.analytics_enabled", return_value=True)
+    def test_finished_run_is_summarized(self, mock_enabled, mock_record_run_summary):
+        """Test that a run on the configured storage is summarized with its replacements."""
+        users = make_users(self.states)
+        late = {"email": "late@example.com", "address": {"state": self.states[0]}}
+        engine = FakeFetchEngine([users[:5] + [late], users[5:]])
+
+        with patch("app.services.lottery_service.FetchEngine", engine), \
+                patch("app.services.lottery_service.get_winner_repository", return_value=self.repository):
+            winners = process_winners()
+
+        table_name, winners_by_state, replacements, processed = mock_record_run_summary.call_args.args
+        self.assertEqual(table_name, self.repository.get_winners.call_args.args[0])
+        self.assertEqual(winners_by_state, {winner[2]: winner[1] for winner in winners})
+        self.assertEqual(winners_by_state[self.states[0]], "late@example.com")
+        self.assertEqual(replacements, {self.states[0]: 1})
+        self.assertEqual(processed, MAX_WINNER_COUNT + 1)
+
+    def test_interrupted_run_is_resumed(self):
+        """Test that the next start continues an interrupted run's table from its stored winners."""
+        users = make_users(self.states)
+        crashing = FakeFetchEngine([users[:10], ConnectionError("API down")])
+        with patch("app.services.lottery_service.FetchEngine", crashing), self.assertRaises(ConnectionError):
+            process_winners(self.repository)
+        (table_name, status), = self.repository.get_run_statuses().items()
+        self.assertEqual(status, "interrupted")
+        self.assertEqual(self.repository.get_winner_count(table_name), 10)
+
+        engine = FakeFetchEngine([users[10:]])
+        with patch("app.services.lottery_service.FetchEngine", engine):
+            winners = process_winners(self.repository, resume=True)
+
+        self.assertEqual(self.repository.get_new_version.call_count, 1)
+        self.assertEqual(self.repository.get_winners.call_args.args[0], table_name)
+        self.assertEqual(sorted(winner[2] for winner in winners), sorted(self.states))
+        self.assertEqual(self.repository.get_run_statuses(), {table_name: "complete"})
+        self.repository.record_run_progress.assert_called_with(table_name, "complete", MAX_WINNER_COUNT, 2)
+
+    def test_fresh_run_abandons_incomplete_ones(self):
+        """Test that a fresh start leaves the interrupted run alone and starts a new table."""
+        users = make_users(self.states)
+        crashing = FakeFetchEngine([users[:10], ConnectionError("API down")])
+        with patch("app.services.lottery_service.FetchEngine", crashing), self.assertRaises(ConnectionError):
+            process_winners(self.repository)
+        (interrupted, _), = self.repository.get_run_statuses().items()
+
+        engine = FakeFetchEngine([users])
+        with patch("app.services.lottery_service.FetchEngine", engine):
+            process_winners(self.repository, resume=False)
+
+        self.assertEqual(self.repository.get_new_version.call_count, 2)
+        self.assertNotEqual(self.repository.get_winners.call_args.args[0], interrupted)
+        self.assertEqual(self.repository.get_winner_count(interrupted), 10)
+        self.assertEqual(self.repository.get_run_statuses()[interrupted], "abandoned")
+
+    def test_resumed_run_is_added_to_past_winners_once_finished(self):
+        """Test that an interrupted run is not synced into the past winner filter before it completes."""
+        users = make_users(self.states)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "winners.bloom")
+            with patch.dict(config.PAST_WINNERS_CONFIG, enabled=True, path=path):
+                crashing = FakeFetchEngine([users[:10], ConnectionError("API down")])
+                with patch("app.services.lottery_service.FetchEngine", crashing), self.assertRaises(ConnectionError):
+                    process_winners(self.repository)
+                with patch("app.services.lottery_service.FetchEngine", FakeFetchEngine([users[10:]])):
+                    process_winners(self.repository, resume=True)
+
+            past_winners = PastWinnerFilter(self.repository, path)
+            try:
+                self.assertTrue(past_winners.is_past_winner(users[0]["email"]))
+                self.assertTrue(past_winners.is_past_winner(users[-1]["email"]))
+            finally:
+                past_winners.close()
+
+    def test_resumed_complete_run_is_only_finished(self):
+        """Test that a run interrupted after its last write is finished without fetching."""
+        repository = MemoryWinnerRepository()
+        table_name = repository.create_versioned_table(repository.get_new_version())
+        repository.upsert_winners([(user["email"], user["address"]["state"]) for user in make_users(self.states)],
+                                  table_name)
+        repository.record_run_progress(table_name, "interrupted", MAX_WINNER_COUNT, 5)
+
+        engine = MagicMock()
+        with patch("app.services.lottery_service.FetchEngine", engine):
+            winners = process_winners(repository, resume=True)
+
+        engine.assert_not_called()
+        self.assertEqual(len(winners), MAX_WINNER_COUNT)
+        self.assertEqual(repository.get_run_statuses(), {table_name: "complete"})
+
+    def test_failed_set_up_releases_claimed_runs(self):
+        """Test that runs claimed by a start that fails before drawing can be resumed at once."""
+        runs = [self.repository.create_versioned_table(self.repository.get_new_version()) for _ in range(2)]
+        for table_name in runs:
+            self.repository.record_run_progress(table_name, "interrupted", 10, 2)
+
+        with patch.dict(config.PAST_WINNERS_CONFIG, enabled=True), \
+                patch("app.services.lottery_service.PastWinnerFilter", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                process_lotteries(2, self.repository, resume=True)
+        self.assertEqual(set(self.repository.get_run_statuses().values()), {"interrupted"})
+
+        get_winners_by_state = self.repository.get_winners_by_state
+        with patch.object(self.repository, "get_winners_by_state",
+                          side_effect=[get_winners_by_state(runs[0]), ConnectionError("database down")]):
+            with self.assertRaises(ConnectionError):
+                process_lotteries(2, self.repository, resume=True)
+        self.assertEqual([tuple(run) for run in self.repository.claim_incomplete_runs(2, 3600)],
+                         [(runs[0], 10, 2), (runs[1], 10, 2)])
+
+    def test_overlapping_starts_do_not_share_a_run(self):
+        """Test that a run in progress is neither resumed nor abandoned by another start."""
+        users = make_users(self.states)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_batches():
+            yield users[:10]
+            started.set()
+            release.wait(5)
+            yield users[10:]
+
+        engines = MagicMock(side_effect=[FakeFetchEngine(slow_batches()), FakeFetchEngine([users]),
+                                         FakeFetchEngine([users])])
+        results = []
+        with patch("app.services.lottery_service.FetchEngine", engines):
+            first = threading.Thread(target=lambda: results.append(process_winners(self.repository)))
+            first.start()
+            try:
+                self.assertTrue(started.wait(5))
+                process_winners(self.repository, resume=True)
+                process_winners(self.repository, resume=False)
+            finally:
+                release.set()
+                first.join(5)
+
+        statuses = self.repository.get_run_statuses()
+        self.assertEqual(len(statuses), 3)
+        self.assertEqual(set(statuses.values()), {"complete"})
+        self.assertEqual(len(results[0]), MAX_WINNER_COUNT)
+
+    def test_stale_run_is_resumed(self):
+        """Test that a run marked running whose process stopped saving progress is resumed."""
+        users = make_users(self.states)
+        table_name = self.repository.create_versioned_table(self.repository.get_new_version())
+        self.repository.upsert_winners([(user["email"], user["address"]["state"]) for user in users[:10]], table_name)
+        self.repository.record_run_progress(table_name, "running", 10, 1)
+
+        engines = MagicMock(side_effect=[FakeFetchEngine([users]), FakeFetchEngine([users[10:]])])
+        with patch("app.services.lottery_service.FetchEngine", engines):
+            with patch.dict(config.RESUME_CONFIG, stale_after=3600):
+                process_winners(self.repository, resume=True)
+            self.assertEqual(self.repository.get_run_statuses()[table_name], "running")
+            with patch.dict(config.RESUME_CONFIG, stale_after=0):
+                winners = process_winners(self.repository, resume=True)
+
+        self.assertEqual(self.repository.get_winners.call_args.args[0], table_name)
+        self.assertEqual(len(winners), MAX_WINNER_COUNT)
+        self.assertEqual(self.repository.get_run_statuses()[table_name], "complete")
+
+    @patch("app.services.lottery_service.record_run_summary")
+    def test_injected_repository_is_not_summarized(self, mock_record_run_summary):
+        """Test that runs on a given repository leave the summary tables alone."""
+        engine = FakeFetchEngine([make_users(self.states)])
+
+        with patch("app.services.lottery_service.FetchEngine", engine):
+            process_winners(self.repository)
+
+        mock_record_run_summary.assert_not_called()
+
+
+class TestWinnerIndex(unittest.TestCase):
+    def test_record_and_complete(self):
+        """Test insert vs. update tracking and target completion."""
+        index = WinnerIndex(target=2)
+        index.seed({"CA": "a@example.com"})
+
+        self.assertTrue(index.record("b@example.com", "CA"))
+        self.assertFalse(index.record("c@example.com", "NY"))
+        self.assertTrue(index.is_complete())
+        self.assertEqual(index.remaining(), 0)
+        self.assertEqual(index.as_dict(), {"CA": "b@example.com", "NY": "c@example.com"})
+
 
 if __name__ == "__main__":
     unittest.main()
-
@@ -0,0 +1,85 @@
+import tracemalloc
+import unittest
+from app.repositories.instrumented_repository import InstrumentedWinnerRepository
+from app.repositories.memory_repository import MemoryWinnerRepository
+from app.utils.metrics import Histogram, metrics, timed, phase, start_metrics_server, stop_metrics_server
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        """Start every test from an empty registry"""
+        metrics.reset()
+
+    def tearDown(self):
+        metrics.reset()
+
+    def test_histogram_buckets(self):
+        """Test bucket placement and quantile upper bounds"""
+        histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+        for value in (0.005, 0.05, 0.05, 5.0):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [1, 2, 0, 1])
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(1.0), float("inf"))
+
+    def test_timed_counts_outcomes_and_rows(self):
+        """Test that the decorator records calls, errors, latency and rows"""
+        @timed("test_op", rows=len, operation="fetch")
+        def fetch(fail=False):
+            if fail:
+                raise RuntimeError("boom")
+            return [1, 2, 3]
+
+        fetch()
+        with self.assertRaises(RuntimeError):
+            fetch(fail=True)
+
+        self.assertEqual(metrics.counter_value("test_op_calls_total", outcome="ok"), 1)
+        self.assertEqual(metrics.counter_value("test_op_calls_total", outcome="error"), 1)
+        self.assertEqual(metrics.counter_value("test_op_rows_total", operation="fetch"), 3)
+        text = metrics.render_prometheus()
+        self.assertIn('lottery_test_op_duration_seconds_count{operation="fetch"} 2', text)
+        self.assertIn('lottery_test_op_duration_seconds_bucket{operation="fetch",le="+Inf"} 2', text)
+
+    def test_instrumented_repository(self):
+        """Test that repository operations and insert vs. update writes are counted"""
+        repository = InstrumentedWinnerRepository(MemoryWinnerRepository())
+        table_name = repository.create_versioned_table(repository.get_new_version())
+
+        repository.upsert_winners([("a@example.com", "CA"), ("b@example.com", "CA")], table_name)
+        self.assertTrue(repository.insert_winner("c@example.com", "CA", table_name))
+        with phase("final_read"):
+            repository.get_winners(table_name)
+
+        self.assertEqual(metrics.counter_value("winner_writes_total", kind="insert"), 1)
+        self.assertEqual(metrics.counter_value("winner_writes_total", kind="update"), 2)
+        self.assertEqual(metrics.counter_value("db_operation_calls_total", operation="upsert_winners"), 1)
+        self.assertEqual(metrics.counter_value("db_operation_rows_total", operation="get_winners"), 1)
+        self.assertIn("phase_duration_seconds{phase=\"final_read\"}", metrics.summary()["latencies"])
+
+    def test_phase_memory_counters_never_decrease(self):
+        """Test that memory growth and release over phases go to separate non-negative counters"""
+        tracemalloc.start()
+        try:
+            with phase("grow"):
+                data = bytearray(1 << 20)
+            with phase("shrink"):
+                del data
+        finally:
+            tracemalloc.stop()
+
+        self.assertGreaterEqual(metrics.counter_value("phase_memory_allocated_bytes_total", phase="grow"), 1 << 19)
+        self.assertGreaterEqual(metrics.counter_value("phase_memory_freed_bytes_total", phase="shrink"), 1 << 19)
+        self.assertTrue(all(value >= 0 for value in metrics.counters.values()))
+
+    def test_metrics_server_listens_locally_by_default(self):
+        """Test that the metrics endpoint is only reachable from this host unless METRICS_HOST says otherwise"""
+        self.addCleanup(stop_metrics_server)
+        server = start_metrics_server(0)
+
+        self.assertEqual(server.server_address[0], "127.0.0.1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from app.repositories.base import RUN_RUNNING, RUN_COMPLETE, RUN_ABANDONED
+from app.repositories.memory_repository import MemoryWinnerRepository
+from app.services.past_winners import PastWinnerFilter
+from app.utils.bloom_filter import BloomFilter, optimal_size
+
+
+class TestBloomFilter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "winners.bloom")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_persists_across_reopen(self):
+        """Test that added items are found again after the file is reopened"""
+        bloom = BloomFilter(self.path, 1000, 0.01)
+        bloom.add_many(f"user{i}@example.com" for i in range(500))
+        bloom.close()
+
+        bloom = BloomFilter(self.path, 1000, 0.01)
+        self.assertEqual(bloom.count, 500)
+        self.assertTrue(all(f"user{i}@example.com" in bloom for i in range(500)))
+        false_positives = sum(f"other{i}@example.com" in bloom for i in range(10000))
+        bloom.close()
+        self.assertLess(false_positives, 100)
+
+    def test_optimal_size(self):
+        """Test the textbook sizing of about 9.6 bits and 7 hashes per item at 1%"""
+        bits, hashes = optimal_size(1000, 0.01)
+        self.assertEqual((bits, hashes), (9586, 7))
+
+
+class TestPastWinnerFilter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "winners.bloom")
+        self.repository = MemoryWinnerRepository()
+        self.earlier = self.repository.create_versioned_table(self.repository.get_new_version())
+        self.repository.upsert_winners([("a@example.com", "CA"), ("b@example.com", "NY")], self.earlier)
+        self.repository.record_run_progress(self.earlier, RUN_COMPLETE)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_sync_adds_earlier_runs_once(self):
+        """Test that sync adds runs missing from the filter, remembering them on disk"""
+        past_winners = PastWinnerFilter(self.repository, self.path, 100, 0.01)
+        self.assertEqual(past_winners.sync(), 1)
+        past_winners.close()
+
+        past_winners = PastWinnerFilter(self.repository, self.path, 100, 0.01)
+        self.assertEqual(past_winners.sync(), 0)
+        self.assertTrue(past_winners.is_past_winner("a@example.com"))
+        self.assertFalse(past_winners.is_past_winner("c@example.com"))
+        past_winners.close()
+
+    def test_sync_skips_unfinished_runs(self):
+        """Test that winners of runs in progress and abandoned runs exclude nobody"""
+        for email, status in (("c@example.com", RUN_RUNNING), ("d@example.com", RUN_ABANDONED)):
+            table_name = self.repository.create_versioned_table(self.repository.get_new_version())
+            self.repository.insert_winner(email, "TX", table_name)
+            self.repository.record_run_progress(table_name, status)
+        past_winners = PastWinnerFilter(self.repository, self.path, 100, 0.01)
+
+        self.assertEqual(past_winners.sync(), 1)
+        self.assertTrue(past_winners.is_past_winner("a@example.com"))
+        for email in ("c@example.com", "d@example.com"):
+            self.assertNotIn(email, past_winners.bloom)
+            # Even on a false positive, the database lookup ignores these runs
+            past_winners.bloom.add(email)
+            self.assertFalse(past_winners.is_past_winner(email))
+        past_winners.close()
+
+    def test_probable_hit_is_confirmed_in_the_database(self):
+        """Test that a Bloom filter hit without a stored winner does not exclude the user"""
+        past_winners = PastWinnerFilter(self.repository, self.path, 100, 0.01)
+        # Simulate a false positive by setting the bits of an email that never won
+        past_winners.bloom.add("c@example.com")
+
+        self.assertFalse(past_winners.is_past_winner("c@example.com"))
+        past_winners.close()
+
+    def test_changed_sizing_rebuilds_the_filter(self):
+        """Test that a filter sized differently is rebuilt from the runs"""
+        past_winners = PastWinnerFilter(self.repository, self.path, 100, 0.01)
+        past_winners.sync()
+        past_winners.close()
+
+        past_winners = PastWinnerFilter(self.repository, self.path, 1000, 0.01)
+        self.assertEqual(past_winners.bloom.count, 0)
+        self.assertEqual(past_winners.sync(), 1)
+        self.assertTrue(past_winners.is_past_winner("b@example.com"))
+        past_winners.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
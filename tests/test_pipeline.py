@@ -0,0 +1,85 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from app.services.pipeline import BatchPipeline
+
+
+def numbered_batches(count: int, delivered: list = None, closed: threading.Event = None):
+    """Yields [0], [1], ... recording what was produced and whether the source was closed."""
+    try:
+        for number in range(count):
+            if delivered is not None:
+                delivered.append(number)
+            yield [number]
+    finally:
+        if closed is not None:
+            closed.set()
+
+
+def wait_until(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestBatchPipeline(unittest.TestCase):
+    def test_batches_arrive_in_order(self):
+        """Test that every batch reaches the consumer once, in source order"""
+        with BatchPipeline(numbered_batches(20), queue_size=3) as pipeline:
+            items = [item for batch in pipeline.stream() for item in batch]
+        self.assertEqual(items, list(range(20)))
+        self.assertEqual(pipeline.stats["batches"], 20)
+
+    def test_full_queue_blocks_the_source(self):
+        """Test that the source stops producing while the consumer is behind"""
+        produced = []
+        pipeline = BatchPipeline(numbered_batches(100, produced), queue_size=2)
+        try:
+            # Two batches queued and a third waiting to be put
+            self.assertTrue(wait_until(lambda: pipeline.stats["stalls"] == 1))
+            time.sleep(0.05)
+            self.assertEqual(len(produced), 3)
+        finally:
+            pipeline.close()
+
+    def test_queued_batches_are_written_together(self):
+        """Test that batches waiting in the queue are merged into one"""
+        pipeline = BatchPipeline(numbered_batches(3), queue_size=4)
+        try:
+            self.assertTrue(wait_until(lambda: pipeline.queue.qsize() == 4))
+            self.assertEqual(list(pipeline.stream()), [[0, 1, 2]])
+            self.assertEqual(pipeline.stats["writes"], 1)
+        finally:
+            pipeline.close()
+
+    def test_close_stops_and_closes_the_source(self):
+        """Test that closing mid-stream cancels pending work and ends the source stage"""
+        closed = threading.Event()
+        cancel = MagicMock()
+        pipeline = BatchPipeline(numbered_batches(10 ** 6, closed=closed), queue_size=2, cancel=cancel)
+        next(pipeline.stream())
+
+        pipeline.close()
+
+        cancel.assert_called_once()
+        self.assertTrue(closed.is_set())
+        self.assertFalse(pipeline._thread.is_alive())
+
+    def test_source_errors_reach_the_consumer(self):
+        """Test that an exception in the source stage is raised to the consumer after earlier batches"""
+        def failing():
+            yield [1]
+            raise RuntimeError("API down")
+
+        received = []
+        with BatchPipeline(failing(), queue_size=2) as pipeline:
+            with self.assertRaises(RuntimeError):
+                for batch in pipeline.stream():
+                    received.extend(batch)
+        self.assertEqual(received, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+from app.utils.metrics import phase
+from app.utils.profiling import profile_call
+
+
+def run_phases():
+    with phase("fetch"):
+        users = [{"email": f"user{i}@example.com"} for i in range(1000)]
+    with phase("upsert"):
+        return len(users)
+
+
+class TestProfiling(unittest.TestCase):
+    def test_profile_call_writes_stats_and_report(self):
+        """Test that a profiled call returns its result and reports phases, functions and allocations"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "run")
+
+            result = profile_call(run_phases, output, top=5)
+
+            self.assertEqual(result, 1000)
+            self.assertTrue(os.path.getsize(f"{output}.pstats") > 0)
+            with open(f"{output}.txt") as f:
+                report = f.read()
+        self.assertIn("Phases (wall clock, all threads):", report)
+        self.assertRegex(report, r"fetch\s+1 x")
+        self.assertIn("run_phases", report)
+        self.assertIn("Top 5 allocation sites:", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
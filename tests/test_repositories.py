@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from app.repositories.base import RUN_RUNNING, RUN_INTERRUPTED, RUN_COMPLETE, RUN_ABANDONED
+from app.repositories.memory_repository import MemoryWinnerRepository
+from app.repositories.sqlite_repository import SQLiteWinnerRepository
+from app.utils.constants import RUN_STATUS_TABLE
+
+
+class RepositoryContract:
+    """Behaviour every WinnerRepository backend must share."""
+
+    def make_repository(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.repository = self.make_repository()
+        self.table_name = self.repository.create_versioned_table(self.repository.get_new_version())
+
+    def tearDown(self):
+        self.repository.close()
+
+    def test_versions_increase_with_tables(self):
+        """Test that every created table bumps the next version"""
+        self.assertEqual(self.repository.get_new_version(), 2)
+
+    def test_insert_and_update(self):
+        """Test that a second winner for a state replaces the first"""
+        self.repository.insert_winner("a@example.com", "CA", self.table_name)
+        self.repository.insert_winner("b@example.com", "CA", self.table_name)
+        self.repository.insert_winner("c@example.com", "NY", self.table_name)
+
+        self.assertEqual(self.repository.get_winner_count(self.table_name), 2)
+        self.assertEqual(
+            self.repository.get_winners_by_state(self.table_name),
+            {"CA": "b@example.com", "NY": "c@example.com"},
+        )
+
+    def test_upsert_winners(self):
+        """Test batch upserts report inserts and updates and keep the last write per state"""
+        self.repository.insert_winner("a@example.com", "CA", self.table_name)
+
+        results = self.repository.upsert_winners(
+            [("b@example.com", "CA"), ("c@example.com", "NY"), ("d@example.com", "NY")], self.table_name
+        )
+
+        self.assertEqual(results, [
+            ("b@example.com", "CA", True),
+            ("c@example.com", "NY", False),
+            ("d@example.com", "NY", True),
+        ])
+        winners = self.repository.get_winners(self.table_name)
+        self.assertEqual(sorted((email, state) for _, email, state in winners),
+                         [("b@example.com", "CA"), ("d@example.com", "NY")])
+        self.assertEqual(self.repository.upsert_winners([], self.table_name), [])
+
+    def test_duplicate_email_is_rejected(self):
+        """Test that one email cannot win for two states and the batch is not applied"""
+        self.repository.insert_winner("a@example.com", "CA", self.table_name)
+
+        with self.assertRaises(Exception):
+            self.repository.upsert_winners([("x@example.com", "TX"), ("a@example.com", "NY")], self.table_name)
+
+        self.assertEqual(self.repository.get_winners_by_state(self.table_name), {"CA": "a@example.com"})
+
+
+    def test_has_won_across_runs(self):
+        """Test that winners are found in any run except the excluded ones"""
+        self.repository.insert_winner("a@example.com", "CA", self.table_name)
+        other_table = self.repository.create_versioned_table(self.repository.get_new_version())
+
+        self.assertEqual(self.repository.get_run_names(), [self.table_name, other_table])
+        self.assertTrue(self.repository.has_won("a@example.com"))
+        self.assertTrue(self.repository.has_won("a@example.com", exclude={other_table}))
+        self.assertFalse(self.repository.has_won("a@example.com", exclude={self.table_name}))
+        self.assertFalse(self.repository.has_won("b@example.com"))
+
+    def test_new_run_is_registered_as_running(self):
+        """Test that a run is registered as running as soon as it exists, so it never counts as finished"""
+        self.assertEqual(self.repository.get_run_statuses(), {self.table_name: RUN_RUNNING})
+        self.assertEqual(self.repository.get_finished_run_names(), [])
+
+    def test_run_registry(self):
+        """Test that only interrupted or stale runs are claimed or abandoned, and each only once"""
+        names = [self.table_name] + [self.repository.create_versioned_table(self.repository.get_new_version())
+                                     for _ in range(3)]
+        live, interrupted, complete, abandoned = names
+        for name, status in zip(names, (RUN_RUNNING, RUN_INTERRUPTED, RUN_COMPLETE, RUN_ABANDONED)):
+            self.repository.record_run_progress(name, status, 10, 2)
+
+        self.assertEqual([tuple(run) for run in self.repository.claim_incomplete_runs(5, 3600)],
+                         [(interrupted, 10, 2)])
+        self.assertEqual(self.repository.claim_incomplete_runs(5, 3600), [])
+        self.assertEqual(self.repository.abandon_incomplete_runs(3600), [])
+
+        # Runs whose process stopped renewing its claim
+        time.sleep(0.01)
+        self.assertEqual([tuple(run) for run in self.repository.claim_incomplete_runs(1, 0.005)], [(live, 10, 2)])
+        time.sleep(0.01)
+        self.assertEqual(self.repository.abandon_incomplete_runs(0.005), [live, interrupted])
+        self.assertEqual(self.repository.get_run_statuses(), {
+            live: RUN_ABANDONED, interrupted: RUN_ABANDONED, complete: RUN_COMPLETE, abandoned: RUN_ABANDONED,
+        })
+        self.assertEqual(self.repository.get_finished_run_names(), [complete])
+
+
+class TestMemoryWinnerRepository(RepositoryContract, unittest.TestCase):
+    def make_repository(self):
+        return MemoryWinnerRepository()
+
+
+class TestSQLiteWinnerRepository(RepositoryContract, unittest.TestCase):
+    def make_repository(self):
+        return SQLiteWinnerRepository(":memory:")
+
+    def test_text_timestamps_are_migrated(self):
+        """Test that a registry with TEXT updated_at timestamps is converted, so its stale runs are resumed"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "lottery.db")
+            conn = sqlite3.connect(path)
+            with conn:
+                conn.execute(f"""
+                    CREATE TABLE {RUN_STATUS_TABLE} (
+                        name TEXT PRIMARY KEY, status TEXT NOT NULL,
+                        users_processed INTEGER NOT NULL DEFAULT 0, batches INTEGER NOT NULL DEFAULT 0,
+                        updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                for name, status in (("winner_20240101_120000_v1", "running"), ("winner_20240101_120000_v2", "complete")):
+                    conn.execute(f"CREATE TABLE {name} (id INTEGER PRIMARY KEY, email TEXT, state TEXT)")
+                    conn.execute(f"INSERT INTO {RUN_STATUS_TABLE} (name, status, users_processed, batches, "
+                                 "updated_at) VALUES (?, ?, 5, 1, '2024-01-01 12:00:00')", (name, status))
+            conn.close()
+
+            repository = SQLiteWinnerRepository(path)
+            try:
+                self.assertEqual([tuple(run) for run in repository.claim_incomplete_runs(5, 600)],
+                                 [("winner_20240101_120000_v1", 5, 1)])
+                self.assertEqual(repository.get_run_statuses()["winner_20240101_120000_v2"], RUN_COMPLETE)
+            finally:
+                repository.close()
+
+    def test_version_ignores_other_prefixed_tables(self):
+        """Test that a table merely sharing the prefix, like "winners", does not bump the version"""
+        self.repository._conn.execute("CREATE TABLE winners (email TEXT)")
+        self.assertEqual(self.repository.get_new_version(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from app.api.fetch_random_users import create_api_client
+from app.api.response_log import ResponseLogRecorder, ResponseLogReader, ReplayClient
+
+
+def make_users(start, count):
+    """Builds minimal API-shaped users with sequential emails"""
+    return [{"email": f"user{i}@example.com", "address": {"state": f"State {i}"}} for i in range(start, start + count)]
+
+
+class TestResponseLog(unittest.TestCase):
+    def setUp(self):
+        """Create a temporary log path"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "api_log.jsonl.gz")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def record(self, *batches):
+        recorder = ResponseLogRecorder(self.path)
+        for batch in batches:
+            recorder.record(len(batch), batch)
+        recorder.close()
+
+    def test_record_and_random_access(self):
+        """Test that responses are indexed and readable individually and as plain gzip JSONL"""
+        self.record(make_users(0, 3), make_users(3, 2))
+
+        reader = ResponseLogReader(self.path)
+        self.assertEqual(len(reader), 2)
+        self.assertEqual(reader.read(1)["users"], make_users(3, 2))
+        self.assertEqual([record["size"] for record in reader], [3, 2])
+        reader.close()
+
+        # The data file is an ordinary multi-member gzip stream of JSON lines
+        with gzip.open(self.path, "rt") as data:
+            lines = [json.loads(line) for line in data]
+        self.assertEqual(len(lines), 2)
+
+    def test_recording_appends(self):
+        """Test that a second recording session appends to the existing log"""
+        self.record(make_users(0, 1))
+        self.record(make_users(1, 1))
+
+        reader = ResponseLogReader(self.path)
+        self.assertEqual(len(reader), 2)
+        reader.close()
+
+    def test_replay_serves_users_in_order_and_rewinds(self):
+        """Test that replay ignores the recorded batching and starts over when exhausted"""
+        self.record(make_users(0, 3), make_users(3, 2))
+
+        client = ReplayClient(self.path)
+        self.assertEqual(client.get_users(2), make_users(0, 2))
+        self.assertEqual(client.get_users(2), make_users(2, 2))
+        self.assertEqual(client.get_users(2), make_users(4, 1) + make_users(0, 1))
+        self.assertEqual(client.rewinds, 1)
+        client.close()
+
+    def test_empty_log_is_rejected(self):
+        """Test that replaying a log without users fails fast"""
+        self.record([])
+
+        with self.assertRaises(ValueError):
+            ReplayClient(self.path)
+
+    @patch('requests.Session.get')
+    def test_client_modes(self, mock_get):
+        """Test that record mode logs live responses and replay mode serves them offline"""
+        mock_get.return_value.json.return_value = make_users(0, 2)
+        mock_get.return_value.raise_for_status.return_value = None
+
+        recording = create_api_client("record", self.path)
+        recording.get_users(2)
+        recording.close()
+
+        replay = create_api_client("replay", self.path)
+        self.assertFalse(replay.rate_limited)
+        self.assertEqual(replay.get_users(2), make_users(0, 2))
+        mock_get.assert_called_once()
+        replay.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
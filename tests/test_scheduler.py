@@ -0,0 +1,82 @@
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from app.services.scheduler import parse_schedule, IntervalSchedule, CronSchedule, DrawScheduler
+
+
+class TestSchedules(unittest.TestCase):
+    def test_intervals(self):
+        """Test the accepted interval spellings"""
+        for spec, seconds in (("every 10m", 600), ("30s", 30), ("3600", 3600), ("every 1.5h", 5400)):
+            with self.subTest(spec=spec):
+                schedule = parse_schedule(spec)
+                self.assertIsInstance(schedule, IntervalSchedule)
+                self.assertEqual(schedule.interval, timedelta(seconds=seconds))
+
+    def test_cron_next_run(self):
+        """Test that cron schedules return the next matching minute"""
+        # Wednesday 2024-01-03 10:07:30
+        now = datetime(2024, 1, 3, 10, 7, 30)
+        cases = {
+            "*/15 * * * *": datetime(2024, 1, 3, 10, 15),
+            "0 9 * * *": datetime(2024, 1, 4, 9, 0),
+            "30 8 * * 1-5": datetime(2024, 1, 4, 8, 30),
+            "0 0 * * 0": datetime(2024, 1, 7, 0, 0),
+            "0 0 * * 7": datetime(2024, 1, 7, 0, 0),
+            "0 12 1 * *": datetime(2024, 2, 1, 12, 0),
+            "0 0 29 2 *": datetime(2024, 2, 29, 0, 0),
+            # Day or weekday when both are restricted
+            "0 0 15 * 5": datetime(2024, 1, 5, 0, 0),
+        }
+        for expression, expected in cases.items():
+            with self.subTest(expression=expression):
+                self.assertEqual(parse_schedule(expression).next_run(now), expected)
+
+    def test_invalid_schedules(self):
+        """Test that malformed or impossible schedules are rejected"""
+        for spec in ("every 0s", "* * * *", "60 * * * *", "a * * * *", "5-1 * * * *"):
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    parse_schedule(spec)
+        with self.assertRaises(ValueError):
+            CronSchedule("0 0 30 2 *").next_run(datetime(2024, 1, 1))
+
+
+class TestDrawScheduler(unittest.TestCase):
+    def test_runs_until_max_draws(self):
+        """Test that draws repeat on the schedule and failures do not stop the daemon"""
+        job = MagicMock(side_effect=[None, Exception("API down"), None])
+        scheduler = DrawScheduler(IntervalSchedule(0.01), job, max_draws=3)
+
+        self.assertEqual(scheduler.run(), 3)
+        self.assertEqual(job.call_count, 3)
+        self.assertEqual(scheduler.failures, 1)
+
+    def test_stop_interrupts_the_wait(self):
+        """Test that stop() ends the daemon between draws without waiting for the next slot"""
+        job = MagicMock()
+        scheduler = DrawScheduler(IntervalSchedule(3600), job)
+        thread = threading.Thread(target=scheduler.run)
+        thread.start()
+        try:
+            scheduler.stop()
+        finally:
+            thread.join(2)
+
+        self.assertFalse(thread.is_alive())
+        self.assertLessEqual(job.call_count, 1)
+
+    def test_stop_during_draw_finishes_it(self):
+        """Test that a draw in progress completes before the daemon exits"""
+        scheduler = None
+
+        def job():
+            scheduler.stop()
+
+        scheduler = DrawScheduler(IntervalSchedule(0.01), job)
+        self.assertEqual(scheduler.run(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from app.api.response_log import ResponseLogRecorder
+from app.repositories.memory_repository import MemoryWinnerRepository
+from app.services.simulation import load_weights, simulate, simulate_grid
+from app.utils.constants import US_STATE_COUNT
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+class TestStateWeights(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_synthetic_distributions(self):
+        """Test the uniform and Zipf distributions over every state"""
+        self.assertEqual(load_weights("uniform"), [1.0] * US_STATE_COUNT)
+        weights = load_weights("zipf:1")
+        self.assertEqual(len(weights), US_STATE_COUNT)
+        self.assertEqual(weights[:2], [1.0, 0.5])
+
+    def test_weights_from_recorded_log(self):
+        """Test that every logged user counts towards its state"""
+        path = os.path.join(self.tmpdir.name, "api_log.jsonl.gz")
+        recorder = ResponseLogRecorder(path)
+        recorder.record(3, [{"email": f"user{i}@example.com", "address": {"state": state}}
+                            for i, state in enumerate(["CA", "CA", "NY"])])
+        recorder.close()
+
+        self.assertEqual(sorted(load_weights(f"log:{path}")), [1.0, 2.0])
+
+    def test_weights_from_past_winners(self):
+        """Test that every stored run contributes its winners' states"""
+        repository = MemoryWinnerRepository()
+        for rows in ([("a@example.com", "CA"), ("b@example.com", "NY")], [("c@example.com", "CA")]):
+            table_name = repository.create_versioned_table(repository.get_new_version())
+            repository.upsert_winners(rows, table_name)
+
+        self.assertEqual(sorted(load_weights("winners", repository)), [1.0, 2.0])
+
+    def test_weights_file_and_empty_distribution(self):
+        """Test JSON weight files, and that a distribution without states is rejected"""
+        path = os.path.join(self.tmpdir.name, "weights.json")
+        with open(path, "w") as f:
+            json.dump({"CA": 3, "NY": 1, "TX": 0}, f)
+        self.assertEqual(load_weights(path), [3.0, 1.0])
+
+        with self.assertRaises(ValueError):
+            load_weights("winners", MemoryWinnerRepository())
+
+
+@unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+class TestSimulation(unittest.TestCase):
+    def test_every_run_completes_with_enough_calls(self):
+        """Test that each run stops as soon as it covers the target states"""
+        results = simulate([1.0] * 4, runs=200, target=4, batch_size=2, seed=1)
+
+        self.assertTrue(results["completed"].all())
+        self.assertTrue((results["rows"] >= 4).all())
+        self.assertTrue((results["upserts"] == results["api_calls"]).all())
+        # No run reads a whole batch past its last missing state
+        self.assertTrue((results["rows"] <= results["upserts"] * 2).all())
+
+    def test_single_state_needs_one_user(self):
+        """Test that a run over one state completes on its first user"""
+        results = simulate([1.0], runs=10, target=1, batch_size=5, seed=1)
+
+        self.assertEqual(results["rows"].tolist(), [1] * 10)
+        self.assertEqual(results["api_calls"].tolist(), [1] * 10)
+
+    def test_failures_back_off_and_runs_give_up(self):
+        """Test that failed calls add back-off time and stuck runs stop at max_calls"""
+        results = simulate([1.0] * 4, runs=10, target=4, batch_size=2, error_rate=1.0,
+                           sleep_time=2, api_latency=0, max_calls=5, seed=1)
+
+        self.assertFalse(results["completed"].any())
+        self.assertEqual(results["api_calls"].tolist(), [5] * 10)
+        self.assertEqual(results["upserts"].tolist(), [0] * 10)
+        # Delays of 1, 2, 2, 2, 2 seconds, each jittered to between half and all of it
+        self.assertTrue(((results["wall_time"] >= 4.5) & (results["wall_time"] <= 9)).all())
+
+    def test_grid_is_sorted_by_cost(self):
+        """Test that larger batches complete a draw in fewer API calls"""
+        settings = simulate_grid([1.0] * 50, [25], [1, 10], [10], runs=500, seed=1)
+
+        self.assertEqual([setting["batch_size"] for setting in settings], [10, 1])
+        self.assertEqual(settings[0]["completed"], 1.0)
+        self.assertLess(settings[0]["cost_per_draw"], settings[1]["cost_per_draw"])
+
+
+if __name__ == "__main__":
+    unittest.main()
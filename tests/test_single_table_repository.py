@@ -0,0 +1,80 @@
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+from app.db.migrate_runs import parse_legacy_table_name
+from app.repositories.single_table_repository import SingleTableWinnerRepository, schema_statements
+from app.utils import config
+
+
+class TestSingleTableWinnerRepository(unittest.TestCase):
+    def setUp(self):
+        """Set up a repository whose schema already exists and a mock connection"""
+        self.repository = SingleTableWinnerRepository()
+        self.repository._schema_ready = True
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value.__enter__.return_value
+
+    @patch("app.repositories.single_table_repository.get_connection")
+    def test_version_comes_from_sequence(self, mock_get_conn):
+        """Test that a new version is one nextval() instead of a table count"""
+        mock_get_conn.return_value.__enter__.return_value = self.mock_conn
+        self.mock_cursor.fetchone.return_value = (7,)
+
+        self.assertEqual(self.repository.get_new_version(), 7)
+        query = self.mock_cursor.execute.call_args.args[0]
+        self.assertIn("nextval", query)
+        self.assertNotIn("information_schema", query)
+
+    @patch("app.repositories.single_table_repository.execute_values")
+    @patch("app.repositories.single_table_repository.get_connection")
+    def test_upsert_is_keyed_by_run(self, mock_get_conn, mock_execute_values):
+        """Test that a batch is written to the registered run's rows in one statement"""
+        mock_get_conn.return_value.__enter__.return_value = self.mock_conn
+        self.mock_cursor.fetchone.return_value = (3,)
+        run_name = self.repository.create_versioned_table(3)
+        # Registered as running by the same insert, never briefly without a status
+        self.assertEqual(self.mock_cursor.execute.call_args.args[1], (3, run_name, "running"))
+        mock_execute_values.return_value = [("CA", True)]
+
+        results = self.repository.upsert_winners([("a@example.com", "CA")], run_name)
+
+        self.assertEqual(results, [("a@example.com", "CA", False)])
+        self.assertEqual(mock_execute_values.call_args.args[2], [(3, "a@example.com", "CA")])
+        self.assertIn("ON CONFLICT (run_id, state)", mock_execute_values.call_args.args[1])
+
+    @patch("app.repositories.single_table_repository.get_connection")
+    def test_unknown_run(self, mock_get_conn):
+        """Test that an unregistered run name raises KeyError"""
+        mock_get_conn.return_value.__enter__.return_value = self.mock_conn
+        self.mock_cursor.fetchone.return_value = None
+
+        with self.assertRaises(KeyError):
+            self.repository.get_winner_count("winner_missing_v1")
+
+    def test_partitioned_schema(self):
+        """Test that partitioning adds one hash partition per remainder"""
+        self.assertFalse(any("PARTITION" in statement for statement in schema_statements(0)))
+        partitioned = schema_statements(4)
+        self.assertEqual(sum("PARTITION OF" in statement for statement in partitioned), 4)
+
+
+class TestMigrateRuns(unittest.TestCase):
+    def test_parse_legacy_table_name(self):
+        """Test that only per-run table names are picked up for migration"""
+        self.assertEqual(parse_legacy_table_name("winner_20240101_120000_v12"),
+                         (datetime(2024, 1, 1, 12, 0, 0), 12))
+        self.assertIsNone(parse_legacy_table_name("winners"))
+        self.assertIsNone(parse_legacy_table_name("winners_p0"))
+
+    def test_legacy_tables_follow_the_reloaded_prefix(self):
+        """Test that a TABLE_PREFIX changed after import is used to recognize legacy tables"""
+        self.addCleanup(config.reload_settings)
+        with patch.dict(os.environ, {"TABLE_PREFIX": "draw_"}):
+            config.reload_settings()
+            self.assertEqual(parse_legacy_table_name("draw_20240101_120000_v3"), (datetime(2024, 1, 1, 12, 0, 0), 3))
+            self.assertIsNone(parse_legacy_table_name("winner_20240101_120000_v3"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import MagicMock
+from app.repositories.statement_cache import StatementCache, statement_cache, evict
+
+TABLE = "winner_20240101_120000_v1"
+OTHER_TABLE = "winner_20240101_120000_v2"
+
+
+class FakeCursor:
+    """Records the statements sent to the server."""
+
+    def __init__(self):
+        self.connection = MagicMock()
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append(repr(query))
+
+
+class TestStatementCache(unittest.TestCase):
+    def setUp(self):
+        self.cursor = FakeCursor()
+        self.cache = StatementCache(size=2)
+
+    def test_prepares_once_per_table_and_operation(self):
+        """Test that a statement is prepared on first use and only executed afterwards"""
+        for _ in range(3):
+            self.cache.execute(self.cursor, TABLE, "count")
+        self.cache.execute(self.cursor, TABLE, "upsert", (["a@example.com"], ["CA"]))
+
+        prepares = [statement for statement in self.cursor.statements if "PREPARE" in statement]
+        self.assertEqual(len(prepares), 2)
+        self.assertIn(f"Identifier('{TABLE}')", prepares[0])
+        self.assertEqual(self.cache.stats["executed"], 4)
+
+    def test_rejects_non_run_tables(self):
+        """Test that only versioned run tables can be prepared"""
+        for name in ("winners", 'winner_1"; DROP TABLE winners; --'):
+            with self.subTest(name=name):
+                with self.assertRaises(ValueError):
+                    self.cache.execute(self.cursor, name, "count")
+        self.assertEqual(self.cursor.statements, [])
+
+    def test_least_recently_used_is_deallocated(self):
+        """Test that the cache stays within its size"""
+        self.cache.execute(self.cursor, TABLE, "count")
+        self.cache.execute(self.cursor, TABLE, "select")
+        self.cache.execute(self.cursor, TABLE, "count")
+        self.cache.execute(self.cursor, OTHER_TABLE, "count")
+
+        self.assertEqual(list(self.cache.statements), [(TABLE, "count"), (OTHER_TABLE, "count")])
+        self.assertEqual(self.cache.stats["deallocated"], 1)
+
+    def test_failed_statement_is_prepared_again(self):
+        """Test that a statement whose execution failed is replaced and later deallocated"""
+        self.cache.execute(self.cursor, TABLE, "count")
+        failing = MagicMock(side_effect=Exception("relation does not exist"))
+        self.cursor.execute, execute = failing, self.cursor.execute
+        with self.assertRaises(Exception):
+            self.cache.execute(self.cursor, TABLE, "count")
+        self.cursor.execute = execute
+
+        self.cache.execute(self.cursor, TABLE, "count")
+        self.assertEqual(self.cache.stats["prepared"], 2)
+        self.assertEqual(self.cache.stats["deallocated"], 1)
+
+    def test_evict_finished_run(self):
+        """Test that evict() drops a run's statements from every connection on its next use"""
+        cursor = FakeCursor()
+        cache = statement_cache(cursor.connection)
+        cache.execute(cursor, TABLE, "count")
+        cache.execute(cursor, OTHER_TABLE, "count")
+
+        evict(TABLE)
+        cache.execute(cursor, OTHER_TABLE, "count")
+
+        self.assertEqual(list(cache.statements), [(OTHER_TABLE, "count")])
+        self.assertTrue(any("DEALLOCATE" in statement for statement in cursor.statements))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import json
+import unittest
+from unittest.mock import patch, Mock
+from app.api.fetch_random_users import RandomUserClient, RandomUserAPIError, close_api_client
+from app.api.user_parser import User, as_user, iter_json_array, parse_users
+
+
+def split(body: bytes, size: int) -> list:
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def make_user(i: int, state: str) -> dict:
+    return {
+        "id": i,
+        "email": f"user{i}@example.com",
+        "employment": {"title": "Engineer", "key_skill": "Testing"},
+        "address": {"state": state, "city": "Zürich", "coordinates": {"lat": 1.5, "lng": -2.25}},
+    }
+
+
+class TestStreamingParser(unittest.TestCase):
+    def test_any_chunking_gives_the_same_users(self):
+        """Test that elements split across chunks (including inside UTF-8 characters and numbers) decode intact"""
+        values = [make_user(i, state) for i, state in enumerate(["CA", "NY", "TX"])] + [12345, -1.5e10, "a,]"]
+        body = json.dumps(values, ensure_ascii=False, indent=1).encode("utf-8")
+
+        for size in range(1, 40):
+            with self.subTest(chunk_size=size):
+                self.assertEqual(list(iter_json_array(split(body, size))), values)
+
+    def test_users_are_projected(self):
+        """Test that only email and state are kept"""
+        body = json.dumps([make_user(1, "CA"), {"email": "no-address@example.com"}]).encode()
+
+        users = parse_users(split(body, 7))
+
+        self.assertEqual(users, [User("user1@example.com", "CA"), User("no-address@example.com", None)])
+        self.assertFalse(hasattr(users[0], "__dict__"))
+        self.assertIs(as_user(users[0]), users[0])
+        self.assertEqual(as_user(make_user(2, "NY")), User("user2@example.com", "NY"))
+
+    def test_malformed_bodies(self):
+        """Test that truncated or malformed bodies raise JSONDecodeError"""
+        for body in [b"", b"[", b'[{"email": "a"}', b"[1 2]", b"[1] x"]:
+            with self.subTest(body=body):
+                with self.assertRaises(json.JSONDecodeError):
+                    list(iter_json_array(split(body, 2)))
+
+
+class TestStreamingClient(unittest.TestCase):
+    def tearDown(self):
+        close_api_client()
+
+    @patch("requests.Session.get")
+    def test_stream_mode(self, mock_get):
+        """Test that stream mode reads the body incrementally and releases the response"""
+        response = Mock()
+        response.raise_for_status.return_value = None
+        response.iter_content.return_value = split(json.dumps([make_user(1, "CA")]).encode(), 5)
+        mock_get.return_value = response
+
+        users = RandomUserClient(parse_mode="stream").get_users(1)
+
+        self.assertEqual(users, [User("user1@example.com", "CA")])
+        self.assertTrue(mock_get.call_args.kwargs["stream"])
+        response.close.assert_called_once()
+
+    @patch("requests.Session.get")
+    def test_stream_decode_error(self, mock_get):
+        """Test that a malformed streamed body is a non-transient decode error"""
+        response = Mock()
+        response.raise_for_status.return_value = None
+        response.iter_content.return_value = [b"[{"]
+        mock_get.return_value = response
+
+        with self.assertRaises(RandomUserAPIError) as ctx:
+            RandomUserClient(parse_mode="stream").get_users(1)
+
+        self.assertEqual(ctx.exception.category, "decode")
+        self.assertFalse(ctx.exception.transient)
+
+
+if __name__ == "__main__":
+    unittest.main()
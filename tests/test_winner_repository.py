@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from app.repositories.winner_repository import upsert_winners, get_new_version
+
+
+class TestUpsertWinners(unittest.TestCase):
+    def setUp(self):
+        """Set up a mock connection for the repository"""
+        self.table_name = "winner_20240101_120000_v1"
+        self.mock_conn = MagicMock()
+
+    @patch("app.repositories.winner_repository.execute_prepared")
+    @patch("app.repositories.winner_repository.get_connection")
+    def test_batch_is_written_once(self, mock_get_conn, mock_execute_prepared):
+        """Test that a batch is deduplicated per state, written once and committed once"""
+        mock_get_conn.return_value.__enter__.return_value = self.mock_conn
+        cursor = self.mock_conn.cursor.return_value.__enter__.return_value
+        # CA already existed in the table, NY is new
+        cursor.fetchall.return_value = [("CA", False), ("NY", True)]
+
+        rows = [("a@example.com", "CA"), ("b@example.com", "NY"), ("c@example.com", "NY")]
+        results = upsert_winners(rows, self.table_name)
+
+        mock_execute_prepared.assert_called_once()
+        _, table_name, operation, (emails, states) = mock_execute_prepared.call_args.args
+        self.assertEqual((table_name, operation), (self.table_name, "upsert"))
+        self.assertEqual(list(zip(emails, states)), [("a@example.com", "CA"), ("c@example.com", "NY")])
+        self.mock_conn.commit.assert_called_once()
+
+        self.assertEqual(results, [
+            ("a@example.com", "CA", True),
+            ("b@example.com", "NY", False),
+            ("c@example.com", "NY", True),
+        ])
+
+    @patch("app.repositories.winner_repository.execute_prepared")
+    @patch("app.repositories.winner_repository.get_connection")
+    def test_failed_batch_is_not_committed(self, mock_get_conn, mock_execute_prepared):
+        """Test that a failing batch is not committed and re-raises"""
+        mock_get_conn.return_value.__enter__.return_value = self.mock_conn
+        mock_execute_prepared.side_effect = Exception("unique violation")
+
+        with self.assertRaises(Exception):
+            upsert_winners([("a@example.com", "CA")], self.table_name)
+
+        self.mock_conn.commit.assert_not_called()
+
+    @patch("app.repositories.winner_repository.get_connection")
+    def test_empty_batch(self, mock_get_conn):
+        """Test that an empty batch does not touch the database"""
+        self.assertEqual(upsert_winners([], self.table_name), [])
+        mock_get_conn.assert_not_called()
+
+
+class TestGetNewVersion(unittest.TestCase):
+    @patch("app.repositories.winner_repository.get_connection")
+    def test_only_run_tables_are_counted(self, mock_get_conn):
+        """Test that tables merely sharing the prefix, like "winners", do not bump the version"""
+        cursor = mock_get_conn.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [("winner_20240101_120000_v1",), ("winners",), ("winner_stats",)]
+
+        self.assertEqual(get_new_version(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import random
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from app.repositories.memory_repository import MemoryWinnerRepository
+from app.repositories.sqlite_repository import SQLiteWinnerRepository
+from app.services import user_service
+from app.services.write_buffer import WinnerWriteBuffer
+
+
+class TestWinnerWriteBuffer(unittest.TestCase):
+    def setUp(self):
+        self.repository = MagicMock(wraps=MemoryWinnerRepository())
+        self.table_name = self.repository.create_versioned_table(self.repository.get_new_version())
+
+    def test_burst_for_one_state_is_written_once(self):
+        """Test that superseded winners of a state never reach the database"""
+        buffer = WinnerWriteBuffer(self.repository, max_size=100, max_age=0)
+        for i in range(10):
+            buffer.add(f"user{i}@example.com", "CA", self.table_name)
+
+        # Nothing is stored before the flush
+        self.assertEqual(self.repository.get_winners_by_state(self.table_name), {})
+        self.assertEqual(buffer.pending(), 1)
+
+        self.assertEqual(buffer.flush(), 1)
+        self.repository.upsert_winners.assert_called_once_with([("user9@example.com", "CA")], self.table_name)
+        self.assertEqual(self.repository.get_winners_by_state(self.table_name), {"CA": "user9@example.com"})
+        self.assertEqual(buffer.stats["coalesced"], 9)
+
+    def test_flush_when_full(self):
+        """Test that reaching max_size pending states flushes them"""
+        buffer = WinnerWriteBuffer(self.repository, max_size=2, max_age=0)
+        buffer.add("a@example.com", "CA", self.table_name)
+        buffer.add("b@example.com", "CA", self.table_name)
+        self.repository.upsert_winners.assert_not_called()
+
+        buffer.add("c@example.com", "NY", self.table_name)
+        self.assertEqual(buffer.pending(), 0)
+        self.assertEqual(self.repository.get_winner_count(self.table_name), 2)
+
+    def test_flush_when_aged(self):
+        """Test that pending winners are written once they are max_age old"""
+        buffer = WinnerWriteBuffer(self.repository, max_size=100, max_age=0.05)
+        try:
+            buffer.add("a@example.com", "CA", self.table_name)
+            deadline = time.monotonic() + 2
+            while buffer.pending() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(self.repository.get_winners_by_state(self.table_name), {"CA": "a@example.com"})
+        finally:
+            buffer.close()
+
+    def test_failed_flush_keeps_winners_pending(self):
+        """Test that a failed flush loses nothing and newer winners still win"""
+        buffer = WinnerWriteBuffer(self.repository, max_size=100, max_age=0)
+        buffer.add("a@example.com", "CA", self.table_name)
+        buffer.add("b@example.com", "NY", self.table_name)
+        self.repository.upsert_winners.side_effect = Exception("connection lost")
+
+        with self.assertRaises(Exception):
+            buffer.flush()
+        self.assertEqual(buffer.pending(), 2)
+
+        self.repository.upsert_winners.side_effect = None
+        buffer.add("c@example.com", "CA", self.table_name)
+        buffer.close()
+        self.assertEqual(self.repository.get_winners_by_state(self.table_name),
+                         {"CA": "c@example.com", "NY": "b@example.com"})
+
+    def test_closed_buffer_rejects_winners(self):
+        """Test that nothing can be queued after close() has flushed"""
+        buffer = WinnerWriteBuffer(self.repository, max_size=100, max_age=0)
+        buffer.close()
+        with self.assertRaises(RuntimeError):
+            buffer.add("a@example.com", "CA", self.table_name)
+
+    def test_final_contents_match_write_through(self):
+        """Test that buffered and unbuffered writes leave identical tables"""
+        generator = random.Random(7)
+        writes = [(f"user{i}@example.com", f"State {generator.randrange(20)}") for i in range(500)]
+        direct, buffered = SQLiteWinnerRepository(), SQLiteWinnerRepository()
+        try:
+            direct_table = direct.create_versioned_table(direct.get_new_version())
+            buffered_table = buffered.create_versioned_table(buffered.get_new_version())
+            for email, state in writes:
+                direct.insert_winner(email, state, direct_table)
+
+            with WinnerWriteBuffer(buffered, max_size=7, max_age=0) as buffer:
+                for email, state in writes:
+                    buffer.add(email, state, buffered_table)
+
+            self.assertEqual(buffered.get_winners_by_state(buffered_table),
+                             direct.get_winners_by_state(direct_table))
+            self.assertEqual(buffer.stats["written"] + buffer.stats["coalesced"], len(writes))
+        finally:
+            direct.close()
+            buffered.close()
+
+
+class TestBufferedAddWinner(unittest.TestCase):
+    def test_add_winner_queues_until_flushed(self):
+        """Test that add_winner uses the shared buffer when enabled and flush_winners stores it"""
+        repository = MemoryWinnerRepository()
+        table_name = repository.create_versioned_table(repository.get_new_version())
+        settings = {"enabled": True, "max_size": 100, "max_age": 0}
+
+        with patch.dict(user_service.config.WRITE_BUFFER_CONFIG, settings), \
+                patch("app.services.user_service.get_winner_repository", return_value=repository):
+            try:
+                user_service.add_winner("a@example.com", "CA", table_name)
+                user_service.add_winner("b@example.com", "CA", table_name)
+                self.assertEqual(repository.get_winner_count(table_name), 0)
+
+                self.assertEqual(user_service.flush_winners(), 1)
+                self.assertEqual(repository.get_winners_by_state(table_name), {"CA": "b@example.com"})
+            finally:
+                user_service.close_write_buffer()
+
+
+if __name__ == "__main__":
+    unittest.main()